@@ -0,0 +1,220 @@
+import os
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+import form_rules
+
+# 📌 **Aşama hata verirse ya da zaman aşımına uğrarsa kullanılacak yedek değerler**
+STAGE_FALLBACKS = {
+    "behavior": [],
+    "feedback": ["There is not feedback generation"],
+    "suggested_questions": ["AI question generation failed."],
+    "question_assistant": ["⚠ AI could not generate question suggestions."],
+}
+
+# 📌 **Toplu analizde aynı anda işlenen form sayısı (LLM prompt'ları bu formlar arasında batch'lenir)**
+BATCH_FORM_WORKERS = int(os.getenv("SMARTFORM_BATCH_FORM_WORKERS", "8"))
+
+
+def prepare_form(data):
+    """ 📌 **İstek gövdesindeki formu analiz aşamalarının kullandığı alanlara çevirir.** Geçersizse ValueError. """
+    if not isinstance(data, dict):
+        raise ValueError("Invalid JSON format.")
+
+    form_fields = data.get('questions', []) or []
+    if not isinstance(form_fields, list) or not all(isinstance(f, dict) for f in form_fields):
+        raise ValueError("'questions' must be a list of objects with a 'name' field.")
+    if any(not isinstance(f.get("name", ""), str) for f in form_fields):
+        raise ValueError("Question 'name' values must be strings.")
+    for key in ('form_title', 'user_question'):
+        if not isinstance(data.get(key) or "", str):
+            raise ValueError(f"'{key}' must be a string.")
+
+    form_title = (data.get('form_title') or "").strip()
+    form_questions = [f.get("name", "Unnamed Field") for f in form_fields if f.get("name")]
+    user_input_question = (data.get('user_question') or "").strip()
+
+    if not form_fields and not user_input_question:
+        raise ValueError("Form fields or user question are required.")
+
+    # 📌 **Form Alanlarını Hazırla**
+    categorized_fields = [
+        {
+            "field_name": f.get("name", "Unnamed Field"),
+            "type": f.get("type", "text"),
+            "placeholder": f.get("placeholder", "")
+        }
+        for f in form_fields
+    ] if form_fields else []
+
+    return {
+        "form_title": form_title,
+        "form_questions": form_questions,
+        "user_input_question": user_input_question,
+        "form_id": data.get('form_id') or form_title or None,
+        "form_purpose": form_title if form_title else "Unknown",
+        "categorized_fields": categorized_fields,
+        "existing_questions": {q.lower().strip() for q in form_questions} if form_questions else set(),
+        "behavior_start": data.get('behavior_start'),
+        "behavior_end": data.get('behavior_end'),
+    }
+
+
+class AnalysisPipeline:
+    """
+    📌 **`/analyze-ai` aşamaları (intent, davranış, geri bildirim, soru önerileri, soru asistanı).**
+    Flask uygulaması ve çevrimdışı toplu analiz aracı aynı aşamaları kullanır.
+    `behavior_analyzer` verilmezse davranış aşaması boş döner.
+    Modeller henüz yüklenmemişse (bileşen None) aşamalar kural tabanlı yanıtlara düşer (degrade mod).
+    """
+
+    def __init__(self, intent_classifier, question_generator, feedback_generator, behavior_analyzer=None):
+        self.intent_classifier = intent_classifier
+        self.question_generator = question_generator
+        self.feedback_generator = feedback_generator
+        self.behavior_analyzer = behavior_analyzer
+
+    def intent_stage(self, form):
+        if self.intent_classifier is None:
+            return form["form_purpose"]
+        if form["form_purpose"] == "Unknown" and form["form_questions"]:
+            predicted = self.intent_classifier.predict_intent(form["form_title"], "", form["form_questions"])
+            print(f"📌 **AI Predicted Purpose:** {predicted}")
+            return predicted
+        return form["form_purpose"]
+
+    def behavior_stage(self, form):
+        # 📌 **Kullanıcı Davranış Analizi**
+        if self.behavior_analyzer is None or not form["form_questions"]:
+            return []
+        return self.behavior_analyzer.analyze_behavior(
+            form_questions=form["form_questions"], form_id=form["form_id"],
+            start=form["behavior_start"], end=form["behavior_end"]
+        )
+
+    def feedback_stage(self, form):
+        # 📌 **AI Destekli Geri Bildirim**
+        if self.feedback_generator is None:
+            return form_rules.rule_based_feedback(form["form_questions"], form["categorized_fields"]) if form["form_questions"] else []
+        return self.feedback_generator.generate_feedback(form["form_questions"], form["categorized_fields"]) if form["form_questions"] else []
+
+    def suggested_questions_stage(self, form, intent):
+        # 📌 **Önerilen Soruların Optimizasyonu**
+        existing_questions = form["existing_questions"]
+        if self.question_generator is None:
+            suggested_questions = form_rules.get_fallback_questions(intent)
+        else:
+            suggested_questions = self.question_generator.generate_questions(intent, existing_questions, num_questions=3)
+
+        return [
+            q.split('. ', 1)[-1].strip() for q in suggested_questions
+            if q.lower().strip() not in existing_questions
+        ] if suggested_questions and "failed" not in suggested_questions[0].lower() else ["No relevant AI-generated questions."]
+
+    def question_assistant_stage(self, form, intent):
+        # 📌 **AI Destekli Soru Asistanı (Kullanıcı Girişi İçin)**
+        if not form["user_input_question"]:
+            return []
+        if self.question_generator is None:
+            return STAGE_FALLBACKS["question_assistant"]
+        question_suggestions = self.question_generator.generate_question_from_user_input(form["user_input_question"], intent)
+        if not isinstance(question_suggestions, list) or len(question_suggestions) == 0:
+            raise ValueError("Empty or invalid AI suggestions received.")
+        return question_suggestions
+
+    @staticmethod
+    def build_response(form, results):
+        """ 📌 Aşama sonuçlarını `/analyze-ai` yanıt formatında birleştirir. """
+        behavior_feedback = results["behavior"]
+        feedback = results["feedback"]
+
+        # 📌 **Önerileri Optimize Et**
+       # 📌 **Hata kontrolü ekle**
+        if isinstance(behavior_feedback, list):
+            optimized_suggestions = behavior_feedback + feedback  # Listeyse direkt birleştir
+        elif isinstance(behavior_feedback, dict):
+            optimized_suggestions = behavior_feedback.get("feedback", []) + feedback  # Dict ise "feedback" anahtarını al
+        else:
+            optimized_suggestions = feedback  # Beklenmeyen durum olursa sadece feedback kullan
+
+        return {
+            "form_purpose": results["intent"],
+            "categorized_fields": form["categorized_fields"],
+            "suggestions": optimized_suggestions,
+            "suggested_questions": results["suggested_questions"],
+            "question_assistant": results["question_assistant"]
+        }
+
+    @staticmethod
+    def _run_stage(name, func, errors, fallback):
+        """ 📌 Toplu analizde tek bir aşamayı çalıştırır; hata olursa kaydedip yedek değeri döndürür. """
+        try:
+            return func()
+        except Exception as e:
+            print(f"🚨 '{name}' aşamasında hata: {e}")
+            errors.append({"stage": name, "error": str(e)})
+            return fallback
+
+    def _analyze_prepared(self, form, feedback):
+        errors = []
+        results = {"feedback": feedback}
+        results["intent"] = self._run_stage("intent", lambda: self.intent_stage(form), errors, form["form_purpose"])
+        results["behavior"] = self._run_stage("behavior", lambda: self.behavior_stage(form), errors, STAGE_FALLBACKS["behavior"])
+        results["suggested_questions"] = self._run_stage(
+            "suggested_questions", lambda: self.suggested_questions_stage(form, results["intent"]),
+            errors, STAGE_FALLBACKS["suggested_questions"])
+        results["question_assistant"] = self._run_stage(
+            "question_assistant", lambda: self.question_assistant_stage(form, results["intent"]),
+            errors, STAGE_FALLBACKS["question_assistant"])
+        return self.build_response(form, results), errors
+
+    def analyze_batch(self, payloads, workers=None):
+        """
+        📌 **Birden fazla formu analiz eder; sonuçlar aynı sırada döner.**
+        - Tüm formların soruları tek bir encode çağrısıyla gömülür.
+        - LLM aşamaları formlar arasında eşzamanlı çalıştığı için batching motoru prompt'ları aynı batch'lerde toplar.
+        - Hatalı formlar diğerlerini etkilemez; `status` alanı ok / partial / error olur.
+        """
+        results = [None] * len(payloads)
+        prepared = []
+        for index, payload in enumerate(payloads):
+            try:
+                prepared.append((index, prepare_form(payload)))
+            except Exception as e:
+                # 📌 Beklenmeyen biçimdeki bir form da yalnızca kendi sonucunu hatalı yapar
+                results[index] = {"index": index, "status": "error", "error": str(e)}
+
+        # 📌 **Geri bildirim: tüm formların soruları tek seferde gömülür**
+        with_questions = [(index, form) for index, form in prepared if form["form_questions"]]
+        feedbacks = {index: [] for index, _ in prepared}
+        feedback_error = None
+        try:
+            forms = [(form["form_questions"], form["categorized_fields"]) for _, form in with_questions]
+            if self.feedback_generator is None:
+                batch_feedback = [form_rules.rule_based_feedback(*form) for form in forms]
+            else:
+                batch_feedback = self.feedback_generator.generate_feedback_batch(forms)
+            feedbacks.update({index: feedback for (index, _), feedback in zip(with_questions, batch_feedback)})
+        except Exception as e:
+            print(f"🚨 Toplu geri bildirim üretilemedi: {e}")
+            feedback_error = {"stage": "feedback", "error": str(e)}
+            feedbacks.update({index: STAGE_FALLBACKS["feedback"] for index, _ in with_questions})
+
+        with ThreadPoolExecutor(max_workers=workers or BATCH_FORM_WORKERS, thread_name_prefix="batch-form") as pool:
+            futures = [(index, form, pool.submit(contextvars.copy_context().run, self._analyze_prepared, form, feedbacks[index]))
+                       for index, form in prepared]
+            for index, form, future in futures:
+                try:
+                    response_data, errors = future.result()
+                    if feedback_error is not None and form["form_questions"]:
+                        errors.insert(0, feedback_error)
+                    results[index] = {
+                        "index": index,
+                        "form_id": form["form_id"],
+                        "status": "partial" if errors else "ok",
+                        "result": response_data,
+                        "errors": errors,
+                    }
+                except Exception as e:
+                    results[index] = {"index": index, "form_id": form["form_id"], "status": "error", "error": str(e)}
+
+        return results
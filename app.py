@@ -1,15 +1,19 @@
-
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template
 from flask_cors import CORS
-from load_models import AIModelManager
-from form_intent import FormIntentClassifier
-from question_generator import QuestionGenerator
 from user_behavior import UserBehaviorAnalyzer
-from form_feedback import FormFeedbackGenerator
+from stage_executor import StageGraph
+from behavior_ingest import BehaviorIngestor, IngestQueueFull
+from analysis_pipeline import AnalysisPipeline, STAGE_FALLBACKS, prepare_form
+from model_warmup import ModelWarmup
+from single_flight import SingleFlight, canonical_key
+from inference_queue import InferenceQueue
+from scheduling import RequestContext, DeadlineExceeded, request_context
 import traceback
+import threading
+import queue
+import json
 import sys
 import os
-import numpy as np
 
 sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 
@@ -17,16 +21,111 @@ sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 app = Flask(__name__)
 CORS(app)
 
-# 📌 **Tek Seferlik Model Yükleme**
-AIModelManager.load_models()
-
-# 📌 **Yüklenmiş modelleri çağır**
-intent_classifier = FormIntentClassifier()
-question_generator = QuestionGenerator()
+# 📌 **Model gerektirmeyen bileşenler hemen hazır; modeller arka planda yüklenir**
 user_behavior_analyzer = UserBehaviorAnalyzer()
-feedback_generator = FormFeedbackGenerator()
+behavior_ingestor = BehaviorIngestor(user_behavior_analyzer)
+pipeline = AnalysisPipeline(None, None, None, user_behavior_analyzer)
+
+
+# 📌 **Ağır içe aktarmalar (torch, transformers, sentence_transformers) yükleyicilerin içinde yapılır**
+def load_feedback_generator():
+    from form_feedback import FormFeedbackGenerator
+
+    generator = FormFeedbackGenerator()
+    if generator.similarity_model is None:
+        raise RuntimeError("Similarity model could not be loaded.")
+    return generator
+
+
+def load_question_generator():
+    from load_models import AIModelManager
+    from question_generator import QuestionGenerator
+
+    AIModelManager.load_models()
+    generator = QuestionGenerator()
+    if generator.model is None:
+        raise RuntimeError("LLM could not be loaded.")
+    return generator
+
+
+def load_intent_classifier():
+    from form_intent import FormIntentClassifier, IntentCascade
+
+    return IntentCascade(FormIntentClassifier())
+
+
+def attach_component(name, component):
+    """ 📌 Hazır olan bileşen pipeline'a bağlanır; o andan itibaren istekler degrade moddan çıkar. """
+    setattr(pipeline, name, component)
+
+
+# 📌 Küçük embedder önce yüklenir; geri bildirim Gemma'yı beklemeden tam hale gelir
+warmup = ModelWarmup(on_ready=attach_component)
+warmup.add("feedback_generator", load_feedback_generator)
+warmup.add("question_generator", load_question_generator)
+warmup.add("intent_classifier", load_intent_classifier)
+if ModelWarmup.background_enabled():
+    warmup.start()
+else:
+    warmup.load_all()
+
+# 📌 **Aşama başına zaman aşımı (saniye)**
+STAGE_TIMEOUTS = {
+    "intent": float(os.getenv("SMARTFORM_INTENT_TIMEOUT", "30")),
+    "behavior": float(os.getenv("SMARTFORM_BEHAVIOR_TIMEOUT", "5")),
+    "feedback": float(os.getenv("SMARTFORM_FEEDBACK_TIMEOUT", "15")),
+    "suggested_questions": float(os.getenv("SMARTFORM_QUESTIONS_TIMEOUT", "60")),
+    "question_assistant": float(os.getenv("SMARTFORM_ASSISTANT_TIMEOUT", "30")),
+}
 
 
+analysis_flight = SingleFlight("analyze_ai")
+
+
+def run_analysis(form, question_assistant=None):
+    """
+    📌 **Analiz aşamalarını çalıştırıp `/analyze-ai` yanıtını oluşturur; birbirinden bağımsız aşamalar paralel çalışır.**
+    `question_assistant(intent)` verilirse soru asistanı aşaması onunla değiştirilir (akış ucu).
+    """
+    question_assistant = question_assistant or (lambda intent: pipeline.question_assistant_stage(form, intent))
+
+    graph = StageGraph()
+    graph.add_stage("intent", lambda: pipeline.intent_stage(form), timeout=STAGE_TIMEOUTS["intent"], fallback=form["form_purpose"])
+    graph.add_stage("behavior", lambda: pipeline.behavior_stage(form), timeout=STAGE_TIMEOUTS["behavior"], fallback=STAGE_FALLBACKS["behavior"])
+    graph.add_stage("feedback", lambda: pipeline.feedback_stage(form), timeout=STAGE_TIMEOUTS["feedback"], fallback=STAGE_FALLBACKS["feedback"])
+    graph.add_stage("suggested_questions", lambda intent: pipeline.suggested_questions_stage(form, intent), depends_on=["intent"],
+                    timeout=STAGE_TIMEOUTS["suggested_questions"], fallback=STAGE_FALLBACKS["suggested_questions"])
+    graph.add_stage("question_assistant", question_assistant, depends_on=["intent"],
+                    timeout=STAGE_TIMEOUTS["question_assistant"], fallback=STAGE_FALLBACKS["question_assistant"])
+
+    results = graph.run()
+    print(f"📌 **Aşama Süreleri (sn):** {graph.timings}")
+
+    response_data = pipeline.build_response(form, results)
+    if not warmup.is_ready():
+        response_data["degraded"] = warmup.pending()
+    return response_data
+
+
+def sse_response(events):
+    """
+    📌 **Olayları Server-Sent Events olarak akıtır.** `heartbeat` olayları yorum satırı olarak yazılır.
+    İstemci koptuğunda sunucu akışı kapatır; `events.close()` ile üretim de iptal edilir.
+    """
+    def stream():
+        try:
+            for event in events:
+                name = event.pop("event")
+                if name == "heartbeat":
+                    yield ": heartbeat\n\n"
+                else:
+                    yield f"event: {name}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+        finally:
+            events.close()
+
+    return Response(stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 
 @app.route('/analyze-ai', methods=['POST'])
 def analyze_ai():
@@ -37,108 +136,130 @@ def analyze_ai():
         if not data:
             return jsonify({"error": "Invalid JSON format."}), 400
 
-        form_fields = data.get('questions', [])
-        form_title = data.get('form_title', "").strip()
-        form_questions = [f.get("name", "Unnamed Field") for f in form_fields if f.get("name")]
-        user_input_question = data.get('user_question', "").strip()
-
-        if not form_fields and not user_input_question:
-            return jsonify({"error": "Form fields or user question are required."}), 400
+        try:
+            form = prepare_form(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-        form_purpose = form_title if form_title else "Unknown"
-        print(f"📌 **Form Başlığı Algılandı: {form_purpose}**")
+        print(f"📌 **Form Başlığı Algılandı: {form['form_purpose']}**")
 
-        if form_purpose == "Unknown" and form_questions:
+        # 📌 Aynı formla eşzamanlı gelen istekler (paylaşım, sayfa yenileme) tek analizde birleştirilir
+        with request_context(RequestContext.from_headers(request.headers, "standard")):
             try:
-                form_purpose = intent_classifier.predict_intent(form_title, form_questions)
-                print(f"📌 **AI Predicted Purpose:** {form_purpose}")  
-            except Exception as e:
-                print(f"🚨 AI intent detection error: {e}")
-
-        # 📌 **Kullanıcı Davranış Verisini Simüle Et**
-        user_data = [
-            {
-                "question_id": i,
-                "question_text": form_questions[i],
-                "time_spent": np.random.randint(5, 20),
-                "skipped": np.random.choice([True, False], p=[0.2, 0.8])
-            }
-            for i in range(len(form_fields))
-        ] if form_questions else []
-
-        # 📌 **Kullanıcı Davranış Analizi**
-        behavior_feedback = user_behavior_analyzer.analyze_behavior(user_data=user_data, form_questions=form_questions) if form_questions else []
-
-
-        # 📌 **Form Alanlarını Hazırla**
-        categorized_fields = [
-            {
-                "field_name": f.get("name", "Unnamed Field"),
-                "type": f.get("type", "text"),
-                "placeholder": f.get("placeholder", "")
-            }
-            for f in form_fields
-        ] if form_fields else []
-
-        # 📌 **AI Destekli Geri Bildirim**
-        try:
-            feedback = feedback_generator.generate_feedback(form_purpose, user_data, form_questions, categorized_fields) if form_questions else []
-        except Exception as e:
-            print(f"🚨 AI feedback generation error: {e}")
-            feedback = ["There is not feedback generation"]
+                response_data = analysis_flight.do(canonical_key(form), lambda: run_analysis(form))
+            except DeadlineExceeded as e:
+                # 📌 Aynı formun süren analizi bu isteğin son tarihine yetişmedi
+                return jsonify({"error": str(e)}), 504
 
-        # 📌 **Önerilen Soruların Optimizasyonu**
-        try:
-            existing_questions = {q.lower().strip() for q in form_questions} if form_questions else set()
-            suggested_questions = question_generator.generate_questions(form_purpose, existing_questions, num_questions=3)
+        print(f"📌 **API Yanıtı:** {response_data}")  
+        return jsonify(response_data), 200
 
-            filtered_questions = [
-                q.split('. ', 1)[-1].strip() for q in suggested_questions 
-                if q.lower().strip() not in existing_questions
-            ] if suggested_questions and "failed" not in suggested_questions[0].lower() else ["No relevant AI-generated questions."]
+    except Exception as e:
+        app.logger.error(f"🚨 Internal Server Error: {traceback.format_exc()}")
+        return jsonify({"error": "Internal Server Error", "details": traceback.format_exc()}), 500
 
+@app.route('/analyze-ai/stream', methods=['POST'])
+def analyze_ai_stream():
+    """
+    📌 **`/analyze-ai`'ın akış sürümü (SSE).**
+    - Soru asistanının token'ları (`token`) ve tamamlanan aday soruları (`candidate`) üretildikçe gönderilir.
+    - Tüm aşamalar bitince `result` olayında `/analyze-ai` ile aynı yanıt gelir.
+    - İstemci bağlantıyı koparırsa soru asistanının üretimi durdurulur.
+    """
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"error": "Invalid JSON format."}), 400
+    try:
+        form = prepare_form(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    context = RequestContext.from_headers(request.headers, "standard")
+    cancel = threading.Event()
+    events = queue.Queue()
+
+    def question_assistant(intent):
+        question_generator = pipeline.question_generator
+        if question_generator is None or not form["user_input_question"]:
+            return pipeline.question_assistant_stage(form, intent)
+        for event in question_generator.stream_question_from_user_input(form["user_input_question"], intent, cancel_event=cancel):
+            if event["event"] == "done":
+                return event["suggested_variants"]
+            if event["event"] != "heartbeat":
+                events.put(event)
+        return STAGE_FALLBACKS["question_assistant"]
+
+    def analyze():
+        try:
+            with request_context(context):
+                events.put({"event": "result", "result": run_analysis(form, question_assistant)})
         except Exception as e:
-            print(f"🚨 AI question generation error: {e}")
-            filtered_questions = ["AI question generation failed."]
+            app.logger.error(f"🚨 Internal Server Error: {traceback.format_exc()}")
+            events.put({"event": "error", "error": str(e)})
+        finally:
+            events.put(None)
 
-        # 📌 **AI Destekli Soru Asistanı (Kullanıcı Girişi İçin)**
+    def stream_events():
         try:
-            if user_input_question:
-                question_suggestions = question_generator.suggest_question_variants(user_input_question)
-                if not isinstance(question_suggestions, list) or len(question_suggestions) == 0:
-                    raise ValueError("Empty or invalid AI suggestions received.")
-            else:
-                question_suggestions = []
-        except Exception as e:
-            print(f"🚨 AI Question Assistant Error: {e}")
-            question_suggestions = ["⚠ AI could not generate question suggestions."]
+            while True:
+                try:
+                    event = events.get(timeout=1.0)
+                except queue.Empty:
+                    yield {"event": "heartbeat"}
+                    continue
+                if event is None:
+                    return
+                yield event
+        finally:
+            cancel.set()
+
+    threading.Thread(target=analyze, name="analyze-stream", daemon=True).start()
+    return sse_response(stream_events())
+
+# 📌 **Toplu analiz: istek başına form sınırı**
+BATCH_MAX_FORMS = int(os.getenv("SMARTFORM_BATCH_MAX_FORMS", "1000"))
+
+
+@app.route('/analyze-ai/batch', methods=['POST'])
+def analyze_ai_batch():
+    """
+    📌 **Birden fazla formu tek istekte analiz eder (gece yeniden puanlama gibi toplu işler için).**
+    - Gövde: `{"forms": [<analyze-ai gövdesi>, ...]}`; her formun sonucu aynı sırada döner.
+    - Tüm formların soruları tek bir encode çağrısıyla gömülür.
+    - LLM aşamaları formlar arasında eşzamanlı çalıştığı için batching motoru prompt'ları aynı batch'lerde toplar.
+    - Hatalı formlar isteğin tamamını düşürmez; `status` alanı ok / partial / error olur.
+    - LLM kuyruğunda `batch` sınıfıyla en son sıraya girer; etkileşimli öneriler bu işlerin önüne geçer.
+    """
+    data = request.get_json(silent=True)
+    forms = data.get("forms") if isinstance(data, dict) else data
+    if not isinstance(forms, list) or not forms:
+        return jsonify({"error": "Expected a non-empty list of forms."}), 400
+    if len(forms) > BATCH_MAX_FORMS:
+        return jsonify({"error": f"At most {BATCH_MAX_FORMS} forms are allowed per request."}), 413
 
+    try:
+        with request_context(RequestContext.from_headers(request.headers, "batch")):
+            results = pipeline.analyze_batch(forms)
 
-        # 📌 **Önerileri Optimize Et**
-       # 📌 **Hata kontrolü ekle**
-        if isinstance(behavior_feedback, list):
-            optimized_suggestions = behavior_feedback + feedback  # Listeyse direkt birleştir
-        elif isinstance(behavior_feedback, dict):
-            optimized_suggestions = behavior_feedback.get("feedback", []) + feedback  # Dict ise "feedback" anahtarını al
-        else:
-            optimized_suggestions = feedback  # Beklenmeyen durum olursa sadece feedback kullan
+        summary = {status: sum(1 for r in results if r["status"] == status) for status in ("ok", "partial", "error")}
+        summary["total"] = len(results)
+        if not warmup.is_ready():
+            summary["degraded"] = warmup.pending()
+        return jsonify({"results": results, "summary": summary}), 200
 
+    except Exception as e:
+        app.logger.error(f"🚨 Internal Server Error: {traceback.format_exc()}")
+        return jsonify({"error": "Internal Server Error", "details": traceback.format_exc()}), 500
 
+# 📌 **Model yüklenirken kural tabanlı karşılığı olmayan uçların istemciye önerdiği bekleme süresi (saniye)**
+WARMUP_RETRY_AFTER = int(os.getenv("SMARTFORM_WARMUP_RETRY_AFTER", "10"))
 
-        response_data = {
-            "form_purpose": form_purpose,
-            "categorized_fields": categorized_fields,
-            "suggestions": optimized_suggestions,
-            "suggested_questions": filtered_questions,
-            "question_assistant": question_suggestions
-        }
 
-        print(f"📌 **API Yanıtı:** {response_data}")  
-        return jsonify(response_data), 200
+def warming_up_response():
+    response = jsonify({"error": "Models are still loading. Retry later.", "models": warmup.report()["models"]})
+    response.headers["Retry-After"] = str(WARMUP_RETRY_AFTER)
+    return response, 503
 
-    except Exception as e:
-        app.logger.error(f"🚨 Internal Server Error: {traceback.format_exc()}")
-        return jsonify({"error": "Internal Server Error", "details": traceback.format_exc()}), 500
 
 @app.route('/suggest-question', methods=['POST'])
 def suggest_question():
@@ -153,8 +274,13 @@ def suggest_question():
         print(f"📌 Kullanıcının girdiği soru: {user_question}")
         print(f"📌 Form Başlığı: {form_purpose}")
 
-        # AI'yı Kullanarak Formun Konusuna Uygun Yeni Bir Soru Üret
-        suggestions = question_generator.generate_question_from_user_input(user_question, form_purpose)
+        question_generator = warmup.get("question_generator")
+        if question_generator is None:
+            return warming_up_response()
+
+        # AI'yı Kullanarak Formun Konusuna Uygun Yeni Bir Soru Üret (yazarken çağrılır: etkileşimli sınıf)
+        with request_context(RequestContext.from_headers(request.headers, "interactive")):
+            suggestions = question_generator.generate_question_from_user_input(user_question, form_purpose)
 
         return jsonify({"suggested_variants": suggestions})
 
@@ -164,6 +290,109 @@ def suggest_question():
 
 
 
+@app.route('/suggest-question/stream', methods=['POST'])
+def suggest_question_stream():
+    """
+    📌 **`/suggest-question`'ın akış sürümü (SSE).**
+    Olaylar: `token` (yeni metin), `candidate` (tamamlanan soru), `reset` (üretim yeniden denendi, önceki metni at),
+    en sonda `done` (`suggested_variants`).
+    İstemci bağlantıyı koparırsa üretim bir sonraki token'da durdurulur.
+    """
+    data = request.get_json(silent=True) or {}
+    user_question = (data.get('question') or "").strip()
+    form_purpose = (data.get('form_purpose') or "General Inquiry Form").strip()
+
+    if not user_question:
+        return jsonify({"error": "No question provided."}), 400
+
+    question_generator = warmup.get("question_generator")
+    if question_generator is None:
+        return warming_up_response()
+
+    # 📌 Akış görünüm fonksiyonu döndükten sonra okunduğu için bağlam açıkça aktarılır
+    context = RequestContext.from_headers(request.headers, "interactive")
+    return sse_response(question_generator.stream_question_from_user_input(user_question, form_purpose, context=context))
+
+
+
+@app.route('/behavior/events', methods=['POST'])
+def ingest_behavior_events():
+    """
+    📌 **Frontend'den gelen davranış olaylarını (süre, atlama, tamamlama) toplu olarak kabul eder.**
+    Gövde tek bir oturum batch'i ya da `{"sessions": [...]}` olabilir.
+    """
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"error": "Invalid JSON format."}), 400
+
+    payloads = data.get("sessions") if isinstance(data, dict) and "sessions" in data else data
+    if isinstance(payloads, dict):
+        payloads = [payloads]
+    if not isinstance(payloads, list):
+        return jsonify({"error": "Expected a session batch or a list of session batches."}), 400
+
+    try:
+        accepted, rejected = behavior_ingestor.submit(payloads)
+    except IngestQueueFull as e:
+        response = jsonify({"error": "Behavior event queue is full. Retry later."})
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response, 429
+
+    return jsonify({"accepted": accepted, "rejected": rejected}), 202
+
+@app.route('/behavior/report', methods=['GET'])
+def behavior_report():
+    """ 📌 Tek bir form (ve isteğe bağlı zaman aralığı) için davranış raporu; panolar için saatlik/günlük kovaları kullanır. """
+    form_questions = request.args.getlist('question')
+    start = request.args.get('start')
+    end = request.args.get('end')
+    report = user_behavior_analyzer.analyze_behavior(
+        form_questions=form_questions or None,
+        form_id=request.args.get('form_id'),
+        start=int(start) if start and start.isdigit() else start,
+        end=int(end) if end and end.isdigit() else end
+    )
+    return jsonify(report)
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """ 📌 Canlılık: süreç ayakta ve istek kabul ediyor (modeller yüklenirken de 200). """
+    return jsonify({"status": "alive", "uptime_seconds": warmup.report()["uptime_seconds"]}), 200
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """ 📌 Hazırlık: tüm modeller yüklendiyse 200, aksi halde model başına durumla birlikte 503. """
+    report = warmup.report()
+    return jsonify(report), 200 if report["ready"] else 503
+
+@app.route('/models/memory', methods=['GET'])
+def models_memory():
+    """ 📌 Bellekte tutulan modellerin kapladığı alanı raporlar. """
+    from load_models import AIModelManager
+
+    return jsonify({"models": AIModelManager.memory_report()})
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """ 📌 Çıkarım katmanlarının sayaçlarını döndürür. """
+    question_generator = warmup.get("question_generator")
+    intent_classifier = warmup.get("intent_classifier")
+    feedback_generator = warmup.get("feedback_generator")
+    return jsonify({
+        "models": warmup.report()["models"],
+        "batching": question_generator.engine.get_stats() if question_generator is not None else {},
+        "behavior_ingest": behavior_ingestor.get_stats(),
+        "intent_cascade": intent_classifier.get_stats() if intent_classifier is not None else {},
+        "single_flight": SingleFlight.get_all_stats(),
+        "serving": InferenceQueue.get_all_stats(),
+        "stages": StageGraph.get_stats(),
+        "cache": {
+            "form_intent": intent_classifier.intent_cache.get_stats() if intent_classifier is not None else {},
+            "generated_questions": question_generator.question_cache.get_stats() if question_generator is not None else {},
+            "embeddings": feedback_generator.embedding_store.get_stats() if feedback_generator is not None else {},
+        }
+    })
+
     
 @app.route('/')
 def home():
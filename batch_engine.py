@@ -0,0 +1,355 @@
+import os
+import threading
+import time
+import math
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+import torch
+from prompt_templates import PrefixKVCache
+from speculative_decoding import SpeculativeDecoder
+from stream_parsers import TaskStoppingCriteria, DeadlineStoppingCriteria
+from scheduling import PRIORITY_CLASSES, DeadlineExceeded, current_context
+from transformers import StoppingCriteriaList
+
+
+class _PendingRequest:
+    def __init__(self, prompt, generation_kwargs, template=None, variables=None, task=None, stop=None, context=None,
+                 deadline_stop=True):
+        self.prompt = prompt
+        self.stop = stop
+        self.generation_kwargs = generation_kwargs
+        self.template = template
+        self.variables = variables or {}
+        self.task = task or (template.name if template is not None else None)
+        # 📌 Aynı görev ve üretim ayarlarına (ve aynı şablona) sahip istekler aynı batch'e girebilir
+        self.group_key = (("__task__", self.task),) + tuple(sorted(generation_kwargs.items()))
+        if template is not None:
+            self.group_key = (("__template__", template.fingerprint),) + self.group_key
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+        # 📌 Bağlam yoksa (CLI, ısınma) standart sınıf, son tarihsiz
+        self.context = context or current_context()
+        self.priority = self.context.priority if self.context is not None else "standard"
+        self.deadline = self.context.deadline if self.context is not None else None
+        self.deadline_stop = deadline_stop
+
+    @property
+    def stop_at(self):
+        """ 📌 Üretimin kesileceği an; akış isteklerinde (istemci token'ları okurken) None. """
+        return self.deadline if self.deadline_stop else None
+
+    def sort_key(self):
+        """ 📌 Önce öncelik sınıfı, sonra en yakın son tarih, sonra geliş sırası. """
+        return (PRIORITY_CLASSES[self.priority], self.deadline or math.inf, self.enqueued_at)
+
+
+class BatchingEngine:
+    """
+    📌 **Eşzamanlı Flask isteklerinden gelen `model.generate` çağrılarını tek bir batch'te toplar.**
+    - İlk istek geldikten sonra `max_wait_ms` boyunca yeni istekler beklenir.
+    - En fazla `max_batch_size` prompt sola dolgulanarak (left padding) tek seferde üretilir.
+    - Her çağıran kendi çözülmüş (decode edilmiş) çıktısını alır.
+    - Şablonlu isteklerde sabit önekin KV durumu önbellekten kullanılır, sadece değişken son prefill edilir.
+    - Spekülatif üretim etkin görevlerde istekler taslak modelle tek tek üretilir.
+    - `stop` ile verilen akış ayrıştırıcısı cevap tamamlanınca o satırın üretimini durdurur.
+    - Bekleyen istekler her batch sınırında öncelik sınıfı ve son tarihe göre sıralanır; çalışan batch kesilmez.
+    - Görev başına ölçülen üretim süresiyle son tarihine yetişemeyecek istekler kuyruktan `DeadlineExceeded` ile düşer.
+    - Son tarihi geçen satırların üretimi de durdurulur; çağıranın bıraktığı iş arkadaki istekleri geciktirmez.
+    """
+    _engines = {}
+    _engines_lock = threading.Lock()
+
+    def __init__(self, model, tokenizer, max_batch_size=None, max_wait_ms=None, model_key=None, speculative=None):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.prefix_cache = PrefixKVCache(model, tokenizer, model_key=model_key)
+        self.speculative = speculative
+        self.max_batch_size = max_batch_size or int(os.getenv("SMARTFORM_MAX_BATCH_SIZE", "8"))
+        self.max_wait_ms = max_wait_ms if max_wait_ms is not None else float(os.getenv("SMARTFORM_MAX_BATCH_WAIT_MS", "20"))
+
+        # 📌 Decoder-only modellerde batch üretimi için dolgu sola yapılmalı
+        self.tokenizer.padding_side = "left"
+
+        self._pending = []
+        self._condition = threading.Condition()
+        self._stats = {"batches": 0, "requests": 0, "max_observed_batch": 0, "deadline_exceeded": 0, "deadline_stops": 0}
+        self._priority_stats = {priority: 0 for priority in PRIORITY_CLASSES}
+        self._task_estimates = {}
+        self._busy = False
+        self._stop_stats = {}
+        self._worker = threading.Thread(target=self._run, name="batching-engine", daemon=True)
+        self._worker.start()
+
+    @classmethod
+    def for_model(cls, model_handle):
+        """ 📌 Aynı model için tek bir motor paylaşılır (intent, soru üretimi vb.). """
+        with cls._engines_lock:
+            engine = cls._engines.get(model_handle.key)
+            if engine is None or engine.model is not model_handle.model:
+                engine = cls(model_handle.model, model_handle.tokenizer, model_key=model_handle.key,
+                             speculative=SpeculativeDecoder.from_env(model_handle))
+                cls._engines[model_handle.key] = engine
+            return engine
+
+    def submit(self, prompt, task=None, stop=None, context=None, deadline_stop=True, **generation_kwargs):
+        """
+        📌 Prompt'u kuyruğa ekler ve sonucu taşıyacak `Future` nesnesini döndürür.
+        `task` (ör. "intent") görev başına ayarları (spekülatif üretim gibi) seçmek için kullanılır.
+        `stop` bir `StreamingParser`; cevap tamamlanınca üretim `max_new_tokens` beklenmeden durur.
+        `context` verilmezse etkin `RequestContext` (öncelik sınıfı ve son tarih) kullanılır.
+        `deadline_stop=False` ise üretim son tarihte kesilmez (sonucu token token okuyan akış istekleri).
+        """
+        return self._enqueue(_PendingRequest(prompt, generation_kwargs, task=task, stop=stop, context=context,
+                                             deadline_stop=deadline_stop))
+
+    def generate(self, prompt, timeout=None, task=None, stop=None, **generation_kwargs):
+        """ 📌 **Prompt'u batch'e ekler ve çözülmüş çıktıyı bekleyip döndürür.** """
+        return self._wait(self.submit(prompt, task=task, stop=stop, **generation_kwargs), timeout)
+
+    def submit_template(self, template, variables, stop=None, context=None, deadline_stop=True, **generation_kwargs):
+        """ 📌 `PromptTemplate` + değişkenlerle kuyruğa ekler; önek KV önbelleğinden yararlanır. """
+        return self._enqueue(_PendingRequest(template.render(**variables), generation_kwargs, template=template,
+                                             variables=variables, stop=stop, context=context, deadline_stop=deadline_stop))
+
+    def generate_template(self, template, variables, timeout=None, stop=None, **generation_kwargs):
+        """ 📌 **Şablonlu prompt'u üretir ve çözülmüş tam metni döndürür.** """
+        return self._wait(self.submit_template(template, variables, stop=stop, **generation_kwargs), timeout)
+
+    def _enqueue(self, request):
+        with self._condition:
+            self._priority_stats[request.priority] += 1
+            estimate = self._task_estimates.get(request.task, 0.0)
+            if request.context is not None:
+                # 📌 Varsayılan son tarih bu görevin ölçülen süresine göre uzatılır (boştaki motorda sığsın)
+                request.context.fit_estimate(estimate)
+                request.deadline = request.context.deadline
+            # 📌 Motor meşgulken ölçülen üretim süresi kalan süreyi aşıyorsa kuyruğa hiç girmez
+            busy = self._busy or bool(self._pending)
+            if busy and request.context is not None and not request.context.can_finish(estimate):
+                self._stats["deadline_exceeded"] += 1
+                request.future.set_exception(DeadlineExceeded(f"'{request.task}' cannot finish before its deadline."))
+                return request.future
+            self._pending.append(request)
+            self._condition.notify()
+        return request.future
+
+    def _wait(self, future, timeout):
+        """ 📌 Sonucu isteğin son tarihine kadar bekler; süre dolarsa istek kuyruktan çekilir. """
+        context = current_context()
+        if timeout is None and context is not None and context.deadline is not None:
+            timeout = max(0.0, context.remaining())
+            try:
+                return future.result(timeout=timeout)
+            except FutureTimeoutError:
+                # 📌 Henüz başlamadıysa kuyruktan düşer; üretiliyorsa sonucu yok sayılır
+                future.cancel()
+                with self._condition:
+                    self._stats["deadline_exceeded"] += 1
+                raise DeadlineExceeded("Generation did not finish before the request deadline.")
+        return future.result(timeout=timeout)
+
+    def get_stats(self):
+        """ 📌 Batch sayısı ve ortalama batch boyutu gibi sayaçları döndürür. """
+        with self._condition:
+            stats = dict(self._stats)
+            stats["early_stopping"] = {task: dict(values) for task, values in self._stop_stats.items()}
+            stats["by_priority"] = dict(self._priority_stats)
+            stats["task_estimates_ms"] = {task: round(1000 * seconds, 1) for task, seconds in self._task_estimates.items()}
+        stats["avg_batch_size"] = round(stats["requests"] / stats["batches"], 2) if stats["batches"] else 0.0
+        stats["max_batch_size"] = self.max_batch_size
+        stats["max_wait_ms"] = self.max_wait_ms
+        stats["prefix_cache"] = self.prefix_cache.get_stats()
+        stats["speculative"] = self.speculative.get_stats() if self.speculative is not None else {"enabled": False}
+        return stats
+
+    def _collect_batch(self):
+        with self._condition:
+            while not self._pending:
+                self._condition.wait()
+
+            # 📌 İlk isteğin penceresi dolana ya da batch dolana kadar bekle
+            deadline = self._pending[0].enqueued_at + self.max_wait_ms / 1000.0
+            while len(self._pending) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            self._drop_expired()
+            if not self._pending:
+                return []
+
+            # 📌 Batch'in grubunu en öncelikli istek belirler; grup içinde de öncelik sırası korunur
+            head = min(self._pending, key=_PendingRequest.sort_key)
+            batch = sorted((r for r in self._pending if r.group_key == head.group_key),
+                           key=_PendingRequest.sort_key)[:self.max_batch_size]
+            batch_ids = {id(r) for r in batch}
+            self._pending = [r for r in self._pending if id(r) not in batch_ids]
+
+            self._stats["batches"] += 1
+            self._stats["requests"] += len(batch)
+            self._stats["max_observed_batch"] = max(self._stats["max_observed_batch"], len(batch))
+            return batch
+
+    def _drop_expired(self):
+        """ 📌 Kuyrukta beklerken son tarihi geçen istekleri düşürür (kilit tutulurken). """
+        kept = []
+        for request in self._pending:
+            if request.context is None or not request.context.expired():
+                kept.append(request)
+            elif request.future.set_running_or_notify_cancel():
+                self._stats["deadline_exceeded"] += 1
+                request.future.set_exception(DeadlineExceeded(f"'{request.task}' cannot finish before its deadline."))
+        self._pending = kept
+
+    def _record_duration(self, task, seconds):
+        """ 📌 Görev başına üretim süresinin üstel hareketli ortalaması. """
+        with self._condition:
+            previous = self._task_estimates.get(task)
+            self._task_estimates[task] = seconds if previous is None else 0.8 * previous + 0.2 * seconds
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            # 📌 İptal edilmiş istekleri üretime sokma
+            batch = [r for r in batch if r.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            with self._condition:
+                self._busy = True
+            started = time.monotonic()
+            try:
+                if self.speculative is not None and self.speculative.should_use(batch[0].task):
+                    outputs = self._generate_speculative(batch, batch[0].generation_kwargs)
+                elif batch[0].template is not None:
+                    outputs = self._generate_template_batch(batch, batch[0].generation_kwargs)
+                else:
+                    outputs = self._generate_batch([r.prompt for r in batch], batch[0].generation_kwargs,
+                                                   [r.stop for r in batch], [r.stop_at for r in batch])
+                self._record_early_stops(batch)
+                # 📌 Son tarihte kesilen batch'in süresi gerçek üretim süresini yansıtmaz
+                if not self._record_deadline_stops(batch):
+                    self._record_duration(batch[0].task, time.monotonic() - started)
+                for request, output in zip(batch, outputs):
+                    request.future.set_result(output)
+            except Exception as e:
+                print(f"🚨 Batch üretimi sırasında hata oluştu: {e}")
+                for request in batch:
+                    request.future.set_exception(e)
+            finally:
+                with self._condition:
+                    self._busy = False
+
+    def _stopping_criteria(self, parsers, prompt_length, deadlines=None):
+        """
+        📌 En az bir satırın ayrıştırıcısı varsa görev duyarlı durdurma kriterini,
+        son tarihi olan satır varsa son tarih kriterini kurar.
+        """
+        criteria = []
+        if parsers and any(parser is not None for parser in parsers):
+            criteria.append(TaskStoppingCriteria(self.tokenizer, parsers, prompt_length))
+        if deadlines and any(deadline is not None for deadline in deadlines):
+            criteria.append(DeadlineStoppingCriteria(deadlines))
+        return {"stopping_criteria": StoppingCriteriaList(criteria)} if criteria else {}
+
+    def _record_deadline_stops(self, batch):
+        now = time.monotonic()
+        stopped = sum(1 for r in batch if r.stop_at is not None and now >= r.stop_at)
+        with self._condition:
+            self._stats["deadline_stops"] += stopped
+        return stopped
+
+    def _record_early_stops(self, batch):
+        with self._condition:
+            for request in batch:
+                if request.stop is None:
+                    continue
+                stats = self._stop_stats.setdefault(request.task, {"requests": 0, "early_stops": 0, "tokens_saved": 0})
+                stats["requests"] += 1
+                max_new_tokens = request.generation_kwargs.get("max_new_tokens")
+                if request.stop.done and max_new_tokens:
+                    stats["early_stops"] += 1
+                    stats["tokens_saved"] += max(0, max_new_tokens - request.stop.stopped_at)
+
+    def _generate_batch(self, prompts, generation_kwargs, parsers=None, deadlines=None):
+        inputs = self.tokenizer(prompts, return_tensors="pt", padding=True).to(self.model.device)
+
+        with torch.no_grad():
+            outputs = self.model.generate(
+                **inputs,
+                pad_token_id=self.tokenizer.pad_token_id,
+                **self._stopping_criteria(parsers, inputs["input_ids"].shape[1], deadlines),
+                **generation_kwargs
+            )
+
+        # 📌 Dolgu token'ları özel token olduğu için çözümlemede atlanır
+        return [self.tokenizer.decode(output, skip_special_tokens=True) for output in outputs]
+
+    def _generate_template_batch(self, batch, generation_kwargs):
+        template = batch[0].template
+        if not self.prefix_cache.enabled:
+            return self._generate_batch([r.prompt for r in batch], generation_kwargs, [r.stop for r in batch],
+                                        [r.stop_at for r in batch])
+
+        try:
+            suffixes = [
+                self.tokenizer(template.render_suffix(**r.variables), return_tensors="pt", add_special_tokens=False)["input_ids"]
+                for r in batch
+            ]
+        except Exception as e:
+            print(f"🚨 Şablon sonları hazırlanamadı, tam prefill yapılıyor: {e}")
+            self.prefix_cache.stats["fallbacks"] += 1
+            return self._generate_batch([r.prompt for r in batch], generation_kwargs, [r.stop for r in batch],
+                                        [r.stop_at for r in batch])
+
+        # 📌 Önek ile son arasına dolgu girmesin diye son uzunluğu eşit olanlar birlikte üretilir
+        by_length = {}
+        for index, suffix in enumerate(suffixes):
+            by_length.setdefault(suffix.shape[1], []).append(index)
+
+        outputs = [None] * len(batch)
+        for indices in by_length.values():
+            group = [batch[i] for i in indices]
+            parsers = [r.stop for r in group]
+            deadlines = [r.stop_at for r in group]
+            try:
+                generated = self.prefix_cache.generate(
+                    template, [suffixes[i] for i in indices],
+                    stopping_criteria_fn=lambda prompt_length, parsers=parsers, deadlines=deadlines:
+                        self._stopping_criteria(parsers, prompt_length, deadlines),
+                    **generation_kwargs
+                )
+                generated = [self.tokenizer.decode(output, skip_special_tokens=True) for output in generated]
+            except Exception as e:
+                # 📌 Önbellekli yol başarısız olursa yalnızca bu grup tam prefill ile yeniden üretilir
+                print(f"🚨 Önek önbelleği kullanılamadı, tam prefill yapılıyor: {e}")
+                self.prefix_cache.stats["fallbacks"] += 1
+                self.prefix_cache.invalidate(template.name)
+                self._reset_parsers(group)
+                generated = self._generate_batch([r.prompt for r in group], generation_kwargs, parsers, deadlines)
+            for index, output in zip(indices, generated):
+                outputs[index] = output
+        return outputs
+
+    @staticmethod
+    def _reset_parsers(requests):
+        """ 📌 Yarıda kalan bir denemenin ayrıştırıcı durumunu yeniden denemeden önce temizler. """
+        for request in requests:
+            if request.stop is not None:
+                request.stop.reset()
+
+    def _generate_speculative(self, batch, generation_kwargs):
+        outputs = []
+        for request in batch:
+            inputs = self.tokenizer(request.prompt, return_tensors="pt").to(self.model.device)
+            try:
+                output = self.speculative.generate(request.task, inputs["input_ids"], inputs["attention_mask"],
+                                                   **self._stopping_criteria([request.stop], inputs["input_ids"].shape[1],
+                                                                             [request.stop_at]),
+                                                   **generation_kwargs)
+                outputs.append(self.tokenizer.decode(output[0], skip_special_tokens=True))
+            except Exception as e:
+                print(f"🚨 Spekülatif üretim başarısız, normal üretime dönülüyor: {e}")
+                self._reset_parsers([request])
+                outputs.extend(self._generate_batch([request.prompt], generation_kwargs, [request.stop], [request.stop_at]))
+        return outputs
@@ -0,0 +1,165 @@
+import os
+import time
+import queue
+import threading
+from datetime import datetime, timezone
+from behavior_store import parse_timestamp
+
+MAX_QUESTION_LENGTH = 500
+MAX_TIME_SPENT = 24 * 3600
+
+
+class IngestQueueFull(Exception):
+    """ 📌 Kuyruk dolu; istemci `retry_after` saniye sonra tekrar denemeli. """
+
+    def __init__(self, retry_after):
+        super().__init__("Behavior event queue is full.")
+        self.retry_after = retry_after
+
+
+def validate_session(payload):
+    """
+    📌 **Frontend'den gelen bir oturum batch'ini ucuzca doğrular ve analizörün oturum formatına çevirir.**
+    Beklenen format:
+        {"session_id": "...", "form_id": "...", "timestamp": "...", "form_completed": true,
+         "events": [{"question_text": "...", "time_spent": 4.2, "skipped": false}, ...]}
+    `timestamp` ISO-8601 ya da epoch (saniye / milisaniye) olabilir; çözülemeyen zaman damgalı oturumun olayları reddedilir.
+    Dönüş: (oturum, reddedilen olay sayısı). Oturum tamamen geçersizse oturum None olur.
+    """
+    if not isinstance(payload, dict):
+        return None, 1
+
+    events = payload.get("events")
+    if not isinstance(events, list) or not events:
+        return None, 1
+
+    timestamp = payload.get("timestamp")
+    if timestamp is None or timestamp == "":
+        timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    else:
+        seconds = parse_timestamp(timestamp, default=None)
+        if seconds is None:
+            # 📌 0'a düşürülüp 1970 kovasına yazılmasın diye oturum reddedilir
+            return None, len(events)
+        # 📌 Epoch sayıları da dahil her biçim, loglarda tek tip UTC ISO-8601 olarak saklanır
+        timestamp = datetime.fromtimestamp(seconds, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    responses = []
+    rejected = 0
+    for event in events:
+        if not isinstance(event, dict):
+            rejected += 1
+            continue
+        question_text = event.get("question_text")
+        time_spent = event.get("time_spent", 0)
+        if (not isinstance(question_text, str) or not question_text or len(question_text) > MAX_QUESTION_LENGTH
+                or isinstance(time_spent, bool) or not isinstance(time_spent, (int, float))
+                or not 0 <= time_spent <= MAX_TIME_SPENT):
+            rejected += 1
+            continue
+        responses.append({
+            "question_id": event.get("question_id"),
+            "question_text": question_text,
+            "time_spent": time_spent,
+            "skipped": bool(event.get("skipped", False)),
+        })
+
+    if not responses:
+        return None, rejected
+
+    completed = payload.get("form_completed")
+    if completed is None:
+        # 📌 Oturum düzeyinde bilgi yoksa olaylardaki `completed` alanlarından çıkar
+        completed = any(bool(event.get("completed")) for event in events if isinstance(event, dict))
+
+    session = {
+        "user_id": payload.get("session_id") or payload.get("user_id"),
+        "form_id": payload.get("form_id"),
+        "timestamp": timestamp,
+        "form_completed": bool(completed),
+        "responses": responses,
+    }
+    return session, rejected
+
+
+class BehaviorIngestor:
+    """
+    📌 **Davranış olaylarını bellekte tamponlayıp arka planda toplu olarak depoya yazar.**
+    - Kuyruk sınırlıdır; dolduğunda `IngestQueueFull` fırlatılır (geri basınç, HTTP 429).
+    - Arka plan iş parçacığı `flush_batch` oturum birikince ya da `flush_interval` dolunca yazar.
+    - Analizör toplamları yazım anında güncellendiği için yeni veri yeniden başlatma olmadan görünür.
+    """
+
+    def __init__(self, analyzer, max_queue=None, flush_batch=None, flush_interval=None):
+        self.analyzer = analyzer
+        self.flush_batch = flush_batch or int(os.getenv("SMARTFORM_INGEST_FLUSH_BATCH", "1000"))
+        self.flush_interval = flush_interval or float(os.getenv("SMARTFORM_INGEST_FLUSH_INTERVAL", "1.0"))
+        self._queue = queue.Queue(maxsize=max_queue or int(os.getenv("SMARTFORM_INGEST_MAX_QUEUE", "50000")))
+        self._admit_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {"accepted_sessions": 0, "accepted_events": 0, "rejected_events": 0,
+                      "dropped_sessions": 0, "flushed_sessions": 0, "flushes": 0, "flush_errors": 0}
+        self._worker = threading.Thread(target=self._run, name="behavior-ingest", daemon=True)
+        self._worker.start()
+
+    def submit(self, payloads):
+        """ 📌 **Oturum batch'lerini doğrular ve kuyruğa ekler.** Dönüş: (kabul edilen olay, reddedilen olay). """
+        sessions = []
+        rejected_events = 0
+        for payload in payloads:
+            session, rejected = validate_session(payload)
+            rejected_events += rejected
+            if session is not None:
+                sessions.append(session)
+
+        # 📌 İstek ya tamamen kabul edilir ya da hiç; istemci 429 sonrası aynı batch'i güvenle tekrar gönderebilir.
+        # Yer kontrolü ve eklemeler aynı kilit altında yapılır: kuyruktan yalnızca yazıcı alır, yer ancak artabilir.
+        with self._admit_lock:
+            if self._queue.maxsize - self._queue.qsize() < len(sessions):
+                with self._stats_lock:
+                    self.stats["dropped_sessions"] += len(sessions)
+                raise IngestQueueFull(retry_after=max(1, int(self.flush_interval)))
+            for session in sessions:
+                self._queue.put_nowait(session)
+
+        accepted_sessions = len(sessions)
+        accepted_events = sum(len(session["responses"]) for session in sessions)
+        with self._stats_lock:
+            self.stats["accepted_sessions"] += accepted_sessions
+            self.stats["accepted_events"] += accepted_events
+            self.stats["rejected_events"] += rejected_events
+
+        return accepted_events, rejected_events
+
+    def _run(self):
+        while True:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.flush_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if batch:
+                self._flush(batch)
+
+    def _flush(self, batch):
+        try:
+            self.analyzer.record_sessions(batch)
+            with self._stats_lock:
+                self.stats["flushed_sessions"] += len(batch)
+                self.stats["flushes"] += 1
+        except Exception as e:
+            print(f"🚨 Davranış olayları yazılamadı: {e}")
+            with self._stats_lock:
+                self.stats["flush_errors"] += 1
+
+    def get_stats(self):
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats["queue_depth"] = self._queue.qsize()
+        stats["queue_capacity"] = self._queue.maxsize
+        return stats
@@ -0,0 +1,439 @@
+import os
+import json
+import math
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# 📌 Toplam tablolarının anahtarı tek bir int64'e paketlenir: (form yuvası, zaman kovası, soru indeksi).
+# Sıralı anahtarlarda bir formun bir kova aralığı tek bir bitişik dilimdir.
+FORM_BITS, BUCKET_BITS, QUESTION_BITS = 20, 21, 22
+MAX_BUCKET = 1 << BUCKET_BITS
+QUESTION_MASK = (1 << QUESTION_BITS) - 1
+
+
+def rollup_code(form_slots, buckets, questions):
+    """
+    📌 (form yuvası, kova, soru) üçlülerini sıralanabilir int64 anahtarlara çevirir. Yuva 0 = tüm veri.
+    Alanlar toplanarak birleştirilir; böylece `MAX_BUCKET` gibi dışlayıcı üst sınırlar bir sonraki yuvaya taşar.
+    """
+    return ((np.asarray(form_slots, dtype=np.int64) << (BUCKET_BITS + QUESTION_BITS))
+            + (np.asarray(buckets, dtype=np.int64) << QUESTION_BITS)
+            + np.asarray(questions, dtype=np.int64))
+
+
+def iter_sessions(log_file):
+    """
+    📌 Oturum kayıtlarını tek tek okur.
+    - `.jsonl`: her satır bir oturum, dosya akış halinde okunur.
+    - `.json`: eski format (tek JSON dizisi), geriye dönük uyumluluk için desteklenir.
+    """
+    if log_file.endswith(".jsonl"):
+        with open(log_file, "r") as file:
+            for line in file:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+    else:
+        with open(log_file, "r") as file:
+            yield from json.load(file)
+
+
+def convert_json_to_jsonl(json_file, jsonl_file):
+    """ 📌 Eski tek-dizi JSON log dosyasını satır başına bir oturum olan JSONL formatına çevirir. """
+    tmp_file = f"{jsonl_file}.tmp"
+    with open(tmp_file, "w") as file:
+        for entry in iter_sessions(json_file):
+            file.write(json.dumps(entry) + "\n")
+    os.replace(tmp_file, jsonl_file)
+
+
+def form_key_of(entry):
+    """ 📌 Oturumun ait olduğu formun anahtarı: `form_id`, yoksa `form_title`, o da yoksa None. """
+    return entry.get("form_id") or entry.get("form_title") or None
+
+
+def parse_timestamp(value, default=0):
+    """
+    📌 Zaman damgasını epoch saniyesine çevirir: ISO-8601 metni ya da epoch sayısı (saniye veya milisaniye).
+    Boşsa ya da çözülemezse `default` döner.
+    """
+    if value is None or value == "" or isinstance(value, bool):
+        return default
+    if isinstance(value, str):
+        try:
+            return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp())
+        except ValueError:
+            try:
+                value = float(value)
+            except ValueError:
+                return default
+    if not isinstance(value, (int, float)) or not math.isfinite(value):
+        return default
+    # 📌 JavaScript `Date.now()` gibi milisaniye değerleri saniyeye çevrilir
+    return int(value / 1000 if abs(value) >= 1e11 else value)
+
+
+class ColumnarBehaviorStore:
+    """
+    📌 **Davranış logları için sütun bazlı, bellek eşlemeli (memmap) depo.**
+    - Her yanıt satırı tipli dizilere ayrılır: soru indeksi, süre, atlandı mı, oturum indeksi, zaman damgası.
+    - Soru metinleri bir kez sözlüğe yazılır ve tamsayıya çevrilir (interning).
+    - Sütunlar ham `.bin` dosyalarına eklenir; okumalar `np.memmap` ile yapıldığı için RSS sınırlı kalır.
+    - Birden çok süreç yazabilir: eklemeler dosya kilidi altında, diskteki meta'nın sözlükleri ve satır
+      sayılarıyla yapılır. Okuyucular `refresh()` ile başka süreçlerin eklediği satırları görür.
+    """
+    RESPONSE_COLUMNS = {
+        "question_idx": np.int32,
+        "form_idx": np.int32,
+        "time_spent": np.float32,
+        "skipped": np.uint8,
+        "session_idx": np.int64,
+        "timestamp": np.int64,
+    }
+    SESSION_COLUMNS = {
+        "session_completed": np.uint8,
+        "session_form_idx": np.int32,
+        "session_timestamp": np.int64,
+    }
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+        self.meta_path = os.path.join(directory, "meta.json")
+        self.lock_path = os.path.join(directory, "append.lock")
+
+        self.questions = []
+        self.forms = []
+        self.num_responses = 0
+        self.num_sessions = 0
+        self._question_ids = {}
+        self._form_ids = {}
+        self._meta_stamp = None
+        self.refresh()
+
+    def refresh(self):
+        """
+        📌 **meta.json başka bir süreç tarafından güncellendiyse sözlükleri ve satır sayılarını yeniden okur.**
+        Sözlükler sadece sona eklenerek büyür; mevcut indeksler değişmez. Meta değiştiyse True döner.
+        """
+        with self._lock:
+            try:
+                stat = os.stat(self.meta_path)
+            except FileNotFoundError:
+                return False
+            stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if stamp == self._meta_stamp:
+                return False
+            with open(self.meta_path, "r") as file:
+                meta = json.load(file)
+            for question_text in meta["questions"][len(self.questions):]:
+                self._question_ids[question_text] = len(self.questions)
+                self.questions.append(question_text)
+            for form_key in meta.get("forms", [])[len(self.forms):]:
+                self._form_ids[form_key] = len(self.forms)
+                self.forms.append(form_key)
+            self.num_responses = meta["num_responses"]
+            self.num_sessions = meta["num_sessions"]
+            self._meta_stamp = stamp
+            return True
+
+    @contextmanager
+    def _append_lock(self):
+        """ 📌 Süreçler arası yazma kilidi (Windows'ta sadece süreç içi kilit). """
+        with self._lock, open(self.lock_path, "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def lookup_form(self, form_key):
+        """ 📌 Formun depodaki indeksi; form hiç oturum almadıysa None. """
+        return self._form_ids.get(form_key)
+
+    def lookup_question(self, question_text):
+        """ 📌 Soru metninin depodaki indeksi; soru hiç yanıtlanmadıysa None. """
+        return self._question_ids.get(question_text)
+
+    def _path(self, column):
+        return os.path.join(self.directory, f"{column}.bin")
+
+    def column(self, name):
+        """ 📌 Sütunu kopyalamadan, bellek eşlemeli salt-okunur dizi olarak döndürür. """
+        dtype = self.RESPONSE_COLUMNS.get(name) or self.SESSION_COLUMNS[name]
+        rows = self.num_responses if name in self.RESPONSE_COLUMNS else self.num_sessions
+        if rows == 0 or not os.path.exists(self._path(name)):
+            # 📌 Form sütunu olmadan oluşturulmuş eski depolarda tüm satırlar "form yok" (-1) sayılır
+            return np.full(rows, -1 if name.endswith("form_idx") else 0, dtype=dtype)
+        return np.memmap(self._path(name), dtype=dtype, mode="r", shape=(rows,))
+
+    # ------------------------------------------------------------------
+    # Yazma
+    # ------------------------------------------------------------------
+    def _intern(self, question_text):
+        question_id = self._question_ids.get(question_text)
+        if question_id is None:
+            question_id = len(self.questions)
+            self.questions.append(question_text)
+            self._question_ids[question_text] = question_id
+        return question_id
+
+    def _intern_form(self, form_key):
+        if form_key is None:
+            return -1
+        form_id = self._form_ids.get(form_key)
+        if form_id is None:
+            form_id = len(self.forms)
+            self.forms.append(form_key)
+            self._form_ids[form_key] = form_id
+        return form_id
+
+    def append_sessions(self, entries):
+        """
+        📌 **Oturumları sütunlara toplu olarak ekler.**
+        Kilit alındıktan sonra meta yeniden okunur; böylece başka bir worker'ın eklediği satırların üzerine
+        yazılmaz ve aynı soru metni iki farklı indekse atanmaz.
+        """
+        with self._append_lock():
+            self.refresh()
+            columns = {name: [] for name in list(self.RESPONSE_COLUMNS) + list(self.SESSION_COLUMNS)}
+            session_idx = self.num_sessions
+
+            for entry in entries:
+                timestamp = parse_timestamp(entry.get("timestamp"))
+                form_id = self._intern_form(form_key_of(entry))
+                columns["session_form_idx"].append(form_id)
+                columns["session_completed"].append(1 if entry.get("form_completed") else 0)
+                columns["session_timestamp"].append(timestamp)
+
+                for response in entry.get("responses", []):
+                    columns["question_idx"].append(self._intern(response.get("question_text")))
+                    columns["form_idx"].append(form_id)
+                    columns["time_spent"].append(response.get("time_spent", 0))
+                    columns["skipped"].append(1 if response.get("skipped") else 0)
+                    columns["session_idx"].append(session_idx)
+                    columns["timestamp"].append(timestamp)
+                session_idx += 1
+
+            # 📌 Önce sütunlar, en son meta yazılır; meta'daki satır sayısı okuyucular için tek doğruluk kaynağıdır
+            dtypes = {**self.RESPONSE_COLUMNS, **self.SESSION_COLUMNS}
+            for name, values in columns.items():
+                rows = self.num_responses if name in self.RESPONSE_COLUMNS else self.num_sessions
+                with open(self._path(name), "r+b" if os.path.exists(self._path(name)) else "wb") as file:
+                    file.seek(rows * np.dtype(dtypes[name]).itemsize)
+                    file.write(np.asarray(values, dtype=dtypes[name]).tobytes())
+                    file.truncate()
+
+            self.num_responses += len(columns["question_idx"])
+            self.num_sessions = session_idx
+            self._write_meta()
+
+    def _write_meta(self):
+        tmp_path = f"{self.meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({
+                "questions": self.questions,
+                "forms": self.forms,
+                "num_responses": self.num_responses,
+                "num_sessions": self.num_sessions,
+            }, file)
+        os.replace(tmp_path, self.meta_path)
+        stat = os.stat(self.meta_path)
+        self._meta_stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    # ------------------------------------------------------------------
+    # Vektörel sorgular
+    # ------------------------------------------------------------------
+    def question_aggregates(self, chunk_rows=8_000_000):
+        """
+        📌 **Soru bazında count / sum / sumsq / skipped toplamlarını vektörel group-by ile hesaplar.**
+        Sütunlar parça parça okunur; bellek kullanımı `chunk_rows` ile sınırlıdır.
+        """
+        n_questions = len(self.questions)
+        totals = {
+            "count": np.zeros(n_questions, dtype=np.int64),
+            "sum": np.zeros(n_questions, dtype=np.float64),
+            "sumsq": np.zeros(n_questions, dtype=np.float64),
+            "skipped": np.zeros(n_questions, dtype=np.int64),
+        }
+        question_idx = self.column("question_idx")
+        time_spent = self.column("time_spent")
+        skipped = self.column("skipped")
+
+        for start in range(0, self.num_responses, chunk_rows):
+            end = min(start + chunk_rows, self.num_responses)
+            ids = np.asarray(question_idx[start:end])
+            times = np.asarray(time_spent[start:end], dtype=np.float64)
+            totals["count"] += np.bincount(ids, minlength=n_questions)
+            totals["sum"] += np.bincount(ids, weights=times, minlength=n_questions)
+            totals["sumsq"] += np.bincount(ids, weights=times * times, minlength=n_questions)
+            totals["skipped"] += np.bincount(ids, weights=np.asarray(skipped[start:end]), minlength=n_questions).astype(np.int64)
+
+        return totals
+
+    def session_totals(self):
+        """ 📌 Toplam ve tamamlanan oturum sayısı. """
+        completed = self.column("session_completed")
+        return self.num_sessions, int(np.count_nonzero(completed))
+
+    def _ranked(self, scores, k, descending=True):
+        order = np.argsort(-scores if descending else scores, kind="stable")
+        return [(self.questions[i], float(scores[i])) for i in order[:k]]
+
+    def top_time_consuming(self, k=3):
+        """ 📌 Ortalama süresi en yüksek `k` soru. """
+        totals = self.question_aggregates()
+        means = totals["sum"] / np.maximum(totals["count"], 1)
+        return self._ranked(means, k)
+
+    def most_skipped(self, k=3):
+        """ 📌 En çok atlanan `k` soru. """
+        totals = self.question_aggregates()
+        return self._ranked(totals["skipped"].astype(np.float64), k)
+
+    def difficulty_ranking(self):
+        """ 📌 Zorluk skoru (ortalama süre + 5 x atlanma) ile sıralı tüm sorular. """
+        totals = self.question_aggregates()
+        scores = totals["sum"] / np.maximum(totals["count"], 1) + totals["skipped"] * 5
+        return self._ranked(scores, len(scores))
+
+
+class GroupedTotals:
+    """
+    📌 **Sıralı int64 anahtarlar ve her anahtar için toplam sütunları (seyrek group-by tablosu).**
+    Yeni satırlar `np.unique` + `np.bincount` ile gruplanır, `np.searchsorted` ile mevcut anahtarlara eklenir;
+    anahtar başına Python nesnesi oluşturulmaz.
+    """
+
+    def __init__(self, width):
+        self.codes = np.empty(0, dtype=np.int64)
+        self.values = np.zeros((0, width), dtype=np.float64)
+
+    def add(self, codes, values):
+        if len(codes) == 0:
+            return
+        unique, inverse = np.unique(codes, return_inverse=True)
+        sums = np.column_stack([np.bincount(inverse, weights=values[:, i], minlength=len(unique))
+                                for i in range(self.values.shape[1])])
+        positions = np.searchsorted(self.codes, unique)
+        found = positions < len(self.codes)
+        found[found] = self.codes[positions[found]] == unique[found]
+        self.values[positions[found]] += sums[found]
+        if not found.all():
+            self.codes = np.insert(self.codes, positions[~found], unique[~found])
+            self.values = np.insert(self.values, positions[~found], sums[~found], axis=0)
+
+    def slice(self, low, high):
+        """ 📌 [low, high) anahtar aralığındaki satırlar (kopyasız görünüm). """
+        start, end = np.searchsorted(self.codes, [low, high])
+        return self.codes[start:end], self.values[start:end]
+
+
+class BehaviorRollups:
+    """
+    📌 **Depodaki satırların (form, zaman kovası, soru) bazında artımlı toplamları.**
+    - Yanıt tabloları: count / sum / sumsq / skipped; oturum tabloları: total / completed.
+    - Kova boyutu `None` olan tablo zamandan bağımsızdır; diğerleri saatlik/günlük kovalardır.
+    - Her satır hem kendi formunun yuvasına hem de "tüm veri" yuvasına (0) eklenir.
+    - `update()` sadece son çağrıdan beri eklenen satırları okur; başka worker'ların yazdıkları da dahildir.
+    """
+
+    def __init__(self, bucket_sizes, chunk_rows=8_000_000):
+        self.chunk_rows = chunk_rows
+        self.responses = {size: GroupedTotals(4) for size in (None, *bucket_sizes)}
+        self.sessions = {size: GroupedTotals(2) for size in (None, *bucket_sizes)}
+        self.num_responses = 0
+        self.num_sessions = 0
+
+    def update(self, store):
+        """ 📌 Deponun henüz katılmamış yanıt ve oturum satırlarını toplamlara ekler. """
+        if len(store.forms) + 1 >= 1 << FORM_BITS or len(store.questions) > QUESTION_MASK:
+            raise ValueError("Behavior store has too many forms or questions for rollup keys.")
+        num_responses, num_sessions = store.num_responses, store.num_sessions
+
+        columns = [store.column(name) for name in ("form_idx", "timestamp", "question_idx", "time_spent", "skipped")]
+        for start in range(self.num_responses, num_responses, self.chunk_rows):
+            end = min(start + self.chunk_rows, num_responses)
+            forms, timestamps, questions, times, skipped = (np.asarray(c[start:end]) for c in columns)
+            times = times.astype(np.float64)
+            values = np.column_stack([np.ones_like(times), times, times * times, skipped.astype(np.float64)])
+            self._fold(self.responses, forms, timestamps, questions, values)
+
+        columns = [store.column(name) for name in ("session_form_idx", "session_timestamp", "session_completed")]
+        for start in range(self.num_sessions, num_sessions, self.chunk_rows):
+            end = min(start + self.chunk_rows, num_sessions)
+            forms, timestamps, completed = (np.asarray(c[start:end]) for c in columns)
+            values = np.column_stack([np.ones(len(forms)), completed.astype(np.float64)])
+            self._fold(self.sessions, forms, timestamps, np.zeros(len(forms), dtype=np.int64), values)
+
+        self.num_responses, self.num_sessions = num_responses, num_sessions
+
+    @staticmethod
+    def _fold(tables, forms, timestamps, questions, values):
+        slots = forms.astype(np.int64) + 1
+        for bucket_seconds, table in tables.items():
+            if bucket_seconds:
+                buckets = timestamps // bucket_seconds
+                # 📌 Zaman damgası olmayan (ya da anahtar aralığını aşan) satırlar kovalara girmez
+                valid = (timestamps > 0) & (buckets < MAX_BUCKET)
+            else:
+                buckets = np.zeros(len(slots), dtype=np.int64)
+                valid = np.ones(len(slots), dtype=bool)
+            table.add(rollup_code(0, buckets[valid], questions[valid]), values[valid])
+            own = valid & (slots > 0)
+            table.add(rollup_code(slots[own], buckets[own], questions[own]), values[own])
+
+    def question_totals(self, form_slot, segments):
+        """
+        📌 **Verilen yuva ve kova aralıkları için soru bazında toplamlar.**
+        `segments`: `(bucket_seconds, first_bucket, end_bucket)` listesi; zamandan bağımsız toplam için `[(None, 0, 1)]`.
+        Dönüş: sıralı soru indeksleri ve `[count, sum, sumsq, skipped]` satırları.
+        """
+        parts = [self.responses[size].slice(rollup_code(form_slot, first, 0), rollup_code(form_slot, end, 0))
+                 for size, first, end in segments]
+        codes = np.concatenate([codes for codes, _ in parts] or [np.empty(0, dtype=np.int64)])
+        values = np.concatenate([values for _, values in parts] or [np.zeros((0, 4))])
+        questions, inverse = np.unique(codes & QUESTION_MASK, return_inverse=True)
+        totals = np.column_stack([np.bincount(inverse, weights=values[:, i], minlength=len(questions))
+                                  for i in range(4)])
+        return questions, totals.reshape(len(questions), 4)
+
+    def session_totals(self, form_slot, segments):
+        """ 📌 Verilen yuva ve kova aralıkları için (toplam oturum, tamamlanan oturum). """
+        total = np.zeros(2)
+        for size, first, end in segments:
+            _, values = self.sessions[size].slice(rollup_code(form_slot, first, 0), rollup_code(form_slot, end, 0))
+            total += values.sum(axis=0)
+        return int(total[0]), int(total[1])
+
+
+def convert_json_log(log_file, directory, batch_size=10_000):
+    """ 📌 **Mevcut JSON/JSONL log dosyasını sütun bazlı depoya dönüştürür.** """
+    store = ColumnarBehaviorStore(directory)
+    batch = []
+    for entry in iter_sessions(log_file):
+        batch.append(entry)
+        if len(batch) >= batch_size:
+            store.append_sessions(batch)
+            batch = []
+    if batch:
+        store.append_sessions(batch)
+    return store
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert a SmartForm behavior log into the columnar store.")
+    parser.add_argument("log_file", help="form_logs.json or form_logs.jsonl")
+    parser.add_argument("directory", help="Output directory for the columnar store")
+    args = parser.parse_args()
+
+    converted = convert_json_log(args.log_file, args.directory)
+    print(f"✅ **{converted.num_sessions} oturum, {converted.num_responses} yanıt, {len(converted.questions)} soru dönüştürüldü.**")
@@ -0,0 +1,78 @@
+"""
+📌 **Sütun bazlı davranış deposunda vektörel group-by sorgularının süresini ve RSS'i ölçer.**
+
+Kullanım:
+    python benchmarks/benchmark_behavior_store.py [yanıt_sayısı] [soru_sayısı]
+"""
+import os
+import sys
+import time
+import shutil
+import resource
+import tempfile
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from behavior_store import ColumnarBehaviorStore
+
+
+def fill_synthetic(store, num_responses, num_questions, responses_per_session=10, chunk=5_000_000, seed=0):
+    """ 📌 Python döngüsü olmadan sütun dosyalarına doğrudan sentetik veri yazar. """
+    rng = np.random.default_rng(seed)
+    store.questions = [f"Question {i}" for i in range(num_questions)]
+    num_sessions = num_responses // responses_per_session
+
+    for start in range(0, num_responses, chunk):
+        n = min(chunk, num_responses - start)
+        columns = {
+            "question_idx": rng.integers(0, num_questions, n, dtype=np.int32),
+            "time_spent": rng.gamma(2.0, 5.0, n).astype(np.float32),
+            "skipped": (rng.random(n) < 0.1).astype(np.uint8),
+            "session_idx": (np.arange(start, start + n) // responses_per_session).astype(np.int64),
+            "timestamp": rng.integers(1_700_000_000, 1_730_000_000, n, dtype=np.int64),
+        }
+        for name, values in columns.items():
+            with open(store._path(name), "ab") as file:
+                file.write(values.tobytes())
+
+    for name, values in {
+        "session_completed": (rng.random(num_sessions) < 0.7).astype(np.uint8),
+        "session_timestamp": rng.integers(1_700_000_000, 1_730_000_000, num_sessions, dtype=np.int64),
+    }.items():
+        with open(store._path(name), "ab") as file:
+            file.write(values.tobytes())
+
+    store.num_responses = num_responses
+    store.num_sessions = num_sessions
+    store._write_meta()
+
+
+def max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+if __name__ == "__main__":
+    num_responses = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    num_questions = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    directory = tempfile.mkdtemp(prefix="behavior_store_")
+
+    try:
+        started = time.perf_counter()
+        fill_synthetic(ColumnarBehaviorStore(directory), num_responses, num_questions)
+        print(f"📂 {num_responses:,} yanıt yazıldı ({time.perf_counter() - started:.1f} s)")
+
+        store = ColumnarBehaviorStore(directory)
+        rss_before = max_rss_mb()
+        for name, query in [
+            ("question_aggregates", store.question_aggregates),
+            ("top_time_consuming", store.top_time_consuming),
+            ("most_skipped", store.most_skipped),
+            ("difficulty_ranking", store.difficulty_ranking),
+        ]:
+            started = time.perf_counter()
+            query()
+            print(f"{name:>22}: {time.perf_counter() - started:.2f} s")
+        print(f"📊 Max RSS: {max_rss_mb():.0f} MB (sorgulardan önce {rss_before:.0f} MB)")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,82 @@
+"""
+📌 **Eager PyTorch ile dışa aktarılmış (TorchScript / ONNX) sınıflandırıcı ve embedder'ın çağrı başına gecikmesini karşılaştırır.**
+
+Batch boyutları 1–64 arasında ölçülür; her altyapı için önce eager çıktılarla uyum (parity) raporlanır.
+Dışa aktarılmış dosyalar önce `python export_models.py --backend ...` ile üretilmelidir.
+
+Kullanım:
+    python benchmarks/benchmark_inference_backends.py [--backends torchscript onnx] [--int8] [--repeats 20]
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from model_registry import ModelRegistry
+from load_models import AIModelManager
+from inference_backends import ExportedClassifier, ExportedEmbedder, TorchClassifier, artifact_path, check_parity
+
+BATCH_SIZES = [1, 2, 4, 8, 16, 32, 64]
+QUESTIONS = [
+    "What is your email address?", "Full Name", "Phone number", "Upload your resume",
+    "How would you rate our service?", "What date would you like to request an appointment?",
+    "Please describe any special requirements or accessibility needs we should know about.",
+    "Would you recommend us to others?",
+]
+
+
+def measure(call, texts, repeats):
+    call(texts)  # ısınma
+    started = time.perf_counter()
+    for _ in range(repeats):
+        call(texts)
+    return 1000 * (time.perf_counter() - started) / repeats
+
+
+def run(name, runners, repeats):
+    print(f"\n📌 {name} (ms / çağrı)")
+    print(f"{'batch':>6} " + " ".join(f"{label:>14}" for label in runners))
+    for batch_size in BATCH_SIZES:
+        texts = [QUESTIONS[i % len(QUESTIONS)] + f" ({i})" for i in range(batch_size)]
+        latencies = [measure(call, texts, repeats) for call in runners.values()]
+        print(f"{batch_size:>6} " + " ".join(f"{latency:>14.2f}" for latency in latencies))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark eager vs exported classifier/embedder latency.")
+    parser.add_argument("--backends", nargs="+", default=["torchscript", "onnx"])
+    parser.add_argument("--int8", action="store_true")
+    parser.add_argument("--out-dir", default=os.getenv("SMARTFORM_EXPORT_DIR", "models/exported"))
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    embedder = ModelRegistry.acquire(AIModelManager.SIMILARITY_MODEL_ID, kind="sentence_transformer",
+                                     dtype="float32", device="cpu").model
+    embedders = {"torch": lambda texts: embedder.encode(texts, batch_size=64)}
+    for backend in args.backends:
+        path = artifact_path(args.out_dir, "embedder", backend, args.int8)
+        if os.path.exists(path):
+            exported = ExportedEmbedder(path)
+            parity = check_parity(embedder.encode(QUESTIONS), exported.encode(QUESTIONS), atol=1e-4)
+            print(f"🔎 embedder/{backend}: max |Δ| {parity['max_abs_diff']:.2e}, min cos {parity['min_cosine']:.5f}")
+            embedders[backend] = lambda texts, exported=exported: exported.encode(texts, batch_size=64)
+    run("Embedder", embedders, args.repeats)
+
+    if os.path.isdir(AIModelManager.get_form_classifier_path()):
+        handle = ModelRegistry.acquire(AIModelManager.get_form_classifier_path(), kind="sequence_classifier",
+                                       dtype="float32", device="cpu")
+        eager = TorchClassifier(handle.model, handle.tokenizer)
+        classifiers = {"torch": eager.predict_proba}
+        for backend in args.backends:
+            path = artifact_path(args.out_dir, "form_classifier", backend, args.int8)
+            if os.path.exists(path):
+                exported = ExportedClassifier(path)
+                reference, candidate = eager.predict_proba(QUESTIONS), exported.predict_proba(QUESTIONS)
+                agreement = float((np.argmax(reference, 1) == np.argmax(candidate, 1)).mean())
+                print(f"🔎 classifier/{backend}: max |Δ| {check_parity(reference, candidate, 1e-3)['max_abs_diff']:.2e}, "
+                      f"label agreement {agreement:.0%}")
+                classifiers[backend] = exported.predict_proba
+        run("Form classifier", classifiers, args.repeats)
@@ -0,0 +1,58 @@
+"""
+📌 **detect_redundant_questions için eski çift döngü ile vektörel benzerlik taramasını karşılaştırır.**
+
+Kullanım:
+    python benchmarks/benchmark_redundancy.py
+"""
+import os
+import sys
+import time
+import torch
+import torch.nn.functional as F
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from form_feedback import FormFeedbackGenerator
+
+
+def loop_pairs(embeddings, threshold):
+    """ 📌 Eski uygulama: her çift için ayrı cos_sim ve `.item()` çağrısı. """
+    pairs = []
+    n = embeddings.shape[0]
+    for i in range(n):
+        for j in range(i + 1, n):
+            similarity = F.cosine_similarity(embeddings[i], embeddings[j], dim=0).item()
+            if similarity > threshold:
+                pairs.append((i, j))
+    return pairs
+
+
+def make_embeddings(n, dim=384, seed=0):
+    """ 📌 MiniLM boyutunda, bazıları birbirine çok yakın rastgele embedding'ler üretir. """
+    generator = torch.Generator().manual_seed(seed)
+    base = torch.randn(n, dim, generator=generator)
+    # Her beşinci soru bir öncekinin neredeyse kopyası olsun
+    for i in range(1, n, 5):
+        base[i] = base[i - 1] + 0.05 * torch.randn(dim, generator=generator)
+    return F.normalize(base, dim=1)
+
+
+def timed(func, *args, repeats=3):
+    best = float("inf")
+    result = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+if __name__ == "__main__":
+    threshold = 0.85
+    print(f"{'questions':>10} {'loop (s)':>12} {'vectorized (s)':>15} {'speedup':>9} {'same pairs':>11}")
+    for n in (10, 100, 1000):
+        embeddings = make_embeddings(n)
+        # 1000 soruda eski döngü ~500k çift demek; tek tekrar yeterli
+        loop_time, loop_result = timed(loop_pairs, embeddings, threshold, repeats=1 if n >= 1000 else 3)
+        vector_time, vector_result = timed(FormFeedbackGenerator.find_similar_pairs, embeddings, threshold)
+        print(f"{n:>10} {loop_time:>12.4f} {vector_time:>15.4f} {loop_time / vector_time:>8.1f}x {str(loop_result == vector_result):>11}")
@@ -0,0 +1,130 @@
+"""
+📌 **Süreç sayısı arttıkça süreç başına bellek (RSS / PSS / USS) ve işlem hacmini ölçer.**
+
+Her süreç sayısı için `serve.py` başlatılır, tüm süreçler `/readyz` ile hazır olana kadar beklenir,
+ardından süreç başına bellek okunur ve sabit süre boyunca eşzamanlı isteklerle işlem hacmi ölçülür.
+PSS, paylaşılan sayfaları süreçler arasında böler: ağırlıklar paylaşılıyorsa toplam PSS süreç sayısıyla
+doğrusal artmaz. Karşılaştırma için `SMARTFORM_SHARED_WEIGHTS=0` ile tekrar çalıştırın.
+
+Kullanım:
+    python benchmarks/benchmark_workers.py [--workers 1 2 4] [--duration 30] [--endpoint /analyze-ai]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import subprocess
+import urllib.request
+import urllib.error
+import psutil
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+SAMPLE_FORM = {
+    "form_title": "Customer Feedback Form",
+    "questions": [{"name": "Full Name"}, {"name": "Email Address"}, {"name": "How would you rate our service?"}],
+}
+
+
+def request(url, payload=None, timeout=300):
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, ConnectionError, TimeoutError):
+        return None
+
+
+def wait_until_ready(base_url, workers, timeout):
+    """ 📌 Hangi sürece düştüğü belli olmadığından art arda birçok hazır yanıt beklenir. """
+    deadline = time.monotonic() + timeout
+    streak = 0
+    while time.monotonic() < deadline:
+        streak = streak + 1 if request(f"{base_url}/readyz", timeout=5) == 200 else 0
+        if streak >= 4 * workers:
+            return True
+        time.sleep(0.25)
+    return False
+
+
+def worker_memory(server):
+    rows = []
+    for child in psutil.Process(server.pid).children():
+        info = child.memory_full_info()
+        rows.append({"pid": child.pid, "rss_mb": info.rss / 1024 ** 2, "pss_mb": info.pss / 1024 ** 2,
+                     "uss_mb": info.uss / 1024 ** 2})
+    return rows
+
+
+def measure_throughput(url, payload, concurrency, duration):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client():
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            status = request(url, payload)
+            with lock:
+                if status == 200:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    return {
+        "requests_per_sec": len(latencies) / duration,
+        "p50_ms": 1000 * latencies[len(latencies) // 2] if latencies else 0.0,
+        "p95_ms": 1000 * latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+        "errors": errors[0],
+    }
+
+
+def run(workers, port, args):
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, "serve.py"), "--workers", str(workers),
+                               "--bind", f"127.0.0.1:{port}"], cwd=ROOT,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_until_ready(base_url, workers, args.ready_timeout):
+            print(f"🚨 {workers} süreç {args.ready_timeout} sn içinde hazır olmadı.")
+            return
+
+        memory = worker_memory(server)
+        for row in memory:
+            print(f"   pid {row['pid']}: RSS {row['rss_mb']:.0f} MB | PSS {row['pss_mb']:.0f} MB | USS {row['uss_mb']:.0f} MB")
+
+        throughput = measure_throughput(base_url + args.endpoint, SAMPLE_FORM, args.concurrency or 2 * workers, args.duration)
+        print(f"📊 workers={workers} | toplam RSS {sum(r['rss_mb'] for r in memory):.0f} MB | "
+              f"toplam PSS {sum(r['pss_mb'] for r in memory):.0f} MB | {throughput['requests_per_sec']:.2f} istek/sn | "
+              f"p50 {throughput['p50_ms']:.0f} ms | p95 {throughput['p95_ms']:.0f} ms | hata {throughput['errors']}")
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-worker memory and throughput of serve.py.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load per worker count.")
+    parser.add_argument("--concurrency", type=int, help="Concurrent clients (default: 2 per worker).")
+    parser.add_argument("--endpoint", default="/analyze-ai")
+    parser.add_argument("--port", type=int, default=5106)
+    parser.add_argument("--ready-timeout", type=float, default=900.0)
+    args = parser.parse_args()
+
+    print(f"📌 SMARTFORM_SHARED_WEIGHTS={os.getenv('SMARTFORM_SHARED_WEIGHTS', 'auto')}")
+    for workers in args.workers:
+        print(f"\n🚀 {workers} süreç")
+        run(workers, args.port, args)
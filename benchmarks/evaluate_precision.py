@@ -0,0 +1,117 @@
+"""
+📌 **Gemma hassasiyet modlarını (float32 / bfloat16 / int8) gecikme, bellek ve çıktı uyumu açısından karşılaştırır.**
+
+Prompt seti, `generate_questions`, `generate_question_from_user_input` ve `predict_intent`
+prompt'larından sabit girdilerle üretilir. float32 referans kabul edilir.
+
+Kullanım:
+    python benchmarks/evaluate_precision.py [--modes float32 bfloat16 int8] [--model google/gemma-2-2b-it]
+"""
+import os
+import sys
+import time
+import argparse
+import resource
+import torch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from model_registry import ModelRegistry
+from load_models import AIModelManager
+from question_generator import QuestionGenerator
+from form_intent import FormIntentClassifier
+
+FORM_TITLES = ["Contact Form", "Job Application Form", "Customer Feedback Form", "Appointment Request Form"]
+USER_QUESTIONS = [("Where do you live?", "Job Application Form"), ("How old are you?", "Survey Form")]
+INTENT_FORMS = [
+    ("Appointment Request Form", "", ["What is your name?", "What is your email address?", "What date would you like?"]),
+    ("", "", ["Full Name", "Email Address", "Resume", "Years of Experience"]),
+]
+
+
+def build_prompt_set():
+    """ 📌 (görev, prompt, max_new_tokens, ayrıştırıcı) dörtlüleri. """
+    prompts = []
+    for title in FORM_TITLES:
+        prompts.append(("questions", QuestionGenerator.build_questions_prompt(title, 3), 250,
+                        QuestionGenerator.parse_numbered_questions))
+    for user_question, form_purpose in USER_QUESTIONS:
+        prompts.append(("user_input", QuestionGenerator.build_user_input_prompt(user_question, form_purpose), 100,
+                        QuestionGenerator.parse_first_question))
+    for title, description, questions in INTENT_FORMS:
+        prompts.append(("intent", FormIntentClassifier.build_prompt(title, description, questions), 50,
+                        FormIntentClassifier.parse_purpose))
+    return prompts
+
+
+def max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_mode(model_id, mode, prompts):
+    rss_before = max_rss_mb()
+    started = time.perf_counter()
+    handle = ModelRegistry.acquire(model_id, kind="causal_lm", dtype=mode, device="cpu")
+    load_seconds = time.perf_counter() - started
+    model, tokenizer = handle.model, handle.tokenizer
+
+    results = []
+    for task, prompt, max_new_tokens, parser in prompts:
+        inputs = tokenizer(prompt, return_tensors="pt")
+        started = time.perf_counter()
+        with torch.no_grad():
+            output = model.generate(**inputs, max_new_tokens=max_new_tokens, do_sample=False,
+                                    pad_token_id=tokenizer.pad_token_id)
+        elapsed = time.perf_counter() - started
+        new_tokens = output[0, inputs["input_ids"].shape[1]:].tolist()
+        results.append({
+            "task": task,
+            "latency": elapsed,
+            "tokens": new_tokens,
+            "parsed": parser(tokenizer.decode(output[0], skip_special_tokens=True)),
+        })
+
+    summary = {
+        "mode": mode,
+        "load_s": load_seconds,
+        "resident_mb": handle.resident_bytes() / 1024 ** 2,
+        "max_rss_delta_mb": max_rss_mb() - rss_before,
+        "results": results,
+    }
+    ModelRegistry.release(handle)
+    return summary
+
+
+def token_agreement(reference, candidate):
+    """ 📌 Referansla ortak önek uzunluğunun referans uzunluğuna oranı. """
+    if not reference:
+        return 1.0 if not candidate else 0.0
+    common = 0
+    for a, b in zip(reference, candidate):
+        if a != b:
+            break
+        common += 1
+    return common / len(reference)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare Gemma precision modes against float32.")
+    parser.add_argument("--model", default=AIModelManager.LLM_MODEL_ID)
+    parser.add_argument("--modes", nargs="+", default=["float32", "bfloat16", "int8"])
+    args = parser.parse_args()
+
+    prompts = build_prompt_set()
+    modes = args.modes if args.modes[0] == "float32" else ["float32"] + [m for m in args.modes if m != "float32"]
+    summaries = [run_mode(args.model, mode, prompts) for mode in modes]
+    reference = summaries[0]["results"]
+
+    print(f"\n{'mode':>9} {'load s':>7} {'resident MB':>12} {'RSS Δ MB':>9} {'ms/prompt':>10} {'tok/s':>7} {'parsed =':>9} {'token agr':>10}")
+    for summary in summaries:
+        results = summary["results"]
+        total_latency = sum(r["latency"] for r in results)
+        total_tokens = sum(len(r["tokens"]) for r in results)
+        parsed_match = sum(r["parsed"] == ref["parsed"] for r, ref in zip(results, reference)) / len(results)
+        agreement = sum(token_agreement(ref["tokens"], r["tokens"]) for r, ref in zip(results, reference)) / len(results)
+        print(f"{summary['mode']:>9} {summary['load_s']:>7.1f} {summary['resident_mb']:>12.0f} {summary['max_rss_delta_mb']:>9.0f} "
+              f"{1000 * total_latency / len(results):>10.0f} {total_tokens / total_latency:>7.1f} "
+              f"{parsed_match:>8.0%} {agreement:>10.0%}")
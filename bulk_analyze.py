@@ -0,0 +1,217 @@
+"""
+📌 **SmartForm analizini (intent, geri bildirim, soru önerileri) büyük bir form derlemi üzerinde çevrimdışı çalıştırır.**
+
+- Formlar JSONL ya da Parquet dosyasından akış halinde okunur; her kayıt `/analyze-ai` gövdesiyle aynı formattadır.
+- İş, `--chunk-size` formluk parçalar halinde süreç havuzuna dağıtılır; her süreç modelleri bir kez yükler.
+- Sonuçlar girdi sırasıyla JSONL'e artımlı yazılır. Her parçadan sonra kontrol noktası güncellenir.
+  Çökme sonrası aynı komut kaldığı yerden devam eder (`--restart` baştan başlatır).
+- İlerleme satırında işlem hızı (form/sn) ve tahmini kalan süre gösterilir.
+
+Kullanım:
+    python bulk_analyze.py forms.jsonl --output results.jsonl [--workers 2] [--chunk-size 32]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+_pipeline = None
+
+
+def _init_worker():
+    """
+    📌 Her süreçte modeller bir kez yüklenir. `SMARTFORM_WORKERS` sayesinde CPU çekirdekleri süreçler arasında
+    paylaştırılır ve ağırlıklar safetensors dosyasından eşlenerek süreçler arasında tek kopya tutulur.
+    """
+    global _pipeline
+    from form_intent import FormIntentClassifier, IntentCascade
+    from question_generator import QuestionGenerator
+    from form_feedback import FormFeedbackGenerator
+    from analysis_pipeline import AnalysisPipeline
+
+    _pipeline = AnalysisPipeline(IntentCascade(FormIntentClassifier()), QuestionGenerator(), FormFeedbackGenerator())
+
+
+def _analyze_chunk(first_index, records):
+    """
+    📌 Parçayı tek batch olarak analiz eder. Batch beklenmedik bir hatayla düşerse kayıtlar tek tek denenir;
+    sorunlu kayıt `status: error` olarak yazılır ve parça yine tamamlanır (kontrol noktası ilerler).
+    """
+    try:
+        results = _pipeline.analyze_batch(records)
+    except Exception as e:
+        print(f"🚨 {first_index}. kayıttan başlayan parça toplu analiz edilemedi, kayıtlar tek tek deneniyor: {e}")
+        results = [_analyze_record(record) for record in records]
+    for offset, (record, result) in enumerate(zip(records, results)):
+        result["index"] = first_index + offset
+        if isinstance(record, dict) and record.get("id") is not None:
+            result["id"] = record["id"]
+    return results
+
+
+def _analyze_record(record):
+    try:
+        return _pipeline.analyze_batch([record])[0]
+    except Exception as e:
+        return {"status": "error", "error": f"{type(e).__name__}: {e}"}
+
+
+def iter_records(path):
+    """ 📌 Girdi dosyasındaki formları sırayla (bellekte tutmadan) döndürür. """
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=1024):
+            yield from batch.to_pylist()
+        return
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # 📌 Bozuk satır, çıktıda hata olarak raporlanır
+                yield None
+
+
+def count_records(path):
+    """ 📌 ETA için toplam kayıt sayısı (Parquet'te meta veriden, JSONL'de satır sayımıyla). """
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).metadata.num_rows
+
+    total = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                total += 1
+    return total
+
+
+def iter_chunks(records, chunk_size, skip):
+    chunk = []
+    first_index = skip
+    for index, record in enumerate(records):
+        if index < skip:
+            continue
+        chunk.append(record)
+        if len(chunk) == chunk_size:
+            yield first_index, chunk
+            first_index += len(chunk)
+            chunk = []
+    if chunk:
+        yield first_index, chunk
+
+
+def load_checkpoint(checkpoint_path, input_path):
+    if not os.path.exists(checkpoint_path):
+        return None
+    with open(checkpoint_path, "r", encoding="utf-8") as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("input") != os.path.abspath(input_path):
+        raise ValueError(f"Checkpoint {checkpoint_path} belongs to a different input: {checkpoint.get('input')}")
+    return checkpoint
+
+
+def save_checkpoint(checkpoint_path, input_path, records_done, output_bytes):
+    tmp_path = checkpoint_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"input": os.path.abspath(input_path), "records_done": records_done, "output_bytes": output_bytes}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, checkpoint_path)
+
+
+def format_eta(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def run(input_path, output_path, workers, chunk_size, checkpoint_path=None, restart=False):
+    checkpoint_path = checkpoint_path or output_path + ".checkpoint"
+    checkpoint = None if restart else load_checkpoint(checkpoint_path, input_path)
+    if checkpoint and not os.path.exists(output_path):
+        print(f"⚠️ Kontrol noktası var ama {output_path} bulunamadı; baştan başlanıyor.")
+        checkpoint = None
+    records_done = checkpoint["records_done"] if checkpoint else 0
+    output_bytes = checkpoint["output_bytes"] if checkpoint else 0
+
+    # 📌 Kontrol noktasından sonra yarım kalmış yazımlar atılır
+    mode = "r+b" if checkpoint else "wb"
+    output = open(output_path, mode)
+    output.truncate(output_bytes)
+    output.seek(output_bytes)
+
+    total = count_records(input_path)
+    if records_done:
+        print(f"📌 **Kontrol noktasından devam ediliyor: {records_done}/{total} form tamamlanmış.**")
+
+    os.environ["SMARTFORM_WORKERS"] = str(workers)
+    context = multiprocessing.get_context("spawn")
+    started = time.monotonic()
+    processed = 0
+    status_counts = {"ok": 0, "partial": 0, "error": 0}
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker) as pool:
+        chunks = iter_chunks(iter_records(input_path), chunk_size, records_done)
+        in_flight = deque()
+        # 📌 Bellek sınırlı kalsın diye süreç başına en fazla iki parça beklemede tutulur
+        max_in_flight = workers * 2
+
+        while True:
+            while len(in_flight) < max_in_flight:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                in_flight.append(pool.submit(_analyze_chunk, *chunk))
+            if not in_flight:
+                break
+
+            # 📌 Parçalar girdi sırasıyla yazılır; kontrol noktası her zaman kesintisiz bir öneki gösterir
+            results = in_flight.popleft().result()
+            for result in results:
+                output.write((json.dumps(result, ensure_ascii=False) + "\n").encode("utf-8"))
+                status_counts[result["status"]] += 1
+            output.flush()
+            os.fsync(output.fileno())
+
+            records_done += len(results)
+            processed += len(results)
+            save_checkpoint(checkpoint_path, input_path, records_done, output.tell())
+
+            elapsed = time.monotonic() - started
+            rate = processed / elapsed if elapsed else 0.0
+            eta = format_eta((total - records_done) / rate) if rate else "--:--:--"
+            print(f"📊 {records_done}/{total} form | {rate:.2f} form/sn | ETA {eta} | "
+                  f"ok={status_counts['ok']} partial={status_counts['partial']} error={status_counts['error']}",
+                  flush=True)
+
+    output.close()
+    elapsed = time.monotonic() - started
+    print(f"✅ **Tamamlandı: {processed} form {elapsed:.1f} sn'de işlendi "
+          f"({processed / elapsed if elapsed else 0.0:.2f} form/sn) → {output_path}**")
+    return records_done
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the SmartForm analysis pipeline over a JSONL/Parquet corpus of forms.")
+    parser.add_argument("input", help="Forms as JSONL or .parquet; each record has the /analyze-ai request body.")
+    parser.add_argument("--output", required=True, help="Results JSONL (one line per input form, in input order).")
+    parser.add_argument("--workers", type=int, default=2, help="Worker processes; each loads its own models.")
+    parser.add_argument("--chunk-size", type=int, default=32, help="Forms per task; LLM prompts within a chunk are batched.")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint).")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint and start over.")
+    args = parser.parse_args()
+
+    try:
+        run(args.input, args.output, args.workers, args.chunk_size, args.checkpoint, args.restart)
+    except KeyboardInterrupt:
+        print("\n⚠️ Durduruldu; aynı komutla kaldığı yerden devam edebilirsiniz.")
+        sys.exit(130)
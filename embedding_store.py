@@ -0,0 +1,190 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# 📌 Anahtar dosyasında satır başına kayıt: sha1 özeti (ham bayt)
+KEY_BYTES = 20
+
+
+def normalize_question(text):
+    """
+    📌 Embedding anahtarı için soru metnini sadeleştirir.
+    MiniLM tokenizer'ı büyük/küçük harf ayırmadığı için küçük harfe çevirmek embedding'i değiştirmez.
+    """
+    return " ".join(str(text).split()).lower()
+
+
+class EmbeddingStore:
+    """
+    📌 **Soru metinleri için içerik adresli (model adı + normalize metin) embedding deposu.**
+    - 1. katman: süreç içi LRU.
+    - 2. katman: diskte bellek eşlemeli (memmap) float32 matris + sabit genişlikli, yalnızca eklenen anahtar dosyası
+      (i. kayıt matrisin i. satırı). Worker'lar aynı dosyayı eşlediği için embedding'ler kopyalanmadan paylaşılır;
+      her worker anahtar dosyasının yalnızca son okuduğu yerden sonrasını okur, ekleme maliyeti depo boyutundan bağımsızdır.
+    - Sadece hiçbir katmanda bulunmayan metinler tek batch'te encode edilir.
+    """
+
+    def __init__(self, model, model_name, cache_dir=None, lru_size=None):
+        self.model = model
+        self.model_name = model_name
+        self.lru_size = lru_size or int(os.getenv("SMARTFORM_EMBEDDING_LRU_SIZE", "10000"))
+
+        if cache_dir is None and os.getenv("SMARTFORM_CACHE_DIR"):
+            cache_dir = os.path.join(os.getenv("SMARTFORM_CACHE_DIR"), "embeddings")
+        self.cache_dir = cache_dir
+
+        self._lru = OrderedDict()
+        self._lock = threading.RLock()
+        self.stats = {"lru_hits": 0, "disk_hits": 0, "misses": 0}
+
+        self.dim = None
+        self._index = {}
+        self._rows = 0
+        self._matrix = None
+        if self.cache_dir:
+            safe_name = model_name.replace("/", "__")
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self.matrix_path = os.path.join(self.cache_dir, f"{safe_name}.f32")
+            self.meta_path = os.path.join(self.cache_dir, f"{safe_name}.meta.json")
+            self.keys_path = os.path.join(self.cache_dir, f"{safe_name}.keys")
+            self.lock_path = os.path.join(self.cache_dir, f"{safe_name}.lock")
+            self._refresh_disk_index()
+
+    def _key(self, text):
+        return hashlib.sha1(f"{self.model_name}\x00{normalize_question(text)}".encode("utf-8")).digest()
+
+    # ------------------------------------------------------------------
+    # Disk katmanı
+    # ------------------------------------------------------------------
+    def _refresh_disk_index(self):
+        """ 📌 Başka bir worker yeni satır eklediyse anahtar dosyasının yalnızca yeni kısmını okur ve memmap'i büyütür. """
+        if self.dim is None:
+            if not os.path.exists(self.meta_path):
+                return
+            try:
+                with open(self.meta_path, "r") as file:
+                    self.dim = json.load(file)["dim"]
+            except Exception as e:
+                print(f"🚨 Embedding deposu meta bilgisi okunamadı: {e}")
+                return
+
+        try:
+            size = os.path.getsize(self.keys_path)
+        except OSError:
+            return
+        # 📌 Yarım yazılmış son kayıt (varsa) sayılmaz
+        if size // KEY_BYTES <= self._rows:
+            return
+
+        with open(self.keys_path, "rb") as file:
+            file.seek(self._rows * KEY_BYTES)
+            data = file.read((size // KEY_BYTES - self._rows) * KEY_BYTES)
+        new_rows = len(data) // KEY_BYTES
+        for i in range(new_rows):
+            self._index.setdefault(data[i * KEY_BYTES:(i + 1) * KEY_BYTES], self._rows + i)
+        self._rows += new_rows
+        self._matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r", shape=(self._rows, self.dim))
+
+    def _append_to_disk(self, keys, vectors):
+        if fcntl is None:
+            return
+        with open(self.lock_path, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                # 📌 Kilit alındıktan sonra başka worker'ların eklediklerini gör
+                self._refresh_disk_index()
+                if self.dim is None:
+                    self.dim = vectors.shape[1]
+                    tmp_path = f"{self.meta_path}.tmp"
+                    with open(tmp_path, "w") as file:
+                        json.dump({"model": self.model_name, "dim": self.dim}, file)
+                    os.replace(tmp_path, self.meta_path)
+
+                new_rows = [(k, v) for k, v in zip(keys, vectors) if k not in self._index]
+                if not new_rows:
+                    return
+
+                # 📌 Çöken bir yazıcıdan kalmış yarım anahtar kaydı varsa atılır; kayıtlar satırlarla hizalı kalır
+                if os.path.exists(self.keys_path) and os.path.getsize(self.keys_path) != self._rows * KEY_BYTES:
+                    os.truncate(self.keys_path, self._rows * KEY_BYTES)
+
+                # 📌 Okuyucular anahtarı görünce satırın hazır olması için önce satırlar, sonra anahtarlar yazılır
+                with open(self.matrix_path, "r+b" if os.path.exists(self.matrix_path) else "wb") as matrix_file:
+                    matrix_file.seek(self._rows * self.dim * 4)
+                    matrix_file.write(b"".join(np.asarray(vector, dtype=np.float32).tobytes() for _, vector in new_rows))
+                with open(self.keys_path, "ab") as keys_file:
+                    keys_file.write(b"".join(key for key, _ in new_rows))
+                self._refresh_disk_index()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # ------------------------------------------------------------------
+    # LRU katmanı
+    # ------------------------------------------------------------------
+    def _remember(self, key, vector):
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # Dış arayüz
+    # ------------------------------------------------------------------
+    def encode(self, texts):
+        """ 📌 **Metinlerin embedding'lerini (n, dim) float32 matris olarak döndürür.** """
+        keys = [self._key(t) for t in texts]
+        vectors = [None] * len(texts)
+        missing = OrderedDict()
+
+        with self._lock:
+            if self.cache_dir:
+                self._refresh_disk_index()
+
+            for position, key in enumerate(keys):
+                vector = self._lru.get(key)
+                if vector is not None:
+                    self._lru.move_to_end(key)
+                    self.stats["lru_hits"] += 1
+                elif key in self._index and self._matrix is not None:
+                    vector = self._matrix[self._index[key]]
+                    self._remember(key, vector)
+                    self.stats["disk_hits"] += 1
+                else:
+                    missing.setdefault(key, []).append(position)
+                    continue
+                vectors[position] = vector
+
+        if missing:
+            first_positions = [positions[0] for positions in missing.values()]
+            encoded = np.asarray(self.model.encode([texts[p] for p in first_positions]), dtype=np.float32)
+
+            with self._lock:
+                self.stats["misses"] += len(missing)
+                for (key, positions), vector in zip(missing.items(), encoded):
+                    self._remember(key, vector)
+                    for position in positions:
+                        vectors[position] = vector
+
+            if self.cache_dir:
+                try:
+                    with self._lock:
+                        self._append_to_disk(list(missing.keys()), encoded)
+                except Exception as e:
+                    print(f"🚨 Embedding'ler diske yazılamadı: {e}")
+
+        return np.stack(vectors) if vectors else np.zeros((0, self.dim or 0), dtype=np.float32)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["lru_entries"] = len(self._lru)
+            stats["disk_entries"] = len(self._index)
+        return stats
@@ -0,0 +1,87 @@
+"""
+📌 **DistilBERT form sınıflandırıcısını ve MiniLM embedder'ını optimize CPU grafiklerine (TorchScript / ONNX) aktarır.**
+
+Her dışa aktarımdan sonra eager PyTorch çıktılarıyla karşılaştırılır (parity). Fark eşiği aşılırsa çıkış kodu 1 olur.
+Uygulama `SMARTFORM_INFERENCE_BACKEND=torchscript|onnx` (ve int8 için `SMARTFORM_EXPORT_INT8=1`) ile bu dosyalara geçer.
+
+Kullanım:
+    python export_models.py --backend onnx [--int8] [--out-dir models/exported] [--only classifier|embedder]
+"""
+import os
+import sys
+import argparse
+import numpy as np
+from model_registry import ModelRegistry
+from load_models import AIModelManager
+from inference_backends import (ExportedClassifier, ExportedEmbedder, TorchClassifier, export_classifier,
+                                export_embedder, check_parity)
+
+PARITY_TEXTS = [
+    "What is your email address?",
+    "Full Name",
+    "Please describe the reason for your appointment request in as much detail as possible.",
+    "Would you recommend our service to a friend or colleague?",
+    "Years of Experience",
+    "Upload your resume",
+]
+
+# 📌 float32 grafikler eager ile (neredeyse) birebir aynı olmalı; int8'de yön (kosinüs) korunmalı
+FLOAT_ATOL = {"classifier": 1e-3, "embedder": 1e-4}
+INT8_MIN_COSINE = 0.98
+
+
+def export_and_check_classifier(out_dir, backend, int8):
+    handle = ModelRegistry.acquire(AIModelManager.get_form_classifier_path(), kind="sequence_classifier",
+                                   dtype="float32", device="cpu")
+    path = export_classifier(handle.model, handle.tokenizer, out_dir, backend, int8)
+
+    reference = TorchClassifier(handle.model, handle.tokenizer).predict_proba(PARITY_TEXTS)
+    candidate = ExportedClassifier(path).predict_proba(PARITY_TEXTS)
+    parity = check_parity(reference, candidate, FLOAT_ATOL["classifier"])
+    parity["label_agreement"] = float((reference.argmax(axis=1) == candidate.argmax(axis=1)).mean())
+    if int8:
+        parity["ok"] = parity["label_agreement"] == 1.0
+    ModelRegistry.release(handle)
+    return path, parity
+
+
+def export_and_check_embedder(out_dir, backend, int8):
+    handle = ModelRegistry.acquire(AIModelManager.SIMILARITY_MODEL_ID, kind="sentence_transformer",
+                                   dtype="float32", device="cpu")
+    path = export_embedder(handle.model, out_dir, backend, int8)
+
+    reference = np.asarray(handle.model.encode(PARITY_TEXTS), dtype=np.float32)
+    candidate = ExportedEmbedder(path).encode(PARITY_TEXTS)
+    parity = check_parity(reference, candidate, FLOAT_ATOL["embedder"])
+    if int8:
+        parity["ok"] = parity["min_cosine"] >= INT8_MIN_COSINE
+    ModelRegistry.release(handle)
+    return path, parity
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the form classifier and embedder to TorchScript/ONNX.")
+    parser.add_argument("--backend", choices=["torchscript", "onnx"], default="onnx")
+    parser.add_argument("--int8", action="store_true", help="Apply dynamic int8 quantization to Linear layers.")
+    parser.add_argument("--out-dir", default=os.getenv("SMARTFORM_EXPORT_DIR", "models/exported"))
+    parser.add_argument("--only", choices=["classifier", "embedder"])
+    args = parser.parse_args()
+
+    exports = []
+    if args.only in (None, "classifier"):
+        if os.path.isdir(AIModelManager.get_form_classifier_path()):
+            exports.append(("classifier", export_and_check_classifier))
+        else:
+            print(f"⚠️ Sınıflandırıcı bulunamadı ({AIModelManager.get_form_classifier_path()}), atlanıyor.")
+    if args.only in (None, "embedder"):
+        exports.append(("embedder", export_and_check_embedder))
+
+    failed = False
+    for name, export in exports:
+        path, parity = export(args.out_dir, args.backend, args.int8)
+        status = "✅" if parity["ok"] else "🚨"
+        print(f"{status} {name}: {path} | max |Δ| {parity['max_abs_diff']:.2e} | min cos {parity['min_cosine']:.5f}"
+              + (f" | label agreement {parity['label_agreement']:.0%}" if "label_agreement" in parity else ""))
+        failed = failed or not parity["ok"]
+
+    sys.exit(1 if failed else 0)
@@ -1,15 +1,26 @@
 
 import re
-from sentence_transformers import SentenceTransformer, util
+import torch
+import torch.nn.functional as F
+from load_models import AIModelManager
+from embedding_store import EmbeddingStore
+import form_rules
+from single_flight import SingleFlight, canonical_key
+from scheduling import deadline_expired
 import logging
 
 logger = logging.getLogger(__name__)
 
 class FormFeedbackGenerator:
+    max_question_length = form_rules.MAX_QUESTION_LENGTH
+    similarity_threshold = 0.85
+    flight = SingleFlight("feedback")
+
     def __init__(self):
         try:
-            self.similarity_model = SentenceTransformer("all-MiniLM-L6-v2")
-            self.max_question_length = 80  
+            self._model_handle = AIModelManager.acquire_similarity_model()
+            self.similarity_model = self._model_handle.model
+            self.embedding_store = EmbeddingStore(self.similarity_model, AIModelManager.similarity_model_name(self._model_handle))
             logger.info("✅ NLP Model Successfully Loaded.")
         except Exception as e:
             logger.error(f"🚨 Error loading NLP model: {e}")
@@ -17,56 +28,68 @@ class FormFeedbackGenerator:
 
     def detect_long_questions(self, questions):
         """ 📌 **Uzun soruları tespit edip daha kısa versiyon önerir.** """
-        suggestions = []
-        for q in questions:
-            if len(q) > self.max_question_length:
-                suggestions.append(f"⚠ Question '{q[:50]}...' is too long. Consider making it more concise.")
-        return suggestions
-
-    def detect_redundant_questions(self, questions):
-        """ 📌 **Benzer veya yinelenen soruları tespit eder.** """
+        return form_rules.detect_long_questions(questions, self.max_question_length)
+
+    def detect_redundant_questions(self, questions, embeddings=None):
+        """
+        📌 **Benzer veya yinelenen soruları tespit eder.**
+        `embeddings` verilirse (toplu analizde önceden hesaplanmış) tekrar encode edilmez.
+        """
         if not self.similarity_model or not questions:
             return ["⚠ Similarity analysis is unavailable due to a model loading error."]
 
         redundant_suggestions = []
-        question_embeddings = self.similarity_model.encode(questions, convert_to_tensor=True)
+        if embeddings is None:
+            # 📌 Sık tekrarlanan sorular ("Email Address" vb.) önbellekten gelir, sadece yeniler encode edilir
+            embeddings = self.embedding_store.encode(questions)
+        question_embeddings = F.normalize(torch.from_numpy(embeddings), dim=1)
 
-        for i in range(len(questions)):
-            for j in range(i + 1, len(questions)):
-                similarity = util.pytorch_cos_sim(question_embeddings[i], question_embeddings[j]).item()
-                if similarity > 0.85:
-                    redundant_suggestions.append(f"⚠ '{questions[i]}' and '{questions[j]}' are too similar. Consider merging or removing one.")
+        for i, j in self.find_similar_pairs(question_embeddings, self.similarity_threshold):
+            redundant_suggestions.append(f"⚠ '{questions[i]}' and '{questions[j]}' are too similar. Consider merging or removing one.")
 
         return redundant_suggestions
 
+    @staticmethod
+    def find_similar_pairs(embeddings, threshold=0.85, chunk_size=512):
+        """
+        📌 **Normalize edilmiş embedding'ler arasında benzerliği eşiği aşan (i, j) çiftlerini bulur (i < j).**
+        - Tüm benzerlikler tek matris çarpımıyla hesaplanır; satırlar parça parça işlenerek
+          bellek kullanımı `chunk_size x n` ile sınırlı tutulur.
+        - Çiftler, eski çift döngüyle aynı sırada (önce i, sonra j artan) döner.
+        """
+        n = embeddings.shape[0]
+        pairs = []
+        for start in range(0, n, chunk_size):
+            end = min(start + chunk_size, n)
+            similarities = embeddings[start:end] @ embeddings.T
+
+            # 📌 Sadece üst üçgen (j > i) kalsın
+            rows = torch.arange(start, end, device=similarities.device).unsqueeze(1)
+            cols = torch.arange(n, device=similarities.device).unsqueeze(0)
+            mask = (similarities > threshold) & (cols > rows)
+
+            # 📌 Cihaz senkronizasyonu parça başına bir kez yapılır
+            for i, j in mask.nonzero().tolist():
+                pairs.append((start + i, j))
+        return pairs
+
     def detect_missing_questions(self, categorized_fields):
         """ 📌 **Eksik olabilecek soruları belirler.** """
-        missing_suggestions = []
-        required_fields = {"email", "phone", "address", "zip"}
-
-        existing_fields = {field["field_name"].lower() for field in categorized_fields}
-        missing_fields = required_fields - existing_fields
-
-        for field in missing_fields:
-            missing_suggestions.append(f"⚠ Consider adding a '{field}' field to ensure completeness.")
-
-        return missing_suggestions
+        return form_rules.detect_missing_questions(categorized_fields)
 
     def analyze_question_flow(self, questions):
         """ 📌 **Soruların mantıksal sırasını değerlendirir.** """
-        if not questions:
-            return ["⚠ Question flow analysis unavailable."]
-
-        flow_suggestions = []
-        personal_info = {"name", "email", "phone", "address"}
-        personal_questions = [q for q in questions if any(info in q.lower() for info in personal_info)]
-        if not personal_questions:
-            flow_suggestions.append("⚠ Consider adding basic personal information questions at the beginning.")
+        return form_rules.analyze_question_flow(questions)
 
-        return flow_suggestions
+    def generate_feedback(self, questions, categorized_fields, embeddings=None):
+        """
+        📌 **Form için AI destekli geri bildirim üretir.**
+        Aynı sorular için eşzamanlı gelen çağrılar tek hesaplamada birleştirilir.
+        """
+        key = canonical_key(questions, categorized_fields)
+        return self.flight.do(key, lambda: self._generate_feedback(questions, categorized_fields, embeddings))
 
-    def generate_feedback(self, questions, categorized_fields):
-        """ 📌 **Form için AI destekli geri bildirim üretir.** """
+    def _generate_feedback(self, questions, categorized_fields, embeddings=None):
         feedback = []
 
         if not questions:
@@ -75,9 +98,14 @@ class FormFeedbackGenerator:
         if not categorized_fields:
             return ["⚠ No categorized fields found. Check the form structure."]
 
+        # 📌 Son tarih geçtiyse gömme modeli çağrılmaz, kural tabanlı kontroller döner
+        if deadline_expired():
+            print("⏱️ Geri bildirim son tarihe yetişemedi, kural tabanlı kontroller kullanılıyor.")
+            return form_rules.rule_based_feedback(questions, categorized_fields)
+
         # Run feedback checks
         feedback.extend(self.detect_long_questions(questions))
-        feedback.extend(self.detect_redundant_questions(questions))
+        feedback.extend(self.detect_redundant_questions(questions, embeddings))
         feedback.extend(self.detect_missing_questions(categorized_fields))
         feedback.extend(self.analyze_question_flow(questions))
 
@@ -87,3 +115,22 @@ class FormFeedbackGenerator:
             return ["⚠ AI could not generate meaningful feedback. Check if the input data is correct."]
 
         return feedback
+
+    def generate_feedback_batch(self, forms):
+        """
+        📌 **Birden fazla form için geri bildirim üretir; tüm sorular tek bir encode çağrısıyla gömülür.**
+        `forms`: (sorular, kategorize alanlar) çiftleri. Dönüş: her form için geri bildirim listesi.
+        """
+        embeddings = None
+        if self.similarity_model:
+            all_questions = [q for questions, _ in forms for q in questions]
+            if all_questions:
+                embeddings = self.embedding_store.encode(all_questions)
+
+        results = []
+        offset = 0
+        for questions, categorized_fields in forms:
+            form_embeddings = embeddings[offset:offset + len(questions)] if embeddings is not None else None
+            offset += len(questions)
+            results.append(self.generate_feedback(questions, categorized_fields, form_embeddings))
+        return results
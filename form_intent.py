@@ -1,12 +1,40 @@
 # type: ignore
 from load_models import AIModelManager
-import torch
+from batch_engine import BatchingEngine
+from response_cache import SemanticCache
+from stream_parsers import PurposeLineParser
+from inference_backends import TorchClassifier
+from single_flight import SingleFlight, canonical_key
+import os
+import threading
 
 class FormIntentClassifier:
     def __init__(self):
         """ 📌 AI Modelini `load_models.py` içinden alır. Model zaten yüklenmişse tekrar yüklemez. """
-        self.model, self.tokenizer = AIModelManager.get_intent_classifier()
-        self.device = AIModelManager.get_device()
+        self._model_handle = AIModelManager.acquire_llm()
+        self.model, self.tokenizer = self._model_handle.model, self._model_handle.tokenizer
+        self.device = self._model_handle.device
+        self.engine = BatchingEngine.for_model(self._model_handle)
+        self.intent_cache = SemanticCache("form_intent")
+
+    @staticmethod
+    def build_prompt(form_title, form_description, form_questions):
+        """ 📌 Form başlığı, açıklaması ve sorular ile prompt oluşturur. """
+        prompt = f"Analyze the following form and determine its purpose:\n\n"
+        if form_title:
+            prompt += f"Form Title: {form_title}\n"
+        if form_description:
+            prompt += f"Form Description: {form_description}\n"
+        if form_questions:
+            formatted_questions = "\n".join(form_questions)
+            prompt += f"Form Questions:\n{formatted_questions}\n"
+        prompt += "Purpose:"
+        return prompt
+
+    @staticmethod
+    def parse_purpose(generated_text):
+        """ 📌 Model çıktısından "Purpose:" sonrasındaki ilk satırı alır. """
+        return generated_text.split("Purpose:")[-1].strip().split("\n")[0]
 
     def predict_intent(self, form_title, form_description, form_questions):
         """
@@ -16,36 +44,130 @@ class FormIntentClassifier:
 
         try:
             # **📌 Form başlığı, açıklaması ve sorular ile prompt oluştur**
-            prompt = f"Analyze the following form and determine its purpose:\n\n"
-            if form_title:
-                prompt += f"Form Title: {form_title}\n"
-            if form_description:
-                prompt += f"Form Description: {form_description}\n"
-            if form_questions:
-                formatted_questions = "\n".join(form_questions)
-                prompt += f"Form Questions:\n{formatted_questions}\n"
-            prompt += "Purpose:"
+            prompt = self.build_prompt(form_title, form_description, form_questions)
+
+            # **📌 Aynı/benzer form için tahmin önbellekte varsa modeli çağırma**
+            cache_key = "\n".join([form_title or "", form_description or ""] + list(form_questions or []))
+            cached_purpose = self.intent_cache.get(cache_key)
+            if cached_purpose is not None:
+                print(f"📌 **AI Predicted Purpose (cache):** {cached_purpose}")
+                return cached_purpose
 
             print(f"📌 **AI'ya Gönderilen Prompt:**\n{prompt}")
 
             # **📌 Modelden Yanıt Al**
-            inputs = self.tokenizer(prompt, return_tensors="pt").to(self.device)
-            
-            with torch.no_grad():
-                outputs = self.model.generate(**inputs, max_new_tokens=50)
-            
-            generated_text = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
+            generated_text = self.engine.generate(prompt, task="intent", stop=PurposeLineParser(), max_new_tokens=50)
             
             # **📌 Çıktıyı Temizle ve Sadece İlk Cümleyi Al**
-            predicted_purpose = generated_text.split("Purpose:")[-1].strip().split("\n")[0]
+            predicted_purpose = self.parse_purpose(generated_text)
 
             print(f"📌 **AI Predicted Purpose:** {predicted_purpose}")
+            if predicted_purpose:
+                self.intent_cache.put(cache_key, predicted_purpose)
             return predicted_purpose
 
         except Exception as e:
             print(f"🚨 AI çağrısı sırasında hata oluştu: {e}")
             return "Unknown"
 
+
+class FastIntentClassifier:
+    """
+    📌 **`models/form_classifier` altındaki DistilBERT sınıflandırıcısıyla milisaniyeler içinde tahmin yapar.**
+    Model bulunamazsa `available` False olur ve tüm istekler Gemma'ya gider.
+    """
+
+    def __init__(self):
+        self._model_handle = None
+        self.classifier = None
+        try:
+            if AIModelManager.get_exported_artifact("form_classifier") is None and not os.path.isdir(AIModelManager.get_form_classifier_path()):
+                print(f"⚠️ **Hızlı intent sınıflandırıcısı bulunamadı ({AIModelManager.get_form_classifier_path()}), sadece Gemma kullanılacak.**")
+                return
+            self._model_handle = AIModelManager.acquire_form_classifier()
+            if self._model_handle.kind == "exported_classifier":
+                self.classifier = self._model_handle.model
+            else:
+                self.classifier = TorchClassifier(self._model_handle.model, self._model_handle.tokenizer)
+        except Exception as e:
+            print(f"🚨 Hızlı intent sınıflandırıcısı yüklenemedi: {e}")
+
+    @property
+    def available(self):
+        return self.classifier is not None
+
+    @staticmethod
+    def build_text(form_title, form_description, form_questions):
+        """ 📌 Başlık, açıklama ve soruları tek bir girdi metnine çevirir. """
+        parts = [form_title or "", form_description or ""] + list(form_questions or [])
+        return "\n".join(part for part in parts if part)
+
+    def predict(self, form_title, form_description, form_questions):
+        """ 📌 (etiket, güven) döndürür. """
+        text = self.build_text(form_title, form_description, form_questions)
+        probabilities = self.classifier.predict_proba([text])[0]
+        index = int(probabilities.argmax())
+        return self.classifier.labels[index], float(probabilities[index])
+
+
+class IntentCascade:
+    """
+    📌 **Intent tahmini için iki kademeli zincir: önce DistilBERT, emin olamazsa Gemma.**
+    - Hızlı sınıflandırıcının güveni `SMARTFORM_INTENT_CONFIDENCE` (varsayılan 0.8) üstündeyse cevap odur.
+    - Aksi halde `FormIntentClassifier.predict_intent` çağrılır.
+    - Her kademenin kaç kez cevap verdiği sayılır.
+    """
+
+    def __init__(self, llm_classifier, fast_classifier=None, confidence_threshold=None):
+        self.llm = llm_classifier
+        self.fast = fast_classifier if fast_classifier is not None else FastIntentClassifier()
+        self.confidence_threshold = confidence_threshold if confidence_threshold is not None else float(os.getenv("SMARTFORM_INTENT_CONFIDENCE", "0.8"))
+        self._lock = threading.Lock()
+        self.stats = {"fast": 0, "llm": 0, "fast_errors": 0}
+        self.flight = SingleFlight("intent")
+
+    @property
+    def intent_cache(self):
+        return self.llm.intent_cache
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def predict_intent(self, form_title, form_description, form_questions):
+        """
+        📌 **Formun amacını önce hızlı sınıflandırıcıyla, gerekirse Gemma ile tahmin eder.**
+        Aynı form için eşzamanlı gelen çağrılar tek tahminde birleştirilir.
+        """
+        key = canonical_key(form_title, form_description, list(form_questions or []))
+        return self.flight.do(key, lambda: self._predict_intent(form_title, form_description, form_questions))
+
+    def _predict_intent(self, form_title, form_description, form_questions):
+        if self.fast.available:
+            try:
+                label, confidence = self.fast.predict(form_title, form_description, form_questions)
+                if confidence >= self.confidence_threshold:
+                    print(f"📌 **Intent (DistilBERT, {confidence:.2f}):** {label}")
+                    self._count("fast")
+                    return label
+                print(f"📌 DistilBERT güveni düşük ({confidence:.2f}), Gemma'ya yönlendiriliyor.")
+            except Exception as e:
+                print(f"🚨 Hızlı intent sınıflandırması başarısız: {e}")
+                self._count("fast_errors")
+
+        self._count("llm")
+        return self.llm.predict_intent(form_title, form_description, form_questions)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        answered = stats["fast"] + stats["llm"]
+        stats["fast_ratio"] = round(stats["fast"] / answered, 3) if answered else 0.0
+        stats["fast_available"] = self.fast.available
+        stats["confidence_threshold"] = self.confidence_threshold
+        return stats
+
+
 # **✅ Test için bağımsız kod**
 if __name__ == "__main__":
     classifier = FormIntentClassifier()
@@ -0,0 +1,89 @@
+"""
+📌 **Model gerektirmeyen, kural tabanlı form kontrolleri ve varsayılan sorular.**
+Modeller henüz yüklenmemişken (ya da yüklenemediğinde) API bu kurallarla yanıt verir;
+bu yüzden modül torch / transformers içe aktarmaz.
+"""
+
+MAX_QUESTION_LENGTH = 80
+REQUIRED_FIELDS = {"email", "phone", "address", "zip"}
+PERSONAL_INFO = {"name", "email", "phone", "address"}
+
+FALLBACK_QUESTIONS = {
+    "Appointment Request Form": [
+        "1. What is the purpose of your appointment?",
+        "2. What date and time are you available?",
+        "3. Do you have any special requests for the appointment?"
+    ],
+    "Customer Feedback Form": [
+        "1. How would you rate our service?",
+        "2. What can we improve?",
+        "3. Would you recommend us to others?"
+    ],
+    "Job Application Form": [
+        "1. What is your highest level of education?",
+        "2. Do you have relevant work experience for this position?",
+        "3. Why do you want to work for our company?"
+    ],
+    "Survey Form": [
+        "1. How frequently do you use our service?",
+        "2. What features do you find most valuable?",
+        "3. What improvements would you suggest?"
+    ]
+}
+DEFAULT_FALLBACK_QUESTIONS = ["1. What information would you like to provide?", "2. What is your main concern?", "3. How can we assist you?"]
+
+
+def detect_long_questions(questions, max_length=MAX_QUESTION_LENGTH):
+    """ 📌 **Uzun soruları tespit edip daha kısa versiyon önerir.** """
+    suggestions = []
+    for q in questions:
+        if len(q) > max_length:
+            suggestions.append(f"⚠ Question '{q[:50]}...' is too long. Consider making it more concise.")
+    return suggestions
+
+
+def detect_missing_questions(categorized_fields):
+    """ 📌 **Eksik olabilecek soruları belirler.** """
+    missing_suggestions = []
+    existing_fields = {field["field_name"].lower() for field in categorized_fields}
+    missing_fields = REQUIRED_FIELDS - existing_fields
+
+    for field in missing_fields:
+        missing_suggestions.append(f"⚠ Consider adding a '{field}' field to ensure completeness.")
+
+    return missing_suggestions
+
+
+def analyze_question_flow(questions):
+    """ 📌 **Soruların mantıksal sırasını değerlendirir.** """
+    if not questions:
+        return ["⚠ Question flow analysis unavailable."]
+
+    flow_suggestions = []
+    personal_questions = [q for q in questions if any(info in q.lower() for info in PERSONAL_INFO)]
+    if not personal_questions:
+        flow_suggestions.append("⚠ Consider adding basic personal information questions at the beginning.")
+
+    return flow_suggestions
+
+
+def get_fallback_questions(form_category):
+    """ 📌 **Form başlığına uygun varsayılan sorular (AI uygun soru üretemezse ya da model hazır değilse).** """
+    return FALLBACK_QUESTIONS.get(form_category, DEFAULT_FALLBACK_QUESTIONS)
+
+
+def fallback_question_variants(form_purpose):
+    """ 📌 **Soru asistanı için numarasız varsayılan sorular (son tarih kaçırılırsa ya da model hazır değilse).** """
+    return [q.split('. ', 1)[-1].strip() for q in get_fallback_questions(form_purpose)]
+
+
+def rule_based_feedback(questions, categorized_fields):
+    """ 📌 **Benzerlik modeli olmadan üretilebilen geri bildirim (uzunluk, eksik alanlar, soru sırası).** """
+    if not questions:
+        return ["⚠ No questions provided. Ensure the form contains valid fields."]
+
+    if not categorized_fields:
+        return ["⚠ No categorized fields found. Check the form structure."]
+
+    feedback = detect_long_questions(questions) + detect_missing_questions(categorized_fields) + analyze_question_flow(questions)
+    return feedback or ["⚠ AI could not generate meaningful feedback. Check if the input data is correct."]
@@ -0,0 +1,217 @@
+import os
+import json
+import numpy as np
+import torch
+
+# 📌 torch: eager PyTorch (varsayılan), torchscript: torch.jit grafiği, onnx: ONNX Runtime (opsiyonel bağımlılık)
+BACKENDS = ("torch", "torchscript", "onnx")
+EXTENSIONS = {"torchscript": ".pt", "onnx": ".onnx"}
+
+
+class ClassifierGraph(torch.nn.Module):
+    """ 📌 Dışa aktarım için sınıflandırıcıyı (input_ids, attention_mask) -> logits imzasına indirger. """
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+
+class EmbedderGraph(torch.nn.Module):
+    """ 📌 SentenceTransformer'ın transformer + ortalama havuzlama (+ normalizasyon) adımlarını tek grafikte toplar. """
+
+    def __init__(self, transformer, normalize):
+        super().__init__()
+        self.transformer = transformer
+        self.normalize = normalize
+
+    def forward(self, input_ids, attention_mask):
+        token_embeddings = self.transformer(input_ids=input_ids, attention_mask=attention_mask)[0]
+        mask = attention_mask.unsqueeze(-1).to(token_embeddings.dtype)
+        embeddings = (token_embeddings * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+        if self.normalize:
+            embeddings = torch.nn.functional.normalize(embeddings, p=2, dim=1)
+        return embeddings
+
+
+def artifact_path(directory, name, backend, int8=False):
+    """ 📌 Ör. models/exported/embedder-int8.onnx """
+    return os.path.join(directory, f"{name}{'-int8' if int8 else ''}{EXTENSIONS[backend]}")
+
+
+class GraphRunner:
+    """ 📌 **Dışa aktarılmış grafiği (TorchScript ya da ONNX) çalıştırır; çıktı numpy float32.** """
+
+    def __init__(self, path, num_threads=None):
+        self.path = path
+        if path.endswith(".onnx"):
+            import onnxruntime as ort
+
+            options = ort.SessionOptions()
+            if num_threads:
+                options.intra_op_num_threads = num_threads
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            self._session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+            self._module = None
+        else:
+            self._session = None
+            self._module = torch.jit.optimize_for_inference(torch.jit.load(path, map_location="cpu").eval())
+
+    def __call__(self, input_ids, attention_mask):
+        if self._session is not None:
+            return self._session.run(None, {"input_ids": input_ids.astype(np.int64),
+                                            "attention_mask": attention_mask.astype(np.int64)})[0]
+        with torch.inference_mode():
+            return self._module(torch.from_numpy(input_ids), torch.from_numpy(attention_mask)).float().numpy()
+
+
+class ExportedEmbedder:
+    """
+    📌 **Dışa aktarılmış embedder; `SentenceTransformer.encode` yerine kullanılabilir (EmbeddingStore ile uyumlu).**
+    """
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        from transformers import AutoTokenizer
+
+        with open(os.path.join(directory, "embedder.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.tokenizer = AutoTokenizer.from_pretrained(os.path.join(directory, "embedder_tokenizer"))
+        self.runner = GraphRunner(path)
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        single = isinstance(sentences, str)
+        sentences = [sentences] if single else list(sentences)
+        outputs = []
+        # 📌 Benzer uzunluktakiler birlikte kodlansın diye uzunluğa göre sıralanır, sonra eski sıraya döndürülür
+        order = sorted(range(len(sentences)), key=lambda i: len(sentences[i]))
+        for start in range(0, len(order), batch_size):
+            batch = [sentences[i] for i in order[start:start + batch_size]]
+            inputs = self.tokenizer(batch, padding=True, truncation=True,
+                                    max_length=self.meta["max_seq_length"], return_tensors="np")
+            outputs.append(self.runner(inputs["input_ids"], inputs["attention_mask"]))
+        if not outputs:
+            return np.zeros((0, self.meta["dimension"]), dtype=np.float32)
+        embeddings = np.empty((len(sentences), outputs[0].shape[1]), dtype=np.float32)
+        embeddings[order] = np.concatenate(outputs)
+        return embeddings[0] if single else embeddings
+
+
+class TorchClassifier:
+    """ 📌 Eager PyTorch sınıflandırıcısını dışa aktarılmış sınıflandırıcıyla aynı arayüze sokar. """
+
+    def __init__(self, model, tokenizer, max_length=256):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+        self.labels = [model.config.id2label[i] for i in range(model.config.num_labels)]
+
+    def predict_proba(self, texts):
+        inputs = self.tokenizer(texts, padding=True, truncation=True, max_length=self.max_length,
+                                return_tensors="pt").to(self.model.device)
+        with torch.inference_mode():
+            return torch.softmax(self.model(**inputs).logits.float(), dim=-1).cpu().numpy()
+
+
+class ExportedClassifier:
+    """ 📌 **Dışa aktarılmış DistilBERT sınıflandırıcısı:** `predict_proba(metinler)` -> (n, sınıf) olasılıklar. """
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        from transformers import AutoTokenizer
+
+        with open(os.path.join(directory, "form_classifier.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.labels = self.meta["labels"]
+        self.max_length = self.meta["max_length"]
+        self.tokenizer = AutoTokenizer.from_pretrained(os.path.join(directory, "form_classifier_tokenizer"))
+        self.runner = GraphRunner(path)
+
+    def predict_proba(self, texts):
+        inputs = self.tokenizer(texts, padding=True, truncation=True, max_length=self.max_length, return_tensors="np")
+        logits = self.runner(inputs["input_ids"], inputs["attention_mask"])
+        logits = logits - logits.max(axis=-1, keepdims=True)
+        probabilities = np.exp(logits)
+        return probabilities / probabilities.sum(axis=-1, keepdims=True)
+
+
+def _export_graph(module, example, path, backend, int8):
+    module = module.eval().float()
+    if backend == "torchscript":
+        if int8:
+            module = torch.ao.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8)
+        with torch.inference_mode():
+            traced = torch.jit.trace(module, example, check_trace=False, strict=False)
+        torch.jit.save(traced, path)
+        return
+
+    fp32_path = path.replace("-int8", "") if int8 else path
+    torch.onnx.export(
+        module, example, fp32_path,
+        input_names=["input_ids", "attention_mask"], output_names=["output"],
+        dynamic_axes={"input_ids": {0: "batch", 1: "sequence"}, "attention_mask": {0: "batch", 1: "sequence"},
+                      "output": {0: "batch"}},
+        opset_version=17, dynamo=False
+    )
+    if int8:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(fp32_path, path, weight_type=QuantType.QInt8)
+
+
+def export_classifier(model, tokenizer, directory, backend, int8=False, max_length=256):
+    """ 📌 **DistilBERT sınıflandırıcısını dışa aktarır**; tokenizer ve etiketler yanına yazılır. """
+    os.makedirs(directory, exist_ok=True)
+    path = artifact_path(directory, "form_classifier", backend, int8)
+    example = tokenizer(["What is your email address?", "Name"], padding=True, return_tensors="pt")
+    _export_graph(ClassifierGraph(model), (example["input_ids"], example["attention_mask"]), path, backend, int8)
+
+    tokenizer.save_pretrained(os.path.join(directory, "form_classifier_tokenizer"))
+    with open(os.path.join(directory, "form_classifier.json"), "w", encoding="utf-8") as f:
+        json.dump({"labels": [model.config.id2label[i] for i in range(model.config.num_labels)],
+                   "max_length": max_length}, f)
+    return path
+
+
+def _is_mean_pooling(pooling):
+    """ 📌 sentence-transformers sürümleri havuzlama türünü farklı alanlarda tutar (`pooling_mode_mean_tokens` / `pooling_mode`). """
+    if type(pooling).__name__ != "Pooling":
+        return False
+    if hasattr(pooling, "pooling_mode_mean_tokens"):
+        return pooling.pooling_mode_mean_tokens and pooling.get_pooling_mode_str() == "mean"
+    return getattr(pooling, "pooling_mode", None) == "mean"
+
+
+def export_embedder(sentence_transformer, directory, backend, int8=False):
+    """ 📌 **SentenceTransformer embedder'ını dışa aktarır** (transformer + havuzlama + normalizasyon). """
+    os.makedirs(directory, exist_ok=True)
+    path = artifact_path(directory, "embedder", backend, int8)
+    modules = [type(module).__name__ for module in sentence_transformer]
+    pooling = sentence_transformer[1] if len(modules) > 1 else None
+    if pooling is not None and not _is_mean_pooling(pooling):
+        raise ValueError("Only mean-pooling sentence transformers can be exported.")
+
+    transformer = sentence_transformer[0].auto_model
+    tokenizer = sentence_transformer.tokenizer
+    example = tokenizer(["What is your email address?", "Name"], padding=True, return_tensors="pt")
+    _export_graph(EmbedderGraph(transformer, "Normalize" in modules),
+                  (example["input_ids"], example["attention_mask"]), path, backend, int8)
+
+    tokenizer.save_pretrained(os.path.join(directory, "embedder_tokenizer"))
+    with open(os.path.join(directory, "embedder.json"), "w", encoding="utf-8") as f:
+        json.dump({"max_seq_length": sentence_transformer.max_seq_length,
+                   "dimension": sentence_transformer.get_sentence_embedding_dimension(),
+                   "normalize": "Normalize" in modules}, f)
+    return path
+
+
+def check_parity(reference, candidate, atol):
+    """ 📌 Eager ve dışa aktarılmış çıktılar arasındaki en büyük mutlak farkı ve kosinüs benzerliğini döndürür. """
+    reference = np.asarray(reference, dtype=np.float32)
+    candidate = np.asarray(candidate, dtype=np.float32)
+    max_abs_diff = float(np.abs(reference - candidate).max()) if reference.size else 0.0
+    cosine = (reference * candidate).sum(axis=1) / (
+        np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1) + 1e-12)
+    return {"max_abs_diff": max_abs_diff, "min_cosine": float(cosine.min()) if cosine.size else 1.0,
+            "ok": max_abs_diff <= atol}
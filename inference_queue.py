@@ -0,0 +1,154 @@
+import os
+import time
+import math
+import asyncio
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Overloaded(Exception):
+    """
+    📌 İstek kabul edilmedi; istemci `retry_after` saniye sonra tekrar denemeli.
+    `status` 503 (kuyruk dolu / kuyrukta fazla bekledi) ya da 429 (istemci başına sınır aşıldı) olur.
+    """
+
+    def __init__(self, status, message, retry_after):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class InferenceQueue:
+    """
+    📌 **Çıkarım isteklerini sabit sayıda model işçisine dağıtan, derinliği sınırlı kuyruk (olay döngüsü için).**
+    - Aynı anda en fazla `workers` istek çalışır, `max_queue` istek bekler; fazlası hemen 503 alır.
+    - Tek bir istemcinin aynı anda `max_per_client` isteğinden fazlası 429 alır.
+    - Kuyrukta `queue_timeout` saniyeden fazla bekleyen istek hesaplanmadan 503 ile düşürülür (istemci büyük ihtimalle vazgeçti).
+    - Kuyruk bekleme süresi ve hesaplama süresi ayrı ayrı ölçülür.
+    """
+    _queues = {}
+    _queues_lock = threading.Lock()
+
+    def __init__(self, name, workers=None, max_queue=None, max_per_client=None, queue_timeout=None):
+        self.name = name
+        self.workers = workers or int(os.getenv("SMARTFORM_INFERENCE_WORKERS", "8"))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv("SMARTFORM_INFERENCE_QUEUE", "32"))
+        self.max_per_client = max_per_client or int(os.getenv("SMARTFORM_MAX_REQUESTS_PER_CLIENT", "8"))
+        self.queue_timeout = queue_timeout if queue_timeout is not None else float(os.getenv("SMARTFORM_QUEUE_TIMEOUT", "30"))
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"{name}-worker")
+
+        self._admitted = 0
+        self._running = 0
+        self._per_client = {}
+        self._lock = threading.Lock()
+        self._queue_waits = deque(maxlen=1000)
+        self._compute_times = deque(maxlen=1000)
+        self.stats = {"accepted": 0, "completed": 0, "errors": 0, "rejected_full": 0, "rejected_client": 0, "expired": 0}
+        with InferenceQueue._queues_lock:
+            InferenceQueue._queues[name] = self
+
+    def retry_after(self):
+        """ 📌 Kuyruğun boşalması için tahmini süre: ortalama hesaplama süresi x (bekleyen / işçi). """
+        with self._lock:
+            average = sum(self._compute_times) / len(self._compute_times) if self._compute_times else 1.0
+            waiting = max(0, self._admitted - self.workers)
+        return max(1, math.ceil(average * (waiting + 1) / self.workers))
+
+    @asynccontextmanager
+    async def admit(self, client=None):
+        """ 📌 Kuyrukta yer ayırır, yoksa hemen `Overloaded` fırlatır; blok bitince yer bırakılır. """
+        with self._lock:
+            if self._admitted >= self.workers + self.max_queue:
+                self.stats["rejected_full"] += 1
+                rejection = (503, "Inference queue is full. Retry later.")
+            elif client is not None and self._per_client.get(client, 0) >= self.max_per_client:
+                self.stats["rejected_client"] += 1
+                rejection = (429, "Too many concurrent requests from this client. Retry later.")
+            else:
+                rejection = None
+                self._admitted += 1
+                self.stats["accepted"] += 1
+                if client is not None:
+                    self._per_client[client] = self._per_client.get(client, 0) + 1
+        if rejection is not None:
+            raise Overloaded(*rejection, retry_after=self.retry_after())
+
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._admitted -= 1
+                if client is not None:
+                    self._per_client[client] -= 1
+                    if not self._per_client[client]:
+                        del self._per_client[client]
+
+    async def call(self, func, streaming=None):
+        """
+        📌 **`func()`'ı bir model işçisinde çalıştırır.** Dönüş: (sonuç, kuyruk bekleme sn, hesaplama sn).
+        Kuyrukta `queue_timeout`'tan uzun bekleyen istek çalıştırılmaz, `Overloaded` (503) fırlatılır.
+        `streaming(sonuç)` doğruysa (SSE) hesaplama akış okunurken sürer: dönen süre yalnızca hazırlıktır,
+        çağıran akış tükendiğinde ya da kapandığında toplam süreyi `finish_stream` ile kaydeder.
+        """
+        enqueued = time.monotonic()
+
+        def run():
+            started = time.monotonic()
+            waited = started - enqueued
+            if self.queue_timeout and waited > self.queue_timeout:
+                with self._lock:
+                    self.stats["expired"] += 1
+                raise Overloaded(503, "Request waited too long in the inference queue.", retry_after=self.retry_after())
+
+            with self._lock:
+                self._running += 1
+                self._queue_waits.append(waited)
+            try:
+                result = func()
+            except Exception:
+                self._finish(time.monotonic() - started, error=True)
+                raise
+            if streaming is None or not streaming(result):
+                self._finish(time.monotonic() - started)
+            return result, waited, time.monotonic() - started
+
+        return await asyncio.get_running_loop().run_in_executor(self._executor, run)
+
+    def finish_stream(self, computed, error=False):
+        """ 📌 `call` ile başlatılan bir akışın toplam hesaplama süresini kaydeder. """
+        self._finish(computed, error=error)
+
+    def _finish(self, computed, error=False):
+        with self._lock:
+            self._running -= 1
+            self._compute_times.append(computed)
+            self.stats["completed"] += 1
+            if error:
+                self.stats["errors"] += 1
+
+    @staticmethod
+    def _percentiles(samples):
+        samples = sorted(samples)
+        if not samples:
+            return {"p50_ms": 0.0, "p95_ms": 0.0}
+        return {"p50_ms": round(1000 * samples[len(samples) // 2], 1),
+                "p95_ms": round(1000 * samples[int(len(samples) * 0.95)], 1)}
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats.update(admitted=self._admitted, running=self._running)
+            queue_waits, compute_times = list(self._queue_waits), list(self._compute_times)
+        stats.update(workers=self.workers, max_queue=self.max_queue, max_per_client=self.max_per_client)
+        stats["queue_wait"] = self._percentiles(queue_waits)
+        stats["compute"] = self._percentiles(compute_times)
+        return stats
+
+    @classmethod
+    def get_all_stats(cls):
+        """ 📌 Tüm kuyrukların sayaçları (`/metrics`); asenkron sunum modunda değilse boş. """
+        with cls._queues_lock:
+            queues = dict(cls._queues)
+        return {name: queue.get_stats() for name, queue in queues.items()}
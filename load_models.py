@@ -1,50 +1,119 @@
-from transformers import AutoTokenizer, AutoModelForCausalLM
-import torch
+import os
+from model_registry import ModelRegistry
+from inference_backends import BACKENDS, artifact_path
 
 class AIModelManager:
-    _intent_classifier = None  
-    _tokenizer = None
+    LLM_MODEL_ID = "google/gemma-2-2b-it"
+    SIMILARITY_MODEL_ID = "all-MiniLM-L6-v2"
+
+    _llm = None
     device = "cpu"
 
+    @staticmethod
+    def get_precision():
+        """
+        📌 Gemma için hassasiyet modu (dağıtım başına `SMARTFORM_PRECISION` ile seçilir):
+        auto (GPU'da float16, CPU'da float32), float32, bfloat16, float16, int8.
+        """
+        return os.getenv("SMARTFORM_PRECISION", "auto")
+
     @staticmethod
     def load_models():
         """ 📌 **AI modellerini yükler ve sadece bir kez başlatır.** """
-        if AIModelManager._intent_classifier is None:
-            model_id = "google/gemma-2-2b-it"
-
+        if AIModelManager._llm is None:
             # **Cihazı belirle (MPS, CUDA veya CPU)**
-            if torch.backends.mps.is_available():
-                AIModelManager.device = "mps"
-            elif torch.cuda.is_available():
-                AIModelManager.device = "cuda"
-            else:
-                AIModelManager.device = "cpu"
-
-            print(f"🚀 **AI modeli yükleniyor... (Device: {AIModelManager.device})**")
-
-            AIModelManager._tokenizer = AutoTokenizer.from_pretrained(model_id)
-            AIModelManager._tokenizer.pad_token = AIModelManager._tokenizer.eos_token  
-
-            AIModelManager._intent_classifier = AutoModelForCausalLM.from_pretrained(
-                model_id,
-                torch_dtype=torch.float16 if AIModelManager.device != "cpu" else torch.float32,
-                device_map=AIModelManager.device
+            AIModelManager.device = ModelRegistry.resolve_device()
+
+            # 📌 Süreç boyunca tutulan referans; diğer tüketiciler aynı kopyayı kayıt defterinden alır
+            AIModelManager._llm = ModelRegistry.acquire(
+                AIModelManager.LLM_MODEL_ID, kind="causal_lm",
+                dtype=AIModelManager.get_precision(), device=AIModelManager.device
             )
 
-            print(f"✅ **AI modeli başarıyla yüklendi! (Device: {AIModelManager.device})**")
+            print(f"✅ **AI modeli başarıyla yüklendi! (Device: {AIModelManager.device}, Precision: {AIModelManager._llm.dtype})**")
+
+    @staticmethod
+    def acquire_llm():
+        """ 📌 Gemma modelini kayıt defterinden alır (referans sayısını artırır). """
+        AIModelManager.device = ModelRegistry.resolve_device()
+        return ModelRegistry.acquire(
+            AIModelManager.LLM_MODEL_ID, kind="causal_lm",
+            dtype=AIModelManager.get_precision(), device=AIModelManager.device
+        )
+
+    @staticmethod
+    def get_inference_backend():
+        """
+        📌 Sınıflandırıcı ve embedder için çıkarım altyapısı (`SMARTFORM_INFERENCE_BACKEND`):
+        torch (eager, varsayılan), torchscript ya da onnx. Dışa aktarılmış dosyalar `export_models.py` ile üretilir;
+        `SMARTFORM_EXPORT_INT8=1` int8 kuantize dosyaları seçer.
+        """
+        backend = os.getenv("SMARTFORM_INFERENCE_BACKEND", "torch")
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown inference backend: {backend} (expected one of {', '.join(BACKENDS)})")
+        return backend
+
+    @staticmethod
+    def get_exported_artifact(name):
+        """ 📌 Seçili altyapının dosya yolu; torch seçiliyse ya da dosya yoksa None (eager'a düşülür). """
+        backend = AIModelManager.get_inference_backend()
+        if backend == "torch":
+            return None
+        path = artifact_path(os.getenv("SMARTFORM_EXPORT_DIR", "models/exported"), name, backend,
+                             int8=os.getenv("SMARTFORM_EXPORT_INT8", "0") == "1")
+        if not os.path.exists(path):
+            print(f"⚠️ **Dışa aktarılmış model bulunamadı ({path}), eager PyTorch kullanılacak.**")
+            return None
+        return path
+
+    @staticmethod
+    def acquire_similarity_model():
+        """ 📌 Cümle benzerliği modelini kayıt defterinden alır (referans sayısını artırır). """
+        path = AIModelManager.get_exported_artifact("embedder")
+        if path is not None:
+            return ModelRegistry.acquire(path, kind="exported_embedder", dtype="float32", device="cpu")
+        return ModelRegistry.acquire(AIModelManager.SIMILARITY_MODEL_ID, kind="sentence_transformer", dtype="float32")
+
+    @staticmethod
+    def similarity_model_name(handle):
+        """ 📌 Embedding önbelleği anahtarı; farklı altyapıların (ör. int8) vektörleri karışmasın. """
+        if handle.kind == "exported_embedder":
+            return f"{AIModelManager.SIMILARITY_MODEL_ID}@{os.path.basename(handle.model_id)}"
+        return AIModelManager.SIMILARITY_MODEL_ID
+
+    @staticmethod
+    def acquire_form_classifier():
+        """ 📌 `train_model.py` ile eğitilen DistilBERT sınıflandırıcısını kayıt defterinden alır. """
+        path = AIModelManager.get_exported_artifact("form_classifier")
+        if path is not None:
+            return ModelRegistry.acquire(path, kind="exported_classifier", dtype="float32", device="cpu")
+        return ModelRegistry.acquire(AIModelManager.get_form_classifier_path(), kind="sequence_classifier",
+                                     dtype="float32", device=ModelRegistry.resolve_device())
+
+    @staticmethod
+    def get_form_classifier_path():
+        """ 📌 Eğitilmiş sınıflandırıcının dizini (`SMARTFORM_FORM_CLASSIFIER`, varsayılan models/form_classifier). """
+        return os.getenv("SMARTFORM_FORM_CLASSIFIER", "models/form_classifier")
 
     @staticmethod
     def get_intent_classifier():
         """ 📌 Yüklü modeli döndürür, yoksa yükler. """
-        if AIModelManager._intent_classifier is None:
+        if AIModelManager._llm is None:
             AIModelManager.load_models()
-        return AIModelManager._intent_classifier, AIModelManager._tokenizer
+        return AIModelManager._llm.model, AIModelManager._llm.tokenizer
 
     @staticmethod
     def get_device():
         """ 📌 Kullanılan cihazı döndürür. """
         return AIModelManager.device
 
+    @staticmethod
+    def memory_report():
+        """ 📌 Yüklü modellerin bellek kullanımını döndürür. """
+        return ModelRegistry.memory_report()
+
 
 if __name__ == "__main__":
     AIModelManager.load_models()
+    for item in AIModelManager.memory_report():
+        print(item)
@@ -0,0 +1,270 @@
+import os
+import threading
+import gc
+import torch
+from shared_weights import shared_weights_enabled, share_weights, load_shared
+
+
+class LoadedModel:
+    """ 📌 **Kayıt defterinde tutulan tek bir modelin durumu.** """
+
+    def __init__(self, key, kind, model, tokenizer=None):
+        self.key = key
+        self.model_id, self.dtype, self.device = key
+        self.kind = kind
+        self.model = model
+        self.tokenizer = tokenizer
+        self.refcount = 0
+
+    def resident_bytes(self):
+        """ 📌 Modelin parametre ve buffer'larının bellekte kapladığı alanı hesaplar. """
+        module = self.model
+        # SentenceTransformer da bir nn.Module olduğu için aynı yol geçerli
+        if not isinstance(module, torch.nn.Module):
+            return 0
+
+        seen = set()
+        total = 0
+        # 📌 int8 dinamik kuantize katmanların ağırlıkları parameters() içinde görünmez, state_dict'te (tuple) durur
+        tensors = list(module.buffers()) + list(module.parameters())
+        for value in module.state_dict(keep_vars=True).values():
+            tensors.extend(value if isinstance(value, tuple) else [value])
+
+        for tensor in tensors:
+            if not isinstance(tensor, torch.Tensor):
+                continue
+            # 📌 Paylaşılan (tied) ağırlıkları iki kez sayma
+            ptr = tensor.data_ptr()
+            if ptr in seen:
+                continue
+            seen.add(ptr)
+            total += tensor.numel() * tensor.element_size()
+        return total
+
+
+class ModelRegistry:
+    """
+    📌 **Tüm AI tüketicilerinin (intent, soru üretimi, geri bildirim...) modelleri çözdüğü ortak kayıt defteri.**
+    - Modeller ilk istendiklerinde (lazy) yüklenir ve (model_id, dtype, device) anahtarıyla tutulur.
+    - Aynı anahtar ikinci kez istenirse aynı nesne döner, model tekrar yüklenmez.
+    - Referans sayımı yapılır; son referans bırakıldığında model bellekten atılır.
+    """
+    _entries = {}
+    _loaders = {}
+    _lock = threading.RLock()
+    _key_locks = {}
+
+    @staticmethod
+    def resolve_device():
+        """ 📌 Kullanılacak cihazı belirler (MPS, CUDA veya CPU). """
+        if torch.backends.mps.is_available():
+            return "mps"
+        if torch.cuda.is_available():
+            return "cuda"
+        return "cpu"
+
+    @staticmethod
+    def configure_threads():
+        """
+        📌 Çok süreçli sunumda (`SMARTFORM_WORKERS` > 1) çekirdekler süreçler arasında bölünür, böylece her süreç
+        tüm çekirdeklere iş parçacığı açıp birbirini boğmaz. `SMARTFORM_TORCH_THREADS` değeri doğrudan kullanılır.
+        """
+        threads = os.getenv("SMARTFORM_TORCH_THREADS")
+        workers = int(os.getenv("SMARTFORM_WORKERS", "1"))
+        if threads is None and workers <= 1:
+            return torch.get_num_threads()
+        threads = int(threads) if threads else max(1, (os.cpu_count() or 1) // workers)
+        torch.set_num_threads(threads)
+        print(f"🧵 **Torch iş parçacığı sayısı: {threads} ({workers} süreç)**")
+        return threads
+
+    @staticmethod
+    def resolve_dtype(device, dtype=None):
+        """
+        📌 dtype verilmemişse (ya da "auto" ise) cihaza göre varsayılanı seçer ve string olarak döndürür.
+        Desteklenenler: float32, float16, bfloat16 ve int8 (sadece CPU, dinamik kuantizasyon).
+        """
+        if dtype is None or dtype == "auto":
+            return "float16" if device != "cpu" else "float32"
+        if isinstance(dtype, torch.dtype):
+            return str(dtype).replace("torch.", "")
+        return str(dtype)
+
+    @classmethod
+    def register_loader(cls, kind, loader):
+        """
+        📌 Yeni bir model türü için yükleyici kaydeder.
+        `loader(model_id, dtype, device)` -> (model, tokenizer)
+        """
+        cls._loaders[kind] = loader
+
+    @classmethod
+    def acquire(cls, model_id, kind="causal_lm", dtype=None, device=None):
+        """
+        📌 **Modeli döndürür, yüklenmemişse yükler ve referans sayısını artırır.**
+        """
+        device = device or cls.resolve_device()
+        dtype = cls.resolve_dtype(device, dtype)
+        key = (model_id, dtype, device)
+
+        with cls._lock:
+            key_lock = cls._key_locks.setdefault(key, threading.Lock())
+
+        # 📌 Aynı model için eşzamanlı iki yüklemeyi engelle, farklı modeller paralel yüklenebilir
+        with key_lock:
+            with cls._lock:
+                entry = cls._entries.get(key)
+            if entry is None:
+                if kind not in cls._loaders:
+                    raise ValueError(f"Unknown model kind: {kind}")
+
+                print(f"🚀 **Model yükleniyor: {model_id} ({kind}, {dtype}, Device: {device})**")
+                model, tokenizer = cls._loaders[kind](model_id, dtype, device)
+                entry = LoadedModel(key, kind, model, tokenizer)
+                print(f"✅ **Model yüklendi: {model_id} ({entry.resident_bytes() / 1024 ** 2:.0f} MB)**")
+
+                with cls._lock:
+                    cls._entries[key] = entry
+
+            with cls._lock:
+                entry.refcount += 1
+
+        return entry
+
+    @classmethod
+    def release(cls, entry):
+        """ 📌 Referansı bırakır; kimse kullanmıyorsa modeli bellekten atar. """
+        with cls._lock:
+            if cls._entries.get(entry.key) is not entry:
+                return
+            entry.refcount -= 1
+            if entry.refcount > 0:
+                return
+            del cls._entries[entry.key]
+
+        print(f"🧹 **Model bellekten atıldı: {entry.model_id} ({entry.dtype}, {entry.device})**")
+        entry.model = None
+        entry.tokenizer = None
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    @classmethod
+    def get(cls, model_id, dtype=None, device=None):
+        """ 📌 Yüklü modeli referans sayısını değiştirmeden döndürür, yoksa None. """
+        device = device or cls.resolve_device()
+        dtype = cls.resolve_dtype(device, dtype)
+        with cls._lock:
+            return cls._entries.get((model_id, dtype, device))
+
+    @classmethod
+    def memory_report(cls):
+        """ 📌 **Bellekte tutulan her model için kapladığı alanı raporlar.** """
+        with cls._lock:
+            entries = list(cls._entries.values())
+
+        report = []
+        for entry in entries:
+            report.append({
+                "model_id": entry.model_id,
+                "kind": entry.kind,
+                "dtype": entry.dtype,
+                "device": entry.device,
+                "refcount": entry.refcount,
+                "resident_mb": round(entry.resident_bytes() / 1024 ** 2, 1),
+            })
+        return report
+
+
+def _load_causal_lm(model_id, dtype, device):
+    from transformers import AutoTokenizer, AutoModelForCausalLM
+
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    tokenizer.pad_token = tokenizer.eos_token
+
+    quantize = dtype == "int8"
+    if quantize and device != "cpu":
+        raise ValueError("int8 dynamic quantization is only supported on CPU.")
+
+    # 📌 Paylaşımlı ağırlıklarda model doğrudan eşlenmiş dosyadan kurulur; özel kopya hiç oluşmaz
+    if not quantize and device == "cpu" and shared_weights_enabled():
+        model = load_shared(AutoModelForCausalLM, model_id, getattr(torch, dtype))
+        if model is not None:
+            return model, tokenizer
+
+    model = AutoModelForCausalLM.from_pretrained(
+        model_id,
+        torch_dtype=torch.float32 if quantize else getattr(torch, dtype),
+        device_map=device
+    )
+    model.eval()
+
+    if quantize:
+        # 📌 Linear katmanların ağırlıkları int8'e çevrilir, aktivasyonlar çalışma anında kuantize edilir
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    elif device == "cpu" and shared_weights_enabled():
+        share_weights(model, model_id)
+
+    return model, tokenizer
+
+
+def _load_sequence_classifier(model_id, dtype, device):
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    try:
+        tokenizer = AutoTokenizer.from_pretrained(model_id)
+    except (OSError, ValueError):
+        # 📌 Eski eğitim çıktılarında tokenizer kaydedilmemiş; eğitimdeki temel modelinkini kullan
+        tokenizer = AutoTokenizer.from_pretrained("distilbert-base-uncased")
+
+    if device == "cpu" and shared_weights_enabled():
+        model = load_shared(AutoModelForSequenceClassification, model_id, getattr(torch, dtype))
+        if model is not None:
+            return model, tokenizer
+
+    model = AutoModelForSequenceClassification.from_pretrained(model_id, torch_dtype=getattr(torch, dtype)).to(device)
+    model.eval()
+    if device == "cpu" and shared_weights_enabled():
+        share_weights(model, model_id)
+    return model, tokenizer
+
+
+def _load_exported_classifier(model_id, dtype, device):
+    from inference_backends import ExportedClassifier
+
+    if device != "cpu":
+        raise ValueError("Exported models run on CPU only.")
+    return ExportedClassifier(model_id), None
+
+
+def _load_exported_embedder(model_id, dtype, device):
+    from inference_backends import ExportedEmbedder
+
+    if device != "cpu":
+        raise ValueError("Exported models run on CPU only.")
+    return ExportedEmbedder(model_id), None
+
+
+def _load_sentence_transformer(model_id, dtype, device):
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_id, device=device)
+    if dtype != "float32":
+        model = model.to(getattr(torch, dtype))
+    if device == "cpu" and shared_weights_enabled():
+        transformer = model[0].auto_model
+        share_weights(transformer, transformer.config._name_or_path)
+    return model, None
+
+
+ModelRegistry.register_loader("causal_lm", _load_causal_lm)
+ModelRegistry.register_loader("sentence_transformer", _load_sentence_transformer)
+ModelRegistry.register_loader("sequence_classifier", _load_sequence_classifier)
+ModelRegistry.register_loader("exported_classifier", _load_exported_classifier)
+ModelRegistry.register_loader("exported_embedder", _load_exported_embedder)
+ModelRegistry.configure_threads()
+
+
+if __name__ == "__main__":
+    for item in ModelRegistry.memory_report():
+        print(item)
@@ -0,0 +1,92 @@
+import os
+import time
+import threading
+import traceback
+
+PENDING, LOADING, READY, FAILED = "pending", "loading", "ready", "failed"
+
+
+class ModelWarmup:
+    """
+    📌 **Modelleri sunucu portu açıldıktan sonra arka planda, sırayla yükler.**
+    - Her bileşen `add(ad, yükleyici)` ile eklenir; yükleyici hazır nesneyi döndürür ya da hata fırlatır.
+    - Bileşenler eklendikleri sırayla yüklenir (hafif olanlar önce eklenirse API daha erken işe yarar hale gelir).
+    - `on_ready(ad, nesne)` geri çağrısı bileşen hazır olunca çalışır (ör. pipeline'a bağlamak için).
+    - Her bileşenin durumu (pending / loading / ready / failed), süresi ve hatası `report()` ile okunur.
+    """
+
+    def __init__(self, on_ready=None):
+        self.on_ready = on_ready
+        self._components = {}
+        self._loaders = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self.started_at = time.time()
+
+    def add(self, name, loader):
+        with self._lock:
+            self._loaders[name] = loader
+            self._components[name] = {"state": PENDING, "load_seconds": None, "error": None, "object": None}
+
+    def start(self):
+        """ 📌 Yükleme iş parçacığını başlatır (ikinci çağrı etkisizdir). """
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="model-warmup", daemon=True)
+        self._thread.start()
+
+    def load_all(self):
+        """ 📌 Arka plan yerine çağıranın iş parçacığında yükler (`SMARTFORM_BACKGROUND_LOAD=0`, CLI araçları). """
+        self._run()
+
+    def _set(self, name, **fields):
+        with self._lock:
+            self._components[name].update(fields)
+
+    def _run(self):
+        for name, loader in list(self._loaders.items()):
+            started = time.monotonic()
+            self._set(name, state=LOADING)
+            print(f"🚀 **Arka planda yükleniyor: {name}**")
+            try:
+                component = loader()
+                if self.on_ready is not None:
+                    self.on_ready(name, component)
+            except Exception as e:
+                print(f"🚨 '{name}' yüklenemedi: {e}\n{traceback.format_exc()}")
+                self._set(name, state=FAILED, error=str(e), load_seconds=round(time.monotonic() - started, 3))
+                continue
+            self._set(name, state=READY, object=component, load_seconds=round(time.monotonic() - started, 3))
+            print(f"✅ **Hazır: {name} ({time.monotonic() - started:.1f} sn)**")
+
+    def get(self, name):
+        """ 📌 Hazırsa bileşeni, değilse None döndürür. """
+        with self._lock:
+            component = self._components.get(name)
+            return component["object"] if component and component["state"] == READY else None
+
+    def is_ready(self, name=None):
+        with self._lock:
+            names = [name] if name is not None else list(self._components)
+            return all(self._components[n]["state"] == READY for n in names)
+
+    def pending(self):
+        """ 📌 Henüz hazır olmayan bileşenlerin adları (degrade modda yanıtlara eklenir). """
+        with self._lock:
+            return [name for name, component in self._components.items() if component["state"] != READY]
+
+    def report(self):
+        with self._lock:
+            models = {name: {key: value for key, value in component.items() if key != "object"}
+                      for name, component in self._components.items()}
+        return {
+            "ready": all(model["state"] == READY for model in models.values()),
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "models": models,
+        }
+
+    @staticmethod
+    def background_enabled():
+        """ 📌 `SMARTFORM_BACKGROUND_LOAD=0` modelleri içe aktarma sırasında (eski davranış) yükler. """
+        return os.getenv("SMARTFORM_BACKGROUND_LOAD", "1") != "0"
@@ -0,0 +1,116 @@
+import os
+import copy
+import hashlib
+import threading
+import torch
+
+
+class PromptTemplate:
+    """
+    📌 **Sabit bir önek (talimatlar) ve değişken bir sondan (form başlığı, kullanıcı sorusu) oluşan prompt şablonu.**
+    Önek istekler arasında değişmediği için KV durumu bir kez hesaplanıp yeniden kullanılabilir.
+    Değişkenler sadece son kısma yerleştirilir; önek her istekte birebir aynı kalmalıdır.
+    """
+
+    def __init__(self, name, prefix, suffix):
+        self.name = name
+        self.prefix = prefix
+        self.suffix = suffix
+        self.fingerprint = hashlib.sha1(f"{name}\x00{prefix}\x00{suffix}".encode("utf-8")).hexdigest()
+
+    def render_suffix(self, **variables):
+        return self.suffix.format(**variables)
+
+    def render(self, **variables):
+        """ 📌 Prompt'un tam metni (loglama ve önbelleksiz yol için). """
+        return self.prefix + self.render_suffix(**variables)
+
+
+class PrefixKVCache:
+    """
+    📌 **Şablon öneklerinin KV durumunu model başına önbellekte tutar.**
+    - Anahtar: şablon adı; kayıt şablon parmak izi ve model kimliğiyle doğrulanır.
+    - Şablon metni ya da model değişirse kayıt geçersiz sayılır ve yeniden hesaplanır.
+    """
+
+    def __init__(self, model, tokenizer, model_key=None):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.model_key = model_key
+        self.enabled = os.getenv("SMARTFORM_PREFIX_CACHE", "1") != "0"
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "prefix_tokens_saved": 0, "fallbacks": 0}
+
+    def _model_fingerprint(self):
+        return (self.model_key, id(self.model))
+
+    def get(self, template):
+        """ 📌 Şablonun (önek token'ları, KV önbelleği) çiftini döndürür; gerekirse hesaplar. """
+        with self._lock:
+            entry = self._entries.get(template.name)
+            if entry is not None and entry["template"] == template.fingerprint and entry["model"] == self._model_fingerprint():
+                self.stats["hits"] += 1
+                return entry["prefix_ids"], entry["cache"]
+
+        from transformers import DynamicCache
+
+        prefix_ids = self.tokenizer(template.prefix, return_tensors="pt")["input_ids"].to(self.model.device)
+        cache = DynamicCache()
+        with torch.no_grad():
+            self.model(input_ids=prefix_ids, past_key_values=cache, use_cache=True)
+
+        with self._lock:
+            self._entries[template.name] = {
+                "template": template.fingerprint,
+                "model": self._model_fingerprint(),
+                "prefix_ids": prefix_ids,
+                "cache": cache,
+            }
+            self.stats["misses"] += 1
+        return prefix_ids, cache
+
+    def invalidate(self, template_name=None):
+        """ 📌 Tek bir şablonun ya da tüm kayıtların önbelleğini temizler. """
+        with self._lock:
+            if template_name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(template_name, None)
+
+    def generate(self, template, suffixes, stopping_criteria_fn=None, **generation_kwargs):
+        """
+        📌 **Aynı şablondan gelen, son uzunlukları eşit prompt'ları önbellekteki önekle üretir.**
+        Sadece değişken son kısım için prefill yapılır.
+        `stopping_criteria_fn(prompt_length)` verilirse dönen üretim argümanları eklenir.
+        """
+        prefix_ids, cache = self.get(template)
+        batch_size = len(suffixes)
+        with self._lock:
+            # 📌 Tek seferlik prefill dışında her satır için önek token'ları yeniden hesaplanmaz
+            self.stats["prefix_tokens_saved"] += prefix_ids.shape[1] * batch_size
+        suffix_ids = torch.cat(suffixes, dim=0).to(self.model.device)
+        input_ids = torch.cat([prefix_ids.expand(batch_size, -1), suffix_ids], dim=1)
+
+        # 📌 Önbellekteki durum değişmesin diye kopyası kullanılır
+        past = copy.deepcopy(cache)
+        if batch_size > 1:
+            past.batch_repeat_interleave(batch_size)
+        if stopping_criteria_fn is not None:
+            generation_kwargs.update(stopping_criteria_fn(input_ids.shape[1]))
+
+        with torch.no_grad():
+            return self.model.generate(
+                input_ids=input_ids,
+                attention_mask=torch.ones_like(input_ids),
+                past_key_values=past,
+                pad_token_id=self.tokenizer.pad_token_id,
+                **generation_kwargs
+            )
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["templates"] = len(self._entries)
+            stats["enabled"] = self.enabled
+        return stats
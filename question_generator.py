@@ -1,9 +1,17 @@
 
-from transformers import AutoTokenizer, AutoModelForCausalLM
-import torch
+from load_models import AIModelManager
+from batch_engine import BatchingEngine
+from response_cache import SemanticCache
+from prompt_templates import PromptTemplate
+from stream_parsers import FirstQuestionParser, NumberedItemsParser, TokenStream, strip_numbering
+import form_rules
+from single_flight import SingleFlight, canonical_key
+from scheduling import DeadlineExceeded, current_context
 
 class QuestionGenerator:
     _instance = None  
+    questions_flight = SingleFlight("generate_questions")
+    user_input_flight = SingleFlight("question_from_user_input")
 
     def __new__(cls):
         if cls._instance is None:
@@ -12,177 +20,161 @@ class QuestionGenerator:
         return cls._instance
 
     def _initialize_model(self):
-        """ 📌 **AI modelini yalnızca bir kez yükler** """
-        model_id = "google/gemma-2-2b-it"
-        device = "mps" if torch.backends.mps.is_available() else "cpu" 
-        
-        print("🚀 **AI modeli yükleniyor, lütfen bekleyin...**")
+        """ 📌 **AI modelini ortak kayıt defterinden alır; model zaten yüklenmişse tekrar yüklemez.** """
+        print("🚀 **AI modeli hazırlanıyor, lütfen bekleyin...**")
 
         try:
-            self.tokenizer = AutoTokenizer.from_pretrained(model_id)
-            self.tokenizer.pad_token = self.tokenizer.eos_token  
-
-            self.model = AutoModelForCausalLM.from_pretrained(
-                model_id, 
-                torch_dtype=torch.float16 if device != "cpu" else torch.float32,  
-                device_map=device
-            )
-
-            self.device = device
-            print(f"✅ **AI modeli başarıyla yüklendi! (Device: {device})**")
+            self._model_handle = AIModelManager.acquire_llm()
+            self.tokenizer = self._model_handle.tokenizer
+            self.model = self._model_handle.model
+            self.device = self._model_handle.device
+            self.engine = BatchingEngine.for_model(self._model_handle)
+            self.question_cache = SemanticCache("generated_questions")
+            print(f"✅ **AI modeli hazır! (Device: {self.device})**")
 
         except Exception as e:
             print(f"🚨 Model yüklenirken hata oluştu: {e}")
             self.model = None
 
-    def generate_questions(self, form_category, existing_questions, num_questions=5):
-        """
-        📌 **Formun kategorisine göre AI destekli sorular üretir.**
-        - Form başlığına uygun sorular üretir.
-        - AI önerdiği soruların formdaki mevcut sorularla aynı olup olmadığını kontrol eder.
-        """
-        if self.model is None:
-            print("🚨 **Model yüklenmedi! Soru üretilemiyor.**")
-            return ["AI model is not loaded. Unable to generate questions."]
-
-        prompt = f"""
-        Generate {num_questions} unique, relevant questions specifically for a form titled "{form_category}".
+    # 📌 Sabit talimatlar önekte, değişkenler sonda; önekin KV durumu istekler arasında yeniden kullanılır
+    QUESTIONS_TEMPLATE = PromptTemplate(
+        "generate_questions",
+        prefix="""
+        You write questions for online forms.
         The questions should match the purpose of the form and provide useful input from the user.
 
-        Example format:
-        - If it's an "Appointment Request Form":
-          1. What is the purpose of your appointment?
-          2. What date and time are you available?
-          3. Do you have any special requests for the appointment?
-        
-        - If it's a "Customer Feedback Form":
-          1. How would you rate our service?
-          2. What can we improve?
-          3. Would you recommend us to others?
-
         Ensure that:
         - Each question is clearly written and numbered (1., 2., 3., etc.).
         - The response contains ONLY the questions (no additional text or explanations).
+""",
+        suffix="""
+        Generate {num_questions} unique, relevant questions specifically for a form titled "{form_category}".
         """
+    )
 
-        try:
-            print(f"📌 **AI'ya Gönderilen Prompt:**\n{prompt}")  # 🔹 **Gönderilen prompt'u logla**
-
-            inputs = self.tokenizer(prompt, return_tensors="pt").to(self.model.device)
-
-            with torch.no_grad():
-                outputs = self.model.generate(**inputs, max_new_tokens=250)  # 🔹 **Yanıtı uzat**
-
-            generated_text = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-
-            print(f"📌 **Raw AI Output:**\n{generated_text}")  # 🔹 **Yanıtı logla**
-
-            # 📌 **Yanıtı temizleyelim**
-            ai_generated_questions = []
-            for line in generated_text.split("\n"):
-                line = line.strip("-• ").strip()
-                if line and line[0].isdigit():  
-                    ai_generated_questions.append(line)
-
-            if not ai_generated_questions:
-                print("🚨 **AI'dan geçerli soru alınamadı!**")
-                return ["AI failed to generate proper questions. Please try again."]
-
-            # 📌 **Zaten formda var olan soruları kaldır**
-            existing_questions_lower = {q.lower().strip() for q in existing_questions}
-            filtered_questions = [q for q in ai_generated_questions if q.lower().strip() not in existing_questions_lower]
-
-            # 📌 **Eğer AI uygun soru üretmezse, mantıklı varsayılan sorular öner**
-            if not filtered_questions:
-                print("🚨 **AI suggested questions overlap with existing ones. Using fallback questions.**")
-                return self.get_fallback_questions(form_category)
-
-            return filtered_questions[:num_questions]
-
-        except Exception as e:
-            print(f"🚨 AI Error Details: {str(e)}")
-            return ["AI question generation failed due to an internal error."]
+    USER_INPUT_TEMPLATE = PromptTemplate(
+        "question_from_user_input",
+        prefix="""
+        Generate a single, unique question that can be added to the form named below, based on what the user has asked.
+        Your response should **ONLY** contain the question and **nothing else**.
+        - Do **NOT** provide explanations.
+        - Do **NOT** include answer choices.
+        - Do **NOT** use labels like "Question:", "Options:", or "Explanation:".
+        - The output should be a **single, well-formed question** ending with a question mark (?).
+""",
+        suffix="""
+        The user has asked: "{user_question}".
+        The form is titled "{form_purpose}".
+        """
+    )
+
+    @staticmethod
+    def build_questions_prompt(form_category, num_questions):
+        """ 📌 `generate_questions` için prompt'u oluşturur. """
+        return QuestionGenerator.QUESTIONS_TEMPLATE.render(form_category=form_category, num_questions=num_questions)
+
+    @staticmethod
+    def build_user_input_prompt(user_question, form_purpose):
+        """ 📌 `generate_question_from_user_input` için prompt'u oluşturur. """
+        return QuestionGenerator.USER_INPUT_TEMPLATE.render(user_question=user_question, form_purpose=form_purpose)
+
+    @staticmethod
+    def parse_numbered_questions(generated_text):
+        """ 📌 Model çıktısından numaralı soru satırlarını ayıklar. """
+        questions = []
+        for line in generated_text.split("\n"):
+            line = line.strip("-• ").strip()
+            if line and line[0].isdigit():
+                questions.append(line)
+        return questions
+
+    @staticmethod
+    def parse_first_question(generated_text):
+        """ 📌 Model çıktısındaki "?" ile biten ilk satırı döndürür, yoksa None. """
+        for line in generated_text.split("\n"):
+            line = line.strip("-• ").strip()
+            if line.endswith("?"):  # İlk geçen soru cümlesini al
+                return line
+        return None
 
     def get_fallback_questions(self, form_category):
         """
         📌 **Eğer AI uygun soru üretemezse, form başlığına uygun varsayılan sorular döndür.**
         """
-        fallback_questions = {
-            "Appointment Request Form": [
-                "1. What is the purpose of your appointment?",
-                "2. What date and time are you available?",
-                "3. Do you have any special requests for the appointment?"
-            ],
-            "Customer Feedback Form": [
-                "1. How would you rate our service?",
-                "2. What can we improve?",
-                "3. Would you recommend us to others?"
-            ],
-            "Job Application Form": [
-                "1. What is your highest level of education?",
-                "2. Do you have relevant work experience for this position?",
-                "3. Why do you want to work for our company?"
-            ],
-            "Survey Form": [
-                "1. How frequently do you use our service?",
-                "2. What features do you find most valuable?",
-                "3. What improvements would you suggest?"
-            ]
-        }
-
-        return fallback_questions.get(form_category, ["1. What information would you like to provide?", "2. What is your main concern?", "3. How can we assist you?"])
-    
+        return form_rules.get_fallback_questions(form_category)
+
     def generate_questions(self, form_category, existing_questions, num_questions=5):
         """
         📌 **Formun kategorisine göre AI destekli sorular üretir.**
         - Form başlığına uygun sorular üretir.
         - AI önerdiği soruların formdaki mevcut sorularla aynı olup olmadığını kontrol eder.
+        - Aynı başlık ve sorularla eşzamanlı gelen çağrılar tek üretimde birleştirilir.
         """
+        key = canonical_key(form_category, set(existing_questions), num_questions)
+        try:
+            return self.questions_flight.do(key, lambda: self._generate_questions(form_category, existing_questions, num_questions))
+        except DeadlineExceeded as e:
+            print(f"⏱️ **Soru üretimi son tarihe yetişemedi, varsayılan sorular kullanılıyor:** {e}")
+            return self.get_fallback_questions(form_category)
+
+    def _generate_questions(self, form_category, existing_questions, num_questions):
         if self.model is None:
             print("🚨 **Model yüklenmedi! Soru üretilemiyor.**")
             return ["AI model is not loaded. Unable to generate questions."]
 
-        prompt = f"""
-        Generate {num_questions} unique, relevant questions specifically for a form titled "{form_category}".
-        The questions should match the purpose of the form and provide useful input from the user.
+        prompt = self.build_questions_prompt(form_category, num_questions)
 
-        Ensure that:
-        - Each question is clearly written and numbered (1., 2., 3., etc.).
-        - The response contains ONLY the questions (no additional text or explanations).
-        """
+        existing_questions_lower = {strip_numbering(q).lower() for q in existing_questions}
+
+        def new_questions(questions):
+            return [q for q in questions if strip_numbering(q).lower() not in existing_questions_lower]
 
         try:
-            print(f"📌 **AI'ya Gönderilen Prompt:**\n{prompt}")
+            # 📌 **Aynı/benzer başlık için daha önce üretilmiş sorular varsa tekrar üretme.** Önbellekte formdan
+            # bağımsız (filtrelenmemiş) liste durur; bu formun sorularını çıkarınca yetmiyorsa yeniden üretilir.
+            ai_generated_questions = self.question_cache.get(form_category, scope=f"n={num_questions}")
+            if ai_generated_questions is not None and len(new_questions(ai_generated_questions)) < num_questions:
+                ai_generated_questions = None
 
-            inputs = self.tokenizer(prompt, return_tensors="pt").to(self.model.device)
+            if ai_generated_questions is None:
+                print(f"📌 **AI'ya Gönderilen Prompt:**\n{prompt}")
 
-            with torch.no_grad():
-                outputs = self.model.generate(**inputs, max_new_tokens=250)  
+                generated_text = self.engine.generate_template(
+                    self.QUESTIONS_TEMPLATE, {"form_category": form_category, "num_questions": num_questions},
+                    stop=NumberedItemsParser(num_questions, exclude=existing_questions), max_new_tokens=250
+                )
 
-            generated_text = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
+                print(f"📌 **Raw AI Output:**\n{generated_text}")
 
-            print(f"📌 **Raw AI Output:**\n{generated_text}")
+                # 📌 **Yanıtı temizleyelim**
+                ai_generated_questions = self.parse_numbered_questions(generated_text)
 
-            # 📌 **Yanıtı temizleyelim**
-            ai_generated_questions = []
-            for line in generated_text.split("\n"):
-                line = line.strip("-• ").strip()
-                if line and line[0].isdigit():  
-                    ai_generated_questions.append(line)
+                if not ai_generated_questions:
+                    print("🚨 **AI'dan geçerli soru alınamadı!**")
+                    return ["AI failed to generate proper questions. Please try again."]
 
-            if not ai_generated_questions:
-                print("🚨 **AI'dan geçerli soru alınamadı!**")
-                return ["AI failed to generate proper questions. Please try again."]
+                self.question_cache.put(form_category, ai_generated_questions, scope=f"n={num_questions}")
 
             # 📌 **Zaten formda var olan soruları kaldır**
-            existing_questions_lower = {q.lower().strip() for q in existing_questions}
-            filtered_questions = [q for q in ai_generated_questions if q.lower().strip() not in existing_questions_lower]
+            filtered_questions = new_questions(ai_generated_questions)
 
             if not filtered_questions:
                 print("🚨 **AI suggested questions overlap with existing ones. Using fallback questions.**")
                 return self.get_fallback_questions(form_category)
 
-            return filtered_questions[:num_questions]
+            # 📌 Model istenenden az soru ürettiyse varsayılan sorularla tamamla
+            chosen = {strip_numbering(q).lower() for q in filtered_questions}
+            for question in new_questions(self.get_fallback_questions(form_category)):
+                if len(filtered_questions) >= num_questions:
+                    break
+                if strip_numbering(question).lower() not in chosen:
+                    filtered_questions.append(question)
+
+            return [f"{i}. {strip_numbering(q)}" for i, q in enumerate(filtered_questions[:num_questions], start=1)]
+
+        except DeadlineExceeded as e:
+            print(f"⏱️ **Soru üretimi son tarihe yetişemedi, varsayılan sorular kullanılıyor:** {e}")
+            return self.get_fallback_questions(form_category)
 
         except Exception as e:
             print(f"🚨 AI Error Details: {str(e)}")
@@ -191,43 +183,35 @@ class QuestionGenerator:
     def generate_question_from_user_input(self, user_question, form_purpose):
         """
         📌 Kullanıcının girdisine göre form başlığına uygun AI destekli yeni bir soru üretir.
+        Aynı soru ve başlıkla eşzamanlı gelen çağrılar tek üretimde birleştirilir.
         """
+        key = canonical_key(user_question, form_purpose)
+        try:
+            return self.user_input_flight.do(key, lambda: self._generate_question_from_user_input(user_question, form_purpose))
+        except DeadlineExceeded as e:
+            print(f"⏱️ **Soru önerisi son tarihe yetişemedi, varsayılan sorular kullanılıyor:** {e}")
+            return form_rules.fallback_question_variants(form_purpose)
+
+    def _generate_question_from_user_input(self, user_question, form_purpose):
         if self.model is None:
             print("🚨 **Model yüklenmedi! Soru üretilemiyor.**")
             return ["AI model is not loaded. Unable to generate questions."]
 
         # 📌 **Tutarlı Prompt Formatı**
-        prompt = f"""
-        The user has asked: "{user_question}".
-        Generate a single, unique question that can be added to a form titled "{form_purpose}".
-        Your response should **ONLY** contain the question and **nothing else**.
-        - Do **NOT** provide explanations.
-        - Do **NOT** include answer choices.
-        - Do **NOT** use labels like "Question:", "Options:", or "Explanation:".
-        - The output should be a **single, well-formed question** ending with a question mark (?).
-        """
+        prompt = self.build_user_input_prompt(user_question, form_purpose)
 
         try:
             print(f"📌 **AI'ya Gönderilen Prompt:**\n{prompt}")
 
-            inputs = self.tokenizer(prompt, return_tensors="pt").to(self.model.device)
-
-            with torch.no_grad():
-                outputs = self.model.generate(**inputs, max_new_tokens=100)
-
-            generated_text = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
+            generated_text = self.engine.generate_template(
+                self.USER_INPUT_TEMPLATE, {"user_question": user_question, "form_purpose": form_purpose},
+                stop=FirstQuestionParser(), max_new_tokens=100
+            )
 
             print(f"📌 **Raw AI Output:**\n{generated_text}")
 
             # 📌 **Yanıttan yalnızca ilk soru cümlesini çek**
-            lines = generated_text.split("\n")
-            question = None
-
-            for line in lines:
-                line = line.strip("-• ").strip()
-                if line.endswith("?"):  # İlk geçen soru cümlesini al
-                    question = line
-                    break  # İlk soruyu bulunca dur
+            question = self.parse_first_question(generated_text)
 
             if not question:
                 print("🚨 **AI uygun bir soru üretmedi. Varsayılan soru kullanılıyor.**")
@@ -235,11 +219,62 @@ class QuestionGenerator:
 
             return [question]  # AI'nın ürettiği ilk soruyu döndür
 
+        except DeadlineExceeded as e:
+            print(f"⏱️ **Soru önerisi son tarihe yetişemedi, varsayılan sorular kullanılıyor:** {e}")
+            return form_rules.fallback_question_variants(form_purpose)
+
         except Exception as e:
             print(f"🚨 AI Error Details: {str(e)}")
             return ["AI question generation failed due to an internal error."]
 
 
+    def stream_question_from_user_input(self, user_question, form_purpose, cancel_event=None, context=None):
+        """
+        📌 **`generate_question_from_user_input`'ın akış sürümü: token ve aday soru olaylarını üretildikçe döndürür.**
+        - Olaylar: `token` (yeni metin), `candidate` (tamamlanan soru satırı), `reset` (üretim yeniden başladı,
+          önceki metin geçersiz), `heartbeat`, en sonda `done`.
+        - `cancel_event` kurulursa ya da döngü yarıda kapatılırsa (istemci koptu) üretim durdurulur.
+        - `context` (ya da etkin istek bağlamı) son tarihi geçtiğinde üretim henüz başlamadıysa varsayılan sorular döner.
+        """
+        if self.model is None:
+            print("🚨 **Model yüklenmedi! Soru üretilemiyor.**")
+            yield {"event": "done", "suggested_variants": ["AI model is not loaded. Unable to generate questions."]}
+            return
+
+        context = context or current_context()
+        stream = TokenStream(FirstQuestionParser(), cancel_event)
+        future = self.engine.submit_template(
+            self.USER_INPUT_TEMPLATE, {"user_question": user_question, "form_purpose": form_purpose},
+            stop=stream, context=context, deadline_stop=False, max_new_tokens=100
+        )
+        try:
+            for event in stream.events(future):
+                # 📌 Kuyrukta beklerken son tarih geçtiyse üretimi başlatmadan varsayılanlara dön
+                if event["event"] == "heartbeat" and context is not None and context.expired() and future.cancel():
+                    raise DeadlineExceeded("Question suggestion did not start before the request deadline.")
+                yield event
+            if stream.cancelled:
+                return
+
+            generated_text = future.result()
+            print(f"📌 **Raw AI Output:**\n{generated_text}")
+            question = self.parse_first_question(generated_text)
+            yield {"event": "done", "suggested_variants": [question] if question else ["Could you please provide more details on this topic?"]}
+
+        except DeadlineExceeded as e:
+            print(f"⏱️ **Soru önerisi son tarihe yetişemedi, varsayılan sorular kullanılıyor:** {e}")
+            yield {"event": "done", "suggested_variants": form_rules.fallback_question_variants(form_purpose)}
+
+        except Exception as e:
+            print(f"🚨 AI Error Details: {str(e)}")
+            yield {"event": "done", "suggested_variants": ["AI question generation failed due to an internal error."]}
+
+        finally:
+            # 📌 Henüz başlamamışsa kuyruktan düşer, üretiliyorsa bir sonraki adımda durur
+            if not future.done():
+                stream.cancel()
+                future.cancel()
+
     def generate_question_from_prompt(self, prompt):
         """
         📌 Kullanıcının girdisine göre AI destekli yeni bir soru üretir.
@@ -251,24 +286,12 @@ class QuestionGenerator:
         try:
             print(f"📌 **AI'ya Gönderilen Prompt:**\n{prompt}")
 
-            inputs = self.tokenizer(prompt, return_tensors="pt").to(self.model.device)
-
-            with torch.no_grad():
-                outputs = self.model.generate(**inputs, max_new_tokens=100)
-
-            generated_text = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
+            generated_text = self.engine.generate(prompt, task="question_from_prompt", stop=FirstQuestionParser(), max_new_tokens=100)
 
             print(f"📌 **Raw AI Output:**\n{generated_text}")
 
             # 📌 **Yanıttan yalnızca ilk soru cümlesini çek**
-            lines = generated_text.split("\n")
-            question = None
-
-            for line in lines:
-                line = line.strip("-• ").strip()
-                if line.endswith("?"):  # İlk geçen soru cümlesini al
-                    question = line
-                    break  # İlk soruyu bulunca dur
+            question = self.parse_first_question(generated_text)
 
             if not question:
                 print("🚨 **AI uygun bir soru üretmedi. Varsayılan soru kullanılıyor.**")
@@ -0,0 +1,266 @@
+import os
+import re
+import json
+import time
+import atexit
+import threading
+from collections import OrderedDict
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+def normalize_text(text):
+    """ 📌 Önbellek anahtarı için metni sadeleştirir (küçük harf, tek boşluk, noktalama yok). """
+    text = re.sub(r"[^\w\s]", " ", str(text).lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class _CacheEntry:
+    __slots__ = ("scope", "text", "value", "created_at", "slot", "size")
+
+    def __init__(self, scope, text, value, created_at, embedding=None):
+        self.scope = scope
+        self.text = text
+        self.value = value
+        self.created_at = created_at
+        # 📌 Embedding önbelleğin matrisindeki bu satırda durur; embedding yoksa None
+        self.slot = None
+        # 📌 Bellek sınırı için yaklaşık boyut (JSON uzunluğu + embedding)
+        self.size = len(json.dumps(value)) + len(text) + (embedding.nbytes if embedding is not None else 0)
+
+
+class SemanticCache:
+    """
+    📌 **LLM yanıtları için anlamsal önbellek.**
+    - Önce normalize edilmiş anahtarla birebir eşleşme aranır.
+    - Bulunamazsa `all-MiniLM-L6-v2` embedding'leriyle en benzer kayıt aranır.
+    - LRU + TTL ile eskiyen kayıtlar atılır, toplam boyut `max_bytes` ile sınırlanır.
+    - Embedding'ler `max_entries` satırlık önceden ayrılmış bir matriste tutulur; anlamsal arama tek matris çarpımıdır.
+    - `persist_path` verilirse kayıtlar diske yazılır ve yeniden başlatmada geri yüklenir. Birden fazla worker aynı
+      dosyayı paylaşabilir: yazım dosya kilidi altında diskteki kayıtlarla birleştirilerek yapılır.
+    """
+
+    def __init__(self, namespace, max_entries=None, max_bytes=None, ttl=None,
+                 similarity_threshold=None, persist_path=None):
+        self.namespace = namespace
+        self.max_entries = max_entries or int(os.getenv("SMARTFORM_CACHE_MAX_ENTRIES", "2048"))
+        self.max_bytes = max_bytes or int(float(os.getenv("SMARTFORM_CACHE_MAX_MB", "64")) * 1024 * 1024)
+        self.ttl = ttl if ttl is not None else float(os.getenv("SMARTFORM_CACHE_TTL", "86400"))
+        self.similarity_threshold = similarity_threshold or float(os.getenv("SMARTFORM_CACHE_SIMILARITY", "0.92"))
+
+        cache_dir = os.getenv("SMARTFORM_CACHE_DIR")
+        if persist_path is None and cache_dir:
+            persist_path = os.path.join(cache_dir, f"{namespace}.json")
+        self.persist_path = persist_path
+
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        # 📌 Embedding matrisi ilk embedding'in boyutuyla ayrılır; satır başına kapsam, zaman ve geçerlilik tutulur
+        self._matrix = None
+        self._slot_scopes = np.empty(self.max_entries, dtype=object)
+        self._slot_created = np.zeros(self.max_entries, dtype=np.float64)
+        self._slot_keys = [None] * self.max_entries
+        self._slot_used = np.zeros(self.max_entries, dtype=bool)
+        self._free_slots = list(range(self.max_entries - 1, -1, -1))
+        self._lock = threading.RLock()
+        self._embedder = None
+        self._embedder_failed = False
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "evictions": 0}
+
+        if self.persist_path:
+            self._load()
+            atexit.register(self.save)
+
+    # ------------------------------------------------------------------
+    # Embedding
+    # ------------------------------------------------------------------
+    def _embed(self, text):
+        if self._embedder_failed:
+            return None
+        try:
+            if self._embedder is None:
+                from load_models import AIModelManager
+                self._embedder = AIModelManager.acquire_similarity_model().model
+            vector = self._embedder.encode([text], normalize_embeddings=True)[0]
+            return np.asarray(vector, dtype=np.float32)
+        except Exception as e:
+            print(f"🚨 Önbellek için embedding hesaplanamadı, anlamsal arama kapatılıyor: {e}")
+            self._embedder_failed = True
+            return None
+
+    # ------------------------------------------------------------------
+    # Okuma / Yazma
+    # ------------------------------------------------------------------
+    def _key(self, scope, text):
+        return f"{scope}::{normalize_text(text)}"
+
+    def _candidate_mask(self, scope, now):
+        """ 📌 Aynı kapsamda, süresi dolmamış ve embedding'i olan matris satırları. """
+        mask = self._slot_used & (self._slot_scopes == scope)
+        if self.ttl > 0:
+            mask &= now - self._slot_created <= self.ttl
+        return mask
+
+    def _store_embedding(self, key, entry, embedding):
+        if embedding is None:
+            return
+        if self._matrix is None:
+            self._matrix = np.zeros((self.max_entries, embedding.shape[0]), dtype=np.float32)
+        if embedding.shape[0] != self._matrix.shape[1] or not self._free_slots:
+            return
+        slot = self._free_slots.pop()
+        self._matrix[slot] = embedding
+        self._slot_scopes[slot] = entry.scope
+        self._slot_created[slot] = entry.created_at
+        self._slot_keys[slot] = key
+        self._slot_used[slot] = True
+        entry.slot = slot
+
+    def _is_expired(self, entry, now):
+        return self.ttl > 0 and now - entry.created_at > self.ttl
+
+    def get(self, text, scope=""):
+        """ 📌 **Önbellekte kayıt arar; önce birebir, sonra anlamsal eşleşme.** Yoksa None döner. """
+        key = self._key(scope, text)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._is_expired(entry, now):
+                self._entries.move_to_end(key)
+                self.stats["exact_hits"] += 1
+                return entry.value
+            if entry is not None:
+                self._remove(key)
+
+            has_candidates = self._matrix is not None and bool(np.any(self._candidate_mask(scope, now)))
+
+        if has_candidates:
+            query = self._embed(normalize_text(text))
+            if query is not None and query.shape[0] == self._matrix.shape[1]:
+                with self._lock:
+                    mask = self._candidate_mask(scope, now)
+                    if np.any(mask):
+                        scores = np.where(mask, self._matrix @ query, -np.inf)
+                        best = int(np.argmax(scores))
+                        if scores[best] >= self.similarity_threshold:
+                            best_key = self._slot_keys[best]
+                            self._entries.move_to_end(best_key)
+                            self.stats["semantic_hits"] += 1
+                            return self._entries[best_key].value
+
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def put(self, text, value, scope=""):
+        """ 📌 Yanıtı önbelleğe ekler; sınırlar aşılırsa en eski kayıtları atar. """
+        normalized = normalize_text(text)
+        embedding = self._embed(normalized)
+        self._insert(self._key(scope, text), _CacheEntry(scope, normalized, value, time.time(), embedding), embedding)
+
+    def _insert(self, key, entry, embedding):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._total_bytes += entry.size
+            # 📌 Matris satırı tükenmesin diye önce eski kayıtlar atılır (satır sayısı = max_entries)
+            self._evict()
+            if key in self._entries:
+                self._store_embedding(key, entry, embedding)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry.size
+        if entry.slot is not None:
+            self._slot_used[entry.slot] = False
+            self._slot_scopes[entry.slot] = None
+            self._slot_keys[entry.slot] = None
+            self._free_slots.append(entry.slot)
+            entry.slot = None
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes):
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.stats["evictions"] += 1
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+            stats["size_kb"] = round(self._total_bytes / 1024, 1)
+        return stats
+
+    # ------------------------------------------------------------------
+    # Disk
+    # ------------------------------------------------------------------
+    def _records(self, now):
+        return {
+            self._key(e.scope, e.text): {
+                "scope": e.scope,
+                "text": e.text,
+                "value": e.value,
+                "created_at": e.created_at,
+                "embedding": self._matrix[e.slot].tolist() if e.slot is not None else None,
+            }
+            for e in self._entries.values() if not self._is_expired(e, now)
+        }
+
+    def save(self):
+        """
+        📌 Süresi dolmamış kayıtları diske yazar.
+        Dosya kilidi altında diskteki kayıtlarla birleştirilir (aynı anahtarda yeni olan kalır); böylece kapanışta
+        aynı anda yazan worker'lar birbirinin kayıtlarını silmez ve yarım dosya bırakmaz.
+        """
+        if not self.persist_path:
+            return
+        now = time.time()
+        with self._lock:
+            records = self._records(now)
+
+        try:
+            os.makedirs(os.path.dirname(self.persist_path) or ".", exist_ok=True)
+            with open(f"{self.persist_path}.lock", "w") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                for record in self._read_records():
+                    key = self._key(record["scope"], record["text"])
+                    if record["created_at"] > records.get(key, {"created_at": -1})["created_at"] and \
+                            not (self.ttl > 0 and now - record["created_at"] > self.ttl):
+                        records[key] = record
+                merged = sorted(records.values(), key=lambda record: record["created_at"])[-self.max_entries:]
+                tmp_path = f"{self.persist_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w") as file:
+                    json.dump(merged, file)
+                os.replace(tmp_path, self.persist_path)
+        except Exception as e:
+            print(f"🚨 Önbellek diske yazılamadı: {e}")
+
+    def _read_records(self):
+        if not os.path.exists(self.persist_path):
+            return []
+        with open(self.persist_path, "r") as file:
+            return json.load(file)
+
+    def _load(self):
+        try:
+            records = self._read_records()
+        except Exception as e:
+            print(f"🚨 Önbellek dosyası okunamadı: {e}")
+            return
+
+        now = time.time()
+        for record in sorted(records, key=lambda record: record["created_at"]):
+            embedding = np.asarray(record["embedding"], dtype=np.float32) if record.get("embedding") else None
+            entry = _CacheEntry(record["scope"], record["text"], record["value"], record["created_at"], embedding)
+            if self._is_expired(entry, now):
+                continue
+            self._insert(self._key(entry.scope, entry.text), entry, embedding)
+        if records:
+            print(f"✅ **{self.namespace} önbelleği diskten yüklendi: {len(self._entries)} kayıt**")
@@ -0,0 +1,92 @@
+import os
+import time
+import contextvars
+from contextlib import contextmanager
+
+# 📌 **Öncelik sınıfları: küçük değer önce çalışır**
+PRIORITY_CLASSES = {"interactive": 0, "standard": 1, "batch": 2}
+
+# 📌 **Sınıf başına varsayılan son tarih (ms); 0 son tarih yok demektir**
+DEFAULT_DEADLINES_MS = {
+    "interactive": float(os.getenv("SMARTFORM_DEADLINE_INTERACTIVE_MS", "10000")),
+    "standard": float(os.getenv("SMARTFORM_DEADLINE_STANDARD_MS", "60000")),
+    "batch": float(os.getenv("SMARTFORM_DEADLINE_BATCH_MS", "0")),
+}
+
+# 📌 **Varsayılan son tarih en az "ölçülen üretim süresi x bu katsayı" kadar uzatılır**
+DEADLINE_HEADROOM = float(os.getenv("SMARTFORM_DEADLINE_HEADROOM", "1.5"))
+
+
+class DeadlineExceeded(Exception):
+    """ 📌 İş son tarihinden önce bitirilemeyecek; çağıran zaman aşımını beklemeden yedek değeri döndürmeli. """
+
+
+class RequestContext:
+    """
+    📌 **Bir isteğin öncelik sınıfı ve son tarihi.**
+    - Sınıflar: `interactive` (yazarken öneri), `standard` (tek form analizi), `batch` (toplu işler).
+    - İstemci `X-Priority` ve `X-Deadline-Ms` başlıklarıyla uç varsayılanlarını değiştirebilir.
+    - Varsayılan son tarih, görevin ölçülen üretim süresine göre uzatılır (`fit_estimate`); açıkça verilen son tarih uzatılmaz.
+    - Etkin bağlam `request_context` ile kurulur; analiz aşamalarını çalıştıran iş parçacıklarına kopyalanır.
+    """
+
+    def __init__(self, priority="standard", deadline_ms=None):
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown priority class '{priority}'")
+        self.priority = priority
+        self.rank = PRIORITY_CLASSES[priority]
+        self.explicit = deadline_ms is not None
+        deadline_ms = DEFAULT_DEADLINES_MS[priority] if deadline_ms is None else deadline_ms
+        self.deadline = time.monotonic() + deadline_ms / 1000.0 if deadline_ms and deadline_ms > 0 else None
+
+    @classmethod
+    def from_headers(cls, headers, default_priority):
+        """ 📌 İstek başlıklarından bağlam oluşturur; geçersiz değerlerde uç varsayılanı kullanılır. """
+        priority = (headers.get("X-Priority") or default_priority).strip().lower()
+        if priority not in PRIORITY_CLASSES:
+            priority = default_priority
+        try:
+            deadline_ms = float(headers.get("X-Deadline-Ms")) if headers.get("X-Deadline-Ms") else None
+        except ValueError:
+            deadline_ms = None
+        return cls(priority, deadline_ms)
+
+    def remaining(self):
+        """ 📌 Son tarihe kalan süre (sn); son tarih yoksa None. """
+        return None if self.deadline is None else self.deadline - time.monotonic()
+
+    def expired(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def fit_estimate(self, estimate):
+        """ 📌 Varsayılan son tarihi, `estimate` saniyelik işin (boşta bir motorda) sığacağı kadar uzatır. """
+        if self.explicit or self.deadline is None or not estimate:
+            return
+        self.deadline = max(self.deadline, time.monotonic() + DEADLINE_HEADROOM * estimate)
+
+    def can_finish(self, estimate):
+        """ 📌 `estimate` saniyelik bir iş son tarihten önce bitebilir mi? """
+        return self.deadline is None or time.monotonic() + estimate <= self.deadline
+
+
+_current = contextvars.ContextVar("smartform_request_context", default=None)
+
+
+def current_context():
+    """ 📌 Etkin istek bağlamı; istek dışında (CLI, ısınma) None. """
+    return _current.get()
+
+
+@contextmanager
+def request_context(context):
+    """ 📌 Blok boyunca `context`'i etkin istek bağlamı yapar. """
+    token = _current.set(context)
+    try:
+        yield context
+    finally:
+        _current.reset(token)
+
+
+def deadline_expired():
+    context = current_context()
+    return context is not None and context.expired()
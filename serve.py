@@ -0,0 +1,48 @@
+"""
+📌 **SmartForm API'sini önceden çatallanmış (pre-fork) gunicorn süreçleriyle sunar.**
+
+- Her süreç uygulamayı kendisi içe aktarır ve modelleri arka planda yükler (`/readyz` hazır olunca 200 döner).
+- `SMARTFORM_WORKERS` süreçlere aktarılır: torch iş parçacıkları süreçler arasında bölünür ve model ağırlıkları
+  safetensors dosyalarından eşlenerek sayfa önbelleğinde tek kopya olarak paylaşılır.
+- Her süreçteki iş parçacıkları (`--threads`) eşzamanlı istekleri aynı batching motoruna toplar.
+
+Kullanım:
+    python serve.py --workers 4 [--threads 8] [--bind 0.0.0.0:5006]
+"""
+import os
+import argparse
+from gunicorn.app.base import BaseApplication
+
+
+class SmartFormServer(BaseApplication):
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        # 📌 İçe aktarma süreç çatallandıktan sonra yapılır; her süreç kendi arka plan yükleyicisini başlatır
+        from app import app
+        return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the SmartForm API with several pre-forked worker processes.")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("SMARTFORM_WORKERS", "2")))
+    parser.add_argument("--threads", type=int, default=8, help="Request threads per worker process.")
+    parser.add_argument("--bind", default="0.0.0.0:5006")
+    parser.add_argument("--timeout", type=int, default=300, help="Seconds before a silent worker is restarted.")
+    args = parser.parse_args()
+
+    os.environ["SMARTFORM_WORKERS"] = str(args.workers)
+    SmartFormServer({
+        "bind": args.bind,
+        "workers": args.workers,
+        "threads": args.threads,
+        "worker_class": "gthread",
+        "timeout": args.timeout,
+        "preload_app": False,
+    }).run()
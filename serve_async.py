@@ -0,0 +1,195 @@
+"""
+📌 **SmartForm API'si için asenkron sunum modu (aiohttp olay döngüsü + sabit model işçisi havuzu).**
+
+- Bağlantılar, gövde okuma, kabul kontrolü ve SSE yazımı olay döngüsünde yapılır; iş parçacığı harcamaz.
+- Analiz uçları (`/analyze-ai*`) Flask uygulamasını `SMARTFORM_INFERENCE_WORKERS` adet model
+  işçisinde çalıştırır. Kuyruk `SMARTFORM_INFERENCE_QUEUE` ile sınırlıdır. Kapasite aşılırsa istek hemen 503, istemci
+  başına sınır (`SMARTFORM_MAX_REQUESTS_PER_CLIENT`) aşılırsa 429 döner; ikisinde de `Retry-After` başlığı olur.
+- Her yanıtta kuyruk bekleme ve hesaplama süreleri ayrı raporlanır (`Server-Timing`, `X-Queue-Wait-Ms`, `X-Compute-Ms`);
+  SSE akışlarında hesaplama akış bitene kadar sürdüğü için süreler akışın sonunda yorum satırı olarak gelir.
+  Yüzdelikler `/metrics` altında `serving` anahtarındadır.
+- Etkileşimli uçlar (`/suggest-question*`) kendi işçi havuzunda (`SMARTFORM_INTERACTIVE_WORKERS`) çalışır; böylece
+  analiz yığılmasında işçi beklemez, LLM kuyruğunda da öncelik sınıfı sayesinde analizlerin önüne geçer.
+- Diğer uçlar (davranış, sağlık, metrikler) ayrı küçük bir havuzda çalışır ve kuyruktan etkilenmez.
+
+Kullanım:
+    python serve_async.py [--host 0.0.0.0] [--port 5006]
+"""
+import io
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from urllib.parse import unquote
+from concurrent.futures import ThreadPoolExecutor
+from aiohttp import web
+from inference_queue import InferenceQueue, Overloaded
+
+INFERENCE_ROUTES = ("/analyze-ai", "/analyze-ai/batch", "/analyze-ai/stream")
+INTERACTIVE_ROUTES = ("/suggest-question", "/suggest-question/stream")
+HOP_BY_HOP = {"connection", "keep-alive", "transfer-encoding", "content-length"}
+
+
+def build_environ(request, body):
+    """ 📌 aiohttp isteğinden WSGI ortamını oluşturur. """
+    path, _, query = request.raw_path.partition("?")
+    host, _, port = (request.host or "localhost").partition(":")
+    environ = {
+        "REQUEST_METHOD": request.method,
+        "SCRIPT_NAME": "",
+        "PATH_INFO": unquote(path, encoding="latin-1"),
+        "QUERY_STRING": query,
+        "SERVER_NAME": host,
+        "SERVER_PORT": port or ("443" if request.secure else "80"),
+        "SERVER_PROTOCOL": f"HTTP/{request.version.major}.{request.version.minor}",
+        "REMOTE_ADDR": request.remote or "",
+        "CONTENT_TYPE": request.headers.get("Content-Type", ""),
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": request.scheme,
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for name, value in request.headers.items():
+        key = "HTTP_" + name.upper().replace("-", "_")
+        if key in ("HTTP_CONTENT_TYPE", "HTTP_CONTENT_LENGTH"):
+            continue
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def call_wsgi(wsgi_app, environ):
+    """
+    📌 Flask uygulamasını çağırır. Dönüş: (durum kodu, başlıklar, gövde, akış).
+    SSE yanıtlarında gövde None, akış ise parça parça okunacak yineleyicidir.
+    """
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started["status"], started["headers"] = int(status.split(" ", 1)[0]), headers
+        return lambda data: None
+
+    result = wsgi_app(environ, start_response)
+    headers = [(name, value) for name, value in started["headers"] if name.lower() not in HOP_BY_HOP]
+    if any(name.lower() == "content-type" and value.startswith("text/event-stream") for name, value in headers):
+        return started["status"], headers, None, iter(result)
+    try:
+        return started["status"], headers, b"".join(result), None
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+
+
+def overloaded_response(error):
+    return web.Response(status=error.status, text=json.dumps({"error": str(error)}), content_type="application/json",
+                        headers={"Retry-After": str(error.retry_after)})
+
+
+class AsyncServer:
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self.inference = InferenceQueue("inference")
+        self.interactive = InferenceQueue("interactive", workers=int(os.getenv("SMARTFORM_INTERACTIVE_WORKERS", "4")))
+        # 📌 Hafif uçlar ve SSE akışlarının okunması model işçilerini meşgul etmez
+        self._light_executor = ThreadPoolExecutor(max_workers=int(os.getenv("SMARTFORM_LIGHT_WORKERS", "4")),
+                                                  thread_name_prefix="light-worker")
+        stream_readers = sum(queue.workers + queue.max_queue for queue in (self.inference, self.interactive))
+        self._stream_executor = ThreadPoolExecutor(max_workers=stream_readers, thread_name_prefix="stream-reader")
+
+    async def handle(self, request):
+        body = await request.read()
+        environ = build_environ(request, body)
+
+        inference = self.interactive if request.path in INTERACTIVE_ROUTES else self.inference
+        if request.path not in INFERENCE_ROUTES + INTERACTIVE_ROUTES:
+            status, headers, body, _ = await asyncio.get_running_loop().run_in_executor(
+                self._light_executor, call_wsgi, self.wsgi_app, environ)
+            return web.Response(status=status, headers=headers, body=body)
+
+        try:
+            async with inference.admit(client=request.remote):
+                (status, headers, body, stream), waited, computed = await inference.call(
+                    lambda: call_wsgi(self.wsgi_app, environ), streaming=lambda result: result[3] is not None)
+                if stream is None:
+                    headers = headers + [
+                        ("Server-Timing", f"queue;dur={1000 * waited:.1f}, compute;dur={1000 * computed:.1f}"),
+                        ("X-Queue-Wait-Ms", f"{1000 * waited:.1f}"),
+                        ("X-Compute-Ms", f"{1000 * computed:.1f}"),
+                    ]
+                    return web.Response(status=status, headers=headers, body=body)
+                # 📌 Akış bitene kadar kuyruktaki yer tutulur; böylece eşzamanlı üretim sayısı sınırlı kalır
+                headers = headers + [("X-Queue-Wait-Ms", f"{1000 * waited:.1f}")]
+                return await self.stream(request, status, headers, stream, inference, waited, computed)
+        except Overloaded as e:
+            return overloaded_response(e)
+
+    async def stream(self, request, status, headers, stream, inference, waited, setup):
+        """
+        📌 **SSE yanıtını olay döngüsünden yazar.**
+        - Hesaplama süresi yineleyici tükenene ya da kapanana kadar ölçülür; başlıklar o anda gönderilmiş olduğundan
+          kuyruk/hesaplama süreleri akışın sonunda `: server-timing ...` yorum satırı olarak yazılır.
+        - İstemci koparsa ya da görev iptal edilirse yineleyici kapatılır (üretim durur); iptal yeniden fırlatılır.
+        """
+        started = time.monotonic() - setup
+        response = web.StreamResponse(status=status, headers=headers)
+        pending = None
+        failed = False
+        try:
+            await response.prepare(request)
+            while True:
+                pending = self._stream_executor.submit(next, stream, None)
+                chunk = await asyncio.wrap_future(pending)
+                if chunk is None:
+                    break
+                await response.write(chunk if isinstance(chunk, bytes) else chunk.encode("utf-8"))
+            computed = time.monotonic() - started
+            await response.write(f": server-timing queue;dur={1000 * waited:.1f}, compute;dur={1000 * computed:.1f}\n\n".encode("utf-8"))
+            await response.write_eof()
+        except ConnectionResetError:
+            print("⚠️ İstemci akış sırasında bağlantıyı kopardı, üretim iptal ediliyor.")
+        except asyncio.CancelledError:
+            print("⚠️ Akış görevi iptal edildi, üretim durduruluyor.")
+            raise
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._close_stream(stream, pending, lambda: inference.finish_stream(time.monotonic() - started, error=failed))
+        return response
+
+    def _close_stream(self, stream, pending, on_closed):
+        """
+        📌 Yineleyiciyi kapatır (soru asistanının üretimi durur) ve hesaplama süresini kaydeder.
+        Süren bir `next` çağrısı varsa kapatma onun bitişine bırakılır; iptal edilen görev beklemez.
+        """
+        def close(_=None):
+            try:
+                if hasattr(stream, "close"):
+                    stream.close()
+            finally:
+                on_closed()
+
+        if pending is None or pending.done():
+            self._stream_executor.submit(close)
+        else:
+            pending.add_done_callback(lambda _: self._stream_executor.submit(close))
+
+    def build(self):
+        application = web.Application(client_max_size=int(os.getenv("SMARTFORM_MAX_BODY_MB", "32")) * 1024 ** 2)
+        application.router.add_route("*", "/{path:.*}", self.handle)
+        return application
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the SmartForm API on an asyncio event loop with bounded inference queues.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5006)
+    args = parser.parse_args()
+
+    from app import app
+    web.run_app(AsyncServer(app).build(), host=args.host, port=args.port)
@@ -0,0 +1,251 @@
+"""
+📌 **Model ağırlıklarını safetensors dosyalarından bellek eşlemeli (mmap) olarak yükler.**
+
+Birden fazla sunucu süreci aynı dosyayı eşlediğinde ağırlıklar işletim sisteminin sayfa önbelleğinde tek kopya
+olarak durur; N süreç yaklaşık bir model kopyası kadar bellek kullanır. Eşleme MAP_PRIVATE'tır: ağırlığa yazan
+(ör. kuantizasyon) süreç yalnızca kendi kopyasını değiştirir, dosya hiçbir zaman değişmez.
+
+Dosyanın dtype'ı sunum dtype'ından farklıysa (ör. float32 dosya, bfloat16 sunum) ağırlıklar bir kez sunum dtype'ında
+`SMARTFORM_SHARED_WEIGHTS_DIR` altına yazılır ve o dosya eşlenir; dönüştürme yapılamazsa paylaşım reddedilir.
+`load_shared` modeli parametresiz (meta) kurup parametreleri doğrudan eşlenmiş tensörlere bağlar; süreç hiçbir
+aşamada ağırlıkların özel bir kopyasını ayırmaz.
+"""
+import os
+import gc
+import re
+import json
+import struct
+import ctypes
+from contextlib import contextmanager
+import torch
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+SAFETENSORS_DTYPES = {
+    "F64": torch.float64, "F32": torch.float32, "F16": torch.float16, "BF16": torch.bfloat16,
+    "I64": torch.int64, "I32": torch.int32, "I16": torch.int16, "I8": torch.int8, "U8": torch.uint8, "BOOL": torch.bool,
+}
+
+
+def shared_weights_enabled():
+    """
+    📌 `SMARTFORM_SHARED_WEIGHTS`: 1 (her zaman), 0 (hiçbir zaman) ya da auto (varsayılan;
+    `SMARTFORM_WORKERS` 1'den büyükse, yani çok süreçli sunumda açık).
+    """
+    mode = os.getenv("SMARTFORM_SHARED_WEIGHTS", "auto")
+    if mode == "auto":
+        return int(os.getenv("SMARTFORM_WORKERS", "1")) > 1
+    return mode == "1"
+
+
+def checkpoint_files(name_or_path):
+    """ 📌 Modelin safetensors dosyaları (yerel dizin ya da Hugging Face önbelleği); bulunamazsa boş liste. """
+    directory = name_or_path
+    if not os.path.isdir(directory):
+        from huggingface_hub import snapshot_download
+
+        try:
+            directory = snapshot_download(name_or_path, allow_patterns=["*.safetensors", "*.safetensors.index.json"],
+                                          local_files_only=True)
+        except Exception:
+            return []
+
+    index_path = os.path.join(directory, "model.safetensors.index.json")
+    if os.path.exists(index_path):
+        with open(index_path, "r", encoding="utf-8") as f:
+            shards = sorted(set(json.load(f)["weight_map"].values()))
+        return [os.path.join(directory, shard) for shard in shards]
+
+    path = os.path.join(directory, "model.safetensors")
+    return [path] if os.path.exists(path) else []
+
+
+def _read_header(path):
+    with open(path, "rb") as f:
+        header_size = struct.unpack("<Q", f.read(8))[0]
+        return header_size, json.loads(f.read(header_size))
+
+
+def _file_dtypes(path):
+    return {SAFETENSORS_DTYPES[info["dtype"]] for name, info in _read_header(path)[1].items() if name != "__metadata__"}
+
+
+def serving_checkpoint_files(name_or_path, dtype):
+    """
+    📌 **Ağırlıkları `dtype`'ta tutan safetensors dosyaları.** Dosyanın kayan noktalı tensörleri başka dtype'taysa
+    bir kez dönüştürülüp `SMARTFORM_SHARED_WEIGHTS_DIR` altına yazılır (süreçler arası dosya kilidiyle, tek yazıcı).
+    Dosya bulunamazsa ya da dönüştürülemezse boş liste döner.
+    """
+    files = checkpoint_files(name_or_path)
+    if not files or all(d == dtype or not d.is_floating_point for path in files for d in _file_dtypes(path)):
+        return files
+
+    cache_root = os.getenv("SMARTFORM_SHARED_WEIGHTS_DIR", os.path.join(os.path.expanduser("~"), ".cache", "smartform", "shared_weights"))
+    directory = os.path.join(cache_root, re.sub(r"[^\w.-]+", "--", os.path.abspath(name_or_path) if os.path.isdir(name_or_path)
+                                                else name_or_path) + "-" + str(dtype).replace("torch.", ""))
+    converted = [os.path.join(directory, os.path.basename(path)) for path in files]
+    if all(os.path.exists(path) for path in converted):
+        return converted
+
+    try:
+        from safetensors.torch import save_file
+
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, ".lock"), "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            for source, target in zip(files, converted):
+                if os.path.exists(target):
+                    continue
+                tensors = {name: tensor.to(dtype) if tensor.is_floating_point() else tensor
+                           for name, tensor in mmap_safetensors(source).items()}
+                tmp_path = f"{target}.{os.getpid()}.tmp"
+                save_file(tensors, tmp_path, metadata={"format": "pt"})
+                os.replace(tmp_path, target)
+                del tensors
+        print(f"🔁 **{name_or_path}: ağırlıklar paylaşım için {dtype} olarak {directory} altına yazıldı.**")
+        return converted
+    except Exception as e:
+        print(f"⚠️ **{name_or_path} ağırlıkları {dtype}'a dönüştürülemedi, paylaşım kapalı: {e}**")
+        return []
+
+
+def mmap_safetensors(path):
+    """ 📌 **Dosyadaki tüm tensörleri kopyalamadan, eşlenmiş sayfalara bakan görünümler olarak döndürür.** """
+    header_size, header = _read_header(path)
+    storage = torch.UntypedStorage.from_file(path, shared=False, nbytes=os.path.getsize(path))
+    data_start = 8 + header_size
+    tensors = {}
+    for name, info in header.items():
+        if name == "__metadata__":
+            continue
+        dtype = SAFETENSORS_DTYPES[info["dtype"]]
+        start, _ = info["data_offsets"]
+        element_size = torch.empty(0, dtype=dtype).element_size()
+        if (data_start + start) % element_size:
+            raise ValueError(f"Misaligned tensor {name} in {path}; cannot map without copying.")
+        tensors[name] = torch.empty(0, dtype=dtype).set_(storage, (data_start + start) // element_size, info["shape"])
+    return tensors
+
+
+def _release_heap():
+    """ 📌 Eski (kopyalanmış) ağırlıkların belleği işletim sistemine geri verilir. """
+    gc.collect()
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def _match_keys(tensors, own, prefix):
+    """ 📌 Dosyada taban model öneki (ör. `model.`) olsa da olmasa da anahtarları modelinkilerle eşleştirir. """
+    matched = {}
+    for name, tensor in tensors.items():
+        if name not in own:
+            name = name[len(prefix):] if name.startswith(prefix) and name[len(prefix):] in own else prefix + name
+        matched[name] = tensor
+    return matched
+
+
+def _serving_dtype(model):
+    dtypes = {p.dtype for p in model.parameters() if p.is_floating_point()}
+    return dtypes.pop() if len(dtypes) == 1 else None
+
+
+def share_weights(model, name_or_path):
+    """
+    📌 **Yüklenmiş bir modelin parametrelerini safetensors dosyasının eşlenmiş sayfalarıyla değiştirir.**
+    - Dosya modelin dtype'ında değilse önce o dtype'ta bir kopyası yazılır (`serving_checkpoint_files`).
+    - Sadece dtype ve şekli birebir tutan tensörler değiştirilir; tutmayanlar sayılıp loglanır.
+    - Model zaten yüklenmiş olduğundan geçici bir özel kopya oluşur; yeni yüklemelerde `load_shared` tercih edilir.
+    Dönüş: paylaşılan bayt sayısı.
+    """
+    dtype = _serving_dtype(model)
+    if dtype is None:
+        print(f"⚠️ **{name_or_path}: parametreler karışık dtype'ta, ağırlıklar paylaşılmayacak.**")
+        return 0
+    files = serving_checkpoint_files(name_or_path, dtype)
+    if not files:
+        print(f"⚠️ **{name_or_path} için {dtype} safetensors bulunamadı, ağırlıklar paylaşılmayacak.**")
+        return 0
+
+    own = model.state_dict()
+    prefix = f"{getattr(model, 'base_model_prefix', '')}."
+    shared, skipped, shared_bytes = {}, [], 0
+    for path in files:
+        for name, tensor in _match_keys(mmap_safetensors(path), own, prefix).items():
+            target = own.get(name)
+            if target is None or target.dtype != tensor.dtype or target.shape != tensor.shape or target.device.type != "cpu":
+                skipped.append(name)
+                continue
+            shared[name] = tensor
+            shared_bytes += tensor.numel() * tensor.element_size()
+
+    model.load_state_dict(shared, strict=False, assign=True)
+    if hasattr(model, "tie_weights"):
+        model.tie_weights()
+    _release_heap()
+
+    print(f"🔗 **{name_or_path}: {shared_bytes / 1024 ** 2:.0f} MB ağırlık süreçler arasında paylaşılıyor"
+          + (f" ({len(skipped)} tensör eşleşmedi ve kopya olarak kaldı, ör. {skipped[0]})" if skipped else "") + "**")
+    return shared_bytes
+
+
+@contextmanager
+def _meta_parameters():
+    """ 📌 Blok içinde oluşturulan parametreler meta cihazında kalır (bellek ayrılmaz); tamponlar normal oluşur. """
+    register_parameter = torch.nn.Module.register_parameter
+
+    def register_on_meta(module, name, param):
+        register_parameter(module, name, param)
+        if param is not None:
+            module._parameters[name] = torch.nn.Parameter(module._parameters[name].to("meta"),
+                                                          requires_grad=param.requires_grad)
+
+    torch.nn.Module.register_parameter = register_on_meta
+    try:
+        yield
+    finally:
+        torch.nn.Module.register_parameter = register_parameter
+
+
+def load_shared(model_class, name_or_path, dtype):
+    """
+    📌 **Modeli parametresiz kurar ve parametreleri eşlenmiş safetensors tensörlerine bağlar (`assign=True`).**
+    `model_class` bir `AutoModelFor...` sınıfıdır. Dosya bulunamaz ya da her parametre dosyadan gelmezse None döner;
+    çağıran normal yüklemeye döner.
+    """
+    from transformers import AutoConfig, GenerationConfig
+
+    files = serving_checkpoint_files(name_or_path, dtype)
+    if not files:
+        return None
+
+    config = AutoConfig.from_pretrained(name_or_path)
+    with _meta_parameters():
+        model = model_class.from_config(config)
+
+    own = model.state_dict()
+    prefix = f"{getattr(model, 'base_model_prefix', '')}."
+    tensors = {}
+    for path in files:
+        tensors.update(_match_keys(mmap_safetensors(path), own, prefix))
+    model.load_state_dict({name: tensor for name, tensor in tensors.items() if name in own}, strict=False, assign=True)
+    if hasattr(model, "tie_weights"):
+        model.tie_weights()
+
+    missing = [name for name, param in model.named_parameters() if param.is_meta]
+    if missing:
+        print(f"⚠️ **{name_or_path}: {len(missing)} parametre dosyada yok (ör. {missing[0]}), paylaşımsız yüklenecek.**")
+        return None
+    try:
+        model.generation_config = GenerationConfig.from_pretrained(name_or_path)
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    shared_bytes = sum(p.numel() * p.element_size() for p in model.parameters())
+    print(f"🔗 **{name_or_path}: {shared_bytes / 1024 ** 2:.0f} MB ağırlık kopyalanmadan eşlendi ({dtype}).**")
+    return model.eval()
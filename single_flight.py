@@ -0,0 +1,106 @@
+import os
+import copy
+import json
+import hashlib
+import threading
+from concurrent.futures import Future, wait
+from scheduling import DeadlineExceeded, current_context
+
+
+def _normalize(value):
+    """ 📌 Anahtar için girdiyi sadeleştirir: boşluklar tekilleştirilir, küme/sözlük sırası önemsizleşir. """
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (set, frozenset)):
+        return sorted((_normalize(v) for v in value), key=lambda v: json.dumps(v, sort_keys=True, default=str))
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def canonical_key(*parts):
+    """ 📌 **Normalize edilmiş girdilerin kanonik özeti (sha256).** Aynı anlamdaki iki istek aynı anahtarı alır. """
+    payload = json.dumps(_normalize(parts), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """
+    📌 **Aynı anahtarla eşzamanlı gelen çağrıları tek bir hesaplamada birleştirir (single-flight).**
+    - İlk çağıran hesaplamayı yapar; o sürerken gelen kopyalar aynı sonucu (ya da hatayı) bekler.
+    - Hesaplama bitince anahtar bırakılır; sonuç önbelleğe alınmaz (önbellek `SemanticCache`'in işi).
+    - Bekleyenler sonucun kopyasını alır, böylece bir çağıranın değişikliği diğerini etkilemez.
+    - Bekleyen, kendi istek bağlamının son tarihinden fazla beklemez; süre dolarsa `DeadlineExceeded` alır.
+    - `SMARTFORM_SINGLE_FLIGHT=0` birleştirmeyi kapatır.
+    """
+    _groups = {}
+    _groups_lock = threading.Lock()
+
+    def __init__(self, name, enabled=None):
+        self.name = name
+        self.enabled = enabled if enabled is not None else os.getenv("SMARTFORM_SINGLE_FLIGHT", "1") != "0"
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "executions": 0, "coalesced": 0, "errors": 0, "timeouts": 0}
+        with SingleFlight._groups_lock:
+            SingleFlight._groups[name] = self
+
+    def _wait(self, future):
+        """ 📌 Liderin sonucunu, bekleyenin son tarihine kadar bekler. """
+        context = current_context()
+        remaining = context.remaining() if context is not None else None
+        done, _ = wait([future], timeout=None if remaining is None else max(0.0, remaining))
+        if not done:
+            with self._lock:
+                self.stats["timeouts"] += 1
+            raise DeadlineExceeded(f"'{self.name}' result was not ready before the request deadline.")
+        return future.result()
+
+    def do(self, key, func):
+        """ 📌 `func()` sonucunu döndürür; aynı `key` ile süren bir hesaplama varsa onu bekler. """
+        if not self.enabled:
+            with self._lock:
+                self.stats["calls"] += 1
+                self.stats["executions"] += 1
+            return func()
+
+        with self._lock:
+            self.stats["calls"] += 1
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.stats["coalesced"] += 1
+            else:
+                self.stats["executions"] += 1
+                self._in_flight[key] = leader = Future()
+
+        if future is not None:
+            return copy.deepcopy(self._wait(future))
+
+        try:
+            result = func()
+            leader.set_result(result)
+            return result
+        except BaseException as e:
+            with self._lock:
+                self.stats["errors"] += 1
+            leader.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["in_flight"] = len(self._in_flight)
+        stats["enabled"] = self.enabled
+        return stats
+
+    @classmethod
+    def get_all_stats(cls):
+        """ 📌 Tüm birleştirme gruplarının sayaçları (`/metrics`). """
+        with cls._groups_lock:
+            groups = dict(cls._groups)
+        return {name: group.get_stats() for name, group in groups.items()}
@@ -0,0 +1,181 @@
+import os
+import time
+import threading
+from collections import deque
+import torch
+from model_registry import ModelRegistry
+
+
+class SpeculativeDecoder:
+    """
+    📌 **Küçük bir taslak (draft) modelle yardımlı (assisted) üretim.**
+    - Taslak model birkaç token önerir, ana model (Gemma) bunları tek bir ileri geçişte doğrular.
+    - Hangi görevlerde kullanılacağı `SMARTFORM_SPECULATIVE_TASKS` ile seçilir (ör. generate_questions,intent).
+    - Kabul oranı görev başına izlenir; son `min_samples` istekte ortalama `min_acceptance` altına düşerse
+      o görev `cooldown` saniye boyunca normal üretime döner, sonra tekrar denenir.
+    - Yardımlı üretim batch boyutu 1 ile çalışır; bu yüzden istekler tek tek üretilir.
+    - Önerilen/kabul edilen token sayıları yardımlı üretimin aday üreticisinden okunur ve yalnızca çağıran iş
+      parçacığının üretimine yazılır; paylaşılan modeli aynı anda kullanan başka iş parçacıkları sayılmaz.
+    """
+    _recording = threading.local()
+
+    def __init__(self, model, tokenizer, draft_model, draft_tokenizer, tasks,
+                 min_acceptance=None, min_samples=None, cooldown=None):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.draft_model = draft_model
+        self.draft_tokenizer = draft_tokenizer
+        self.tasks = set(tasks)
+        self.min_acceptance = min_acceptance if min_acceptance is not None else float(os.getenv("SMARTFORM_SPECULATIVE_MIN_ACCEPTANCE", "0.4"))
+        self.min_samples = min_samples or int(os.getenv("SMARTFORM_SPECULATIVE_MIN_SAMPLES", "5"))
+        self.cooldown = cooldown if cooldown is not None else float(os.getenv("SMARTFORM_SPECULATIVE_COOLDOWN", "300"))
+
+        # 📌 Taslak ve ana model aynı sözlüğü kullanmıyorsa token'lar metin üzerinden eşlenir
+        self.shared_vocab = draft_tokenizer is None or draft_tokenizer.get_vocab() == tokenizer.get_vocab()
+
+        self._lock = threading.Lock()
+        self._task_state = {}
+        self._install_candidate_counter()
+
+    def _install_candidate_counter(self):
+        """
+        📌 Ana modelin aday üreticisini, etkin kayıt varsa (`_recording.counts`) önerilen token'ları, kabul edilenleri
+        ve doğrulama geçişlerini sayan sarmalayıcıyla döndürür. Aynı modele bir kez kurulur.
+        """
+        original = getattr(self.model, "_get_candidate_generator", None)
+        if original is None or getattr(original, "counts_candidates", False):
+            return
+
+        def get_candidate_generator(*args, **kwargs):
+            generator = original(*args, **kwargs)
+            counts = getattr(SpeculativeDecoder._recording, "counts", None)
+            if counts is not None:
+                SpeculativeDecoder._count_candidates(generator, counts)
+            return generator
+
+        get_candidate_generator.counts_candidates = True
+        self.model._get_candidate_generator = get_candidate_generator
+
+    @staticmethod
+    def _count_candidates(generator, counts):
+        get_candidates, update_candidate_strategy = generator.get_candidates, generator.update_candidate_strategy
+
+        def counted_get_candidates(input_ids, *args, **kwargs):
+            candidate_ids, candidate_logits = get_candidates(input_ids, *args, **kwargs)
+            counts["proposed"] += candidate_ids.shape[1] - input_ids.shape[1]
+            return candidate_ids, candidate_logits
+
+        def counted_update_candidate_strategy(input_ids, scores, num_matches):
+            counts["accepted"] += int(num_matches)
+            counts["target"] += 1
+            return update_candidate_strategy(input_ids, scores, num_matches)
+
+        generator.get_candidates = counted_get_candidates
+        generator.update_candidate_strategy = counted_update_candidate_strategy
+
+    @classmethod
+    def from_env(cls, model_handle):
+        """
+        📌 `SMARTFORM_DRAFT_MODEL` tanımlıysa taslak modeli ana modelle aynı dtype/cihazda yükler.
+        Tanımlı değilse ya da görev listesi boşsa None döner (spekülatif üretim kapalı).
+        """
+        draft_model_id = os.getenv("SMARTFORM_DRAFT_MODEL", "")
+        tasks = [t.strip() for t in os.getenv("SMARTFORM_SPECULATIVE_TASKS", "generate_questions").split(",") if t.strip()]
+        if not draft_model_id or not tasks or model_handle.kind != "causal_lm":
+            return None
+
+        try:
+            draft_handle = ModelRegistry.acquire(draft_model_id, kind="causal_lm",
+                                                 dtype=model_handle.dtype, device=model_handle.device)
+        except Exception as e:
+            print(f"🚨 Taslak model yüklenemedi, spekülatif üretim kapalı: {e}")
+            return None
+        if draft_handle.model is model_handle.model:
+            ModelRegistry.release(draft_handle)
+            print("⚠️ **Taslak model ana modelle aynı, spekülatif üretim kapalı.**")
+            return None
+
+        decoder = cls(model_handle.model, model_handle.tokenizer, draft_handle.model, draft_handle.tokenizer, tasks)
+        decoder._draft_handle = draft_handle
+        print(f"✅ **Spekülatif üretim etkin: {draft_model_id} → {model_handle.model_id} (görevler: {', '.join(tasks)})**")
+        return decoder
+
+    def _state(self, task):
+        state = self._task_state.get(task)
+        if state is None:
+            state = {"requests": 0, "proposed": 0, "accepted": 0, "new_tokens": 0, "target_passes": 0,
+                     "seconds": 0.0, "errors": 0, "fallbacks": 0, "disabled_until": 0.0,
+                     "recent": deque(maxlen=self.min_samples)}
+            self._task_state[task] = state
+        return state
+
+    def should_use(self, task):
+        """ 📌 Görev için spekülatif üretim etkin mi ve kabul oranı yüzünden beklemede değil mi? """
+        if task not in self.tasks:
+            return False
+        with self._lock:
+            return time.monotonic() >= self._state(task)["disabled_until"]
+
+    def generate(self, task, input_ids, attention_mask, **generation_kwargs):
+        """ 📌 **Tek bir prompt'u taslak modelle yardımlı üretir.** Hata olursa çağıran normal üretime döner. """
+        counts = {"proposed": 0, "accepted": 0, "target": 0}
+        SpeculativeDecoder._recording.counts = counts
+        extra = {} if self.shared_vocab else {"tokenizer": self.tokenizer, "assistant_tokenizer": self.draft_tokenizer}
+
+        started = time.perf_counter()
+        try:
+            with torch.no_grad():
+                output = self.model.generate(
+                    input_ids=input_ids,
+                    attention_mask=attention_mask,
+                    assistant_model=self.draft_model,
+                    pad_token_id=self.tokenizer.pad_token_id,
+                    **extra,
+                    **generation_kwargs
+                )
+        except Exception:
+            with self._lock:
+                self._state(task)["errors"] += 1
+            raise
+        finally:
+            SpeculativeDecoder._recording.counts = None
+
+        new_tokens = output.shape[1] - input_ids.shape[1]
+        self._record(task, counts["proposed"], counts["accepted"], new_tokens, counts["target"], time.perf_counter() - started)
+        return output
+
+    def _record(self, task, proposed, accepted, new_tokens, target_passes, seconds):
+        with self._lock:
+            state = self._state(task)
+            state["requests"] += 1
+            state["proposed"] += proposed
+            state["accepted"] += accepted
+            state["new_tokens"] += new_tokens
+            state["target_passes"] += target_passes
+            state["seconds"] += seconds
+            state["recent"].append(accepted / proposed if proposed else 0.0)
+
+            recent = state["recent"]
+            if len(recent) == recent.maxlen and sum(recent) / len(recent) < self.min_acceptance:
+                print(f"⚠️ **Spekülatif üretim kabul oranı düşük ({sum(recent) / len(recent):.0%}), "
+                      f"'{task}' {self.cooldown:.0f} sn normal üretime dönüyor.**")
+                state["disabled_until"] = time.monotonic() + self.cooldown
+                state["fallbacks"] += 1
+                recent.clear()
+
+    def get_stats(self):
+        """ 📌 Görev başına kabul oranı, doğrulama geçişi başına token ve geri dönüş sayaçları. """
+        with self._lock:
+            stats = {}
+            now = time.monotonic()
+            for task, state in self._task_state.items():
+                stats[task] = {
+                    "requests": state["requests"],
+                    "acceptance_rate": round(state["accepted"] / state["proposed"], 3) if state["proposed"] else 0.0,
+                    "tokens_per_target_pass": round(state["new_tokens"] / state["target_passes"], 2) if state["target_passes"] else 0.0,
+                    "tokens_per_second": round(state["new_tokens"] / state["seconds"], 1) if state["seconds"] else 0.0,
+                    "errors": state["errors"],
+                    "fallbacks": state["fallbacks"],
+                    "active": now >= state["disabled_until"],
+                }
+            return {"tasks": sorted(self.tasks), "min_acceptance": self.min_acceptance, "per_task": stats}
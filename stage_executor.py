@@ -0,0 +1,171 @@
+import os
+import time
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from scheduling import current_context
+
+
+class Stage:
+    def __init__(self, name, func, depends_on=(), timeout=None, fallback=None):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+        self.timeout = timeout
+        self.fallback = fallback
+
+    def fallback_value(self, error):
+        """ 📌 Aşama hata verirse ya da zaman aşımına uğrarsa döndürülecek değer. """
+        if callable(self.fallback):
+            return self.fallback(error)
+        return self.fallback
+
+
+class StageTimeoutError(Exception):
+    pass
+
+
+class StagePoolSaturated(Exception):
+    """ 📌 Aşama havuzu dolu (zaman aşımına uğramış işler hâlâ çalışıyor olabilir); aşama çalıştırılmadan yedeğe düşer. """
+
+
+class StageGraph:
+    """
+    📌 **Birbirinden bağımsız analiz aşamalarını paralel çalıştıran basit bir bağımlılık grafiği.**
+    - Her aşama, bağımlı olduğu aşamaların sonuçlarını anahtar kelime argümanı olarak alır.
+    - Bağımlılığı olmayan aşamalar aynı anda başlar; toplam süre en yavaş zincire yaklaşır.
+    - Her aşamanın kendi zaman aşımı ve hata durumunda kullanılacak yedek değeri vardır.
+    - Zaman aşımı saati aşama bir işçide gerçekten başladığında çalışır; havuzda beklemek aşamanın süresinden yemez.
+      Etkin istek bağlamının son tarihi geçerse başlamış ya da beklemekte olan tüm aşamalar yedeğe düşer.
+    - Aşamalar çağıranın bağlamıyla (öncelik sınıfı ve son tarih) çalışır.
+    - Havuzda (`SMARTFORM_STAGE_WORKERS`) aynı anda en fazla işçi + `SMARTFORM_STAGE_QUEUE` iş bulunur. Zaman aşımına
+      uğrayıp arka planda süren işler de sayılır; sınır doluysa yeni aşamalar kuyruğa yığılmak yerine hemen yedeğe düşer.
+    """
+    _executor = None
+    _executor_lock = threading.Lock()
+    _max_in_flight = 0
+    _in_flight = 0
+    _stats = {"submitted": 0, "rejected": 0, "timeouts": 0}
+
+    def __init__(self):
+        self.stages = {}
+        self.timings = {}
+
+    @classmethod
+    def _get_executor(cls):
+        with cls._executor_lock:
+            if cls._executor is None:
+                workers = int(os.getenv("SMARTFORM_STAGE_WORKERS", "8"))
+                cls._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stage")
+                cls._max_in_flight = workers + int(os.getenv("SMARTFORM_STAGE_QUEUE", str(workers)))
+            return cls._executor
+
+    @classmethod
+    def _reserve(cls):
+        with cls._executor_lock:
+            if cls._in_flight >= cls._max_in_flight:
+                cls._stats["rejected"] += 1
+                return False
+            cls._in_flight += 1
+            cls._stats["submitted"] += 1
+            return True
+
+    @classmethod
+    def _release(cls, future):
+        with cls._executor_lock:
+            cls._in_flight -= 1
+
+    @classmethod
+    def get_stats(cls):
+        """ 📌 Paylaşılan aşama havuzunun sayaçları (`/metrics`). """
+        with cls._executor_lock:
+            return dict(cls._stats, in_flight=cls._in_flight, max_in_flight=cls._max_in_flight)
+
+    def add_stage(self, name, func, depends_on=(), timeout=None, fallback=None):
+        for dependency in depends_on:
+            if dependency not in self.stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dependency}'")
+        self.stages[name] = Stage(name, func, depends_on, timeout, fallback)
+        return self
+
+    def _finish(self, stage, results, started, result=None, error=None):
+        if error is not None:
+            if isinstance(error, StageTimeoutError):
+                print(f"🚨 '{stage.name}' aşaması zamanında tamamlanamadı ({error}), yedek değer kullanılıyor.")
+            elif isinstance(error, StagePoolSaturated):
+                print(f"🚨 '{stage.name}' aşaması için havuzda yer yok, yedek değer kullanılıyor.")
+            else:
+                print(f"🚨 '{stage.name}' aşamasında hata: {error}")
+            result = stage.fallback_value(error)
+        results[stage.name] = result
+        self.timings[stage.name] = round(time.monotonic() - started, 3)
+
+    @staticmethod
+    def _run_stage(stage, began, kwargs):
+        began.append(time.monotonic())
+        return stage.func(**kwargs)
+
+    @staticmethod
+    def _expiry(stage, began, context, now):
+        """
+        📌 Aşamanın bitmesi gereken an ve nedeni. Henüz başlamamış aşamanın saati işlemez; en erken `now + timeout`'ta
+        yeniden bakılır (o ana kadar başlamışsa süresi başladığı andan sayılır).
+        """
+        candidates = []
+        if stage.timeout:
+            candidates.append(((began[0] if began else now) + stage.timeout, f"stage timeout {stage.timeout} s"))
+        if context is not None and context.deadline is not None:
+            candidates.append((context.deadline, "request deadline"))
+        return min(candidates) if candidates else (None, None)
+
+    def run(self):
+        """ 📌 **Tüm aşamaları bağımlılık sırasına göre çalıştırır ve sonuçları sözlük olarak döndürür.** """
+        executor = self._get_executor()
+        context = current_context()
+        self.timings = {}
+        results = {}
+        pending = dict(self.stages)
+        running = {}
+
+        while pending or running:
+            # 📌 Bağımlılıkları tamamlanmış aşamaları havuza gönder
+            for name, stage in list(pending.items()):
+                if all(dependency in results for dependency in stage.depends_on):
+                    del pending[name]
+                    submitted = time.monotonic()
+                    if not self._reserve():
+                        self._finish(stage, results, submitted, error=StagePoolSaturated(stage.name))
+                        continue
+                    kwargs = {dependency: results[dependency] for dependency in stage.depends_on}
+                    began = []
+                    future = executor.submit(contextvars.copy_context().run, self._run_stage, stage, began, kwargs)
+                    future.add_done_callback(self._release)
+                    running[future] = (stage, submitted, began)
+
+            if not running:
+                continue
+            now = time.monotonic()
+            expiries = [self._expiry(stage, began, context, now)[0] for stage, _, began in running.values()]
+            expiries = [expiry for expiry in expiries if expiry is not None]
+            wait_for = max(0.0, min(expiries) - now) if expiries else None
+            done, _ = wait(list(running), timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                stage, submitted, _ = running.pop(future)
+                try:
+                    self._finish(stage, results, submitted, result=future.result())
+                except Exception as e:
+                    self._finish(stage, results, submitted, error=e)
+
+            # 📌 Süresi dolan aşamaları bekleme; başlamamışsa kuyruktan düşer, başlamışsa sonucu yok sayılır
+            now = time.monotonic()
+            for future, (stage, submitted, began) in list(running.items()):
+                expiry, reason = self._expiry(stage, began, context, now)
+                if expiry is not None and now >= expiry:
+                    running.pop(future)
+                    future.cancel()
+                    with StageGraph._executor_lock:
+                        StageGraph._stats["timeouts"] += 1
+                    self._finish(stage, results, submitted, error=StageTimeoutError(reason))
+
+        return results
@@ -0,0 +1,187 @@
+import re
+import time
+import queue
+import threading
+import torch
+from transformers import StoppingCriteria
+
+
+def strip_numbering(line):
+    """ 📌 "1. Soru?" / "2) Soru?" satırından numarayı atar. """
+    return re.sub(r"^\d+[.)]\s*", "", line).strip()
+
+
+class StreamingParser:
+    """
+    📌 **Üretilen metni token token izleyip görevin cevabı tamamlandığında üretimi durduran ayrıştırıcı.**
+    `feed(text)` o ana kadar üretilen metnin tamamını alır, cevap tamamsa `result`'ı doldurup True döner.
+    Her istek kendi ayrıştırıcı nesnesini kullanır; üretim yeniden denenirse önce `reset()` çağrılır.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.result = None
+        self.done = False
+        self.stopped_at = None
+
+    def feed(self, text):
+        raise NotImplementedError
+
+    @staticmethod
+    def completed_lines(text):
+        """ 📌 Sonu satır sonuyla bitmiş (artık değişmeyecek) satırlar. """
+        return [line.strip("-• ").strip() for line in text.split("\n")[:-1]]
+
+
+class FirstQuestionParser(StreamingParser):
+    """ 📌 "?" ile biten ilk tam satırda durur (`generate_question_from_user_input`). """
+
+    def feed(self, text):
+        for line in self.completed_lines(text):
+            if line.endswith("?"):
+                self.result = line
+                return True
+        return False
+
+
+class PurposeLineParser(StreamingParser):
+    """ 📌 "Purpose:" sonrasındaki ilk satır bittiğinde durur (`predict_intent`). """
+
+    def feed(self, text):
+        purpose = text.split("Purpose:")[-1].lstrip()
+        if "\n" not in purpose:
+            return False
+        self.result = purpose.split("\n")[0]
+        return True
+
+
+class NumberedItemsParser(StreamingParser):
+    """
+    📌 `count` adet numaralı satır tamamlandığında durur (`generate_questions`).
+    `exclude` içindeki (formda zaten bulunan) sorular sayılmaz.
+    """
+
+    def __init__(self, count, exclude=()):
+        super().__init__()
+        self.count = count
+        self.exclude = {strip_numbering(q).lower() for q in exclude}
+
+    def feed(self, text):
+        items = [line for line in self.completed_lines(text) if line and line[0].isdigit()]
+        if len([item for item in items if strip_numbering(item).lower() not in self.exclude]) < self.count:
+            return False
+        self.result = items
+        return True
+
+
+class TokenStream(StreamingParser):
+    """
+    📌 **Üretilen metni çağırana parça parça ileten ayrıştırıcı (SSE uçları için).**
+    - Her adımda yeni metin `token`, yeni tamamlanan soru satırları `candidate` olayı olarak kuyruğa yazılır.
+    - Durma kararı sarmalanan ayrıştırıcıya (ör. `FirstQuestionParser`) bırakılır.
+    - `cancel_event` kurulursa (istemci bağlantıyı kopardığında) satırın üretimi bir sonraki adımda durur.
+    - Üretim yeniden denenirse (`reset`) bir `reset` olayı gönderilir; istemci o ana kadar gelen metni atmalıdır.
+    """
+
+    def __init__(self, parser=None, cancel_event=None):
+        self.parser = parser
+        self.cancel_event = cancel_event or threading.Event()
+        self._events = queue.Queue()
+        self._sent = ""
+        self._lines = 0
+        super().__init__()
+
+    def reset(self):
+        super().reset()
+        if self.parser is not None:
+            self.parser.reset()
+        if self._sent or self._lines:
+            self._events.put({"event": "reset"})
+        self._sent = ""
+        self._lines = 0
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def feed(self, text):
+        if self.cancelled:
+            return True
+
+        # 📌 Yarım kalmış çok baytlı karakterler (\ufffd) bir sonraki adımı bekler
+        stable = text.rstrip("\ufffd")
+        if stable.startswith(self._sent) and len(stable) > len(self._sent):
+            self._events.put({"event": "token", "text": stable[len(self._sent):]})
+            self._sent = stable
+
+        lines = self.completed_lines(text)
+        for line in lines[self._lines:]:
+            question = strip_numbering(line)
+            if question.endswith("?"):
+                self._events.put({"event": "candidate", "question": question})
+        self._lines = len(lines)
+
+        if self.parser is None or not self.parser.feed(text):
+            return False
+        self.result = self.parser.result
+        return True
+
+    def events(self, future, heartbeat=1.0):
+        """
+        📌 Üretim bitene (`future` tamamlanana) ya da iptal edilene kadar olayları döndürür.
+        Olay yokken `heartbeat` saniyede bir `heartbeat` olayı verilir; kopan bağlantı böylece erken fark edilir.
+        """
+        future.add_done_callback(lambda _: self._events.put(None))
+        while not self.cancelled:
+            try:
+                event = self._events.get(timeout=heartbeat)
+            except queue.Empty:
+                yield {"event": "heartbeat"}
+                continue
+            if event is None:
+                return
+            yield event
+
+
+class TaskStoppingCriteria(StoppingCriteria):
+    """
+    📌 **Batch'teki her satırı kendi ayrıştırıcısıyla kontrol eden durdurma kriteri.**
+    Ayrıştırıcısı olmayan satırlar `max_new_tokens` ya da EOS'a kadar devam eder.
+    """
+
+    def __init__(self, tokenizer, parsers, prompt_length):
+        self.tokenizer = tokenizer
+        self.parsers = parsers
+        self.prompt_length = prompt_length
+
+    def __call__(self, input_ids, scores, **kwargs):
+        generated = input_ids.shape[1] - self.prompt_length
+        for row, parser in enumerate(self.parsers):
+            if parser is None or parser.done:
+                continue
+            text = self.tokenizer.decode(input_ids[row, self.prompt_length:], skip_special_tokens=True)
+            if parser.feed(text):
+                parser.done = True
+                parser.stopped_at = generated
+        return torch.tensor([parser is not None and parser.done for parser in self.parsers],
+                            dtype=torch.bool, device=input_ids.device)
+
+
+class DeadlineStoppingCriteria(StoppingCriteria):
+    """
+    📌 **Son tarihi geçen satırların üretimini durdurur.** Çağıran o anda sonucu beklemeyi bırakmıştır;
+    üretime devam etmek yalnızca CPU'yu arkadaki isteklerden çalar. Son tarihi olmayan satırlar etkilenmez.
+    """
+
+    def __init__(self, deadlines):
+        self.deadlines = deadlines
+
+    def __call__(self, input_ids, scores, **kwargs):
+        now = time.monotonic()
+        return torch.tensor([deadline is not None and now >= deadline for deadline in self.deadlines],
+                            dtype=torch.bool, device=input_ids.device)
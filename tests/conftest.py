@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 📌 Modüller depo kökünde düz dosyalar olarak durur
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -0,0 +1,90 @@
+"""
+📌 **Davranış olaylarının doğrulanmasını ve kuyruğa hep-ya-hiç kabulünü doğrular (202 / 429 davranışı).**
+"""
+import threading
+import time
+
+import pytest
+
+from behavior_ingest import BehaviorIngestor, IngestQueueFull, validate_session
+
+
+class BlockingAnalyzer:
+    """ 📌 Yazıcıyı ilk oturumda bekletir; böylece kuyruk dolabilir. """
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.recorded = []
+
+    def record_sessions(self, sessions):
+        self.release.wait(5)
+        self.recorded.extend(sessions)
+
+
+def session(session_id, events=1):
+    return {"session_id": session_id, "form_id": "f1", "timestamp": 1700000000, "form_completed": True,
+            "events": [{"question_text": f"Question {i}", "time_spent": 2.5} for i in range(events)]}
+
+
+def blocked_ingestor(max_queue):
+    analyzer = BlockingAnalyzer()
+    ingestor = BehaviorIngestor(analyzer, max_queue=max_queue, flush_batch=1, flush_interval=0.05)
+    ingestor.submit([session("holder")])
+    # 📌 Yazıcı ilk oturumu alıp bekleyene kadar kuyruk boşalsın
+    while ingestor.get_stats()["queue_depth"]:
+        time.sleep(0.01)
+    return analyzer, ingestor
+
+
+def test_validate_session_normalizes_and_counts_rejections():
+    payload = session("s1", events=2)
+    payload["events"].append({"question_text": "", "time_spent": 1})
+    payload["events"].append({"question_text": "Age", "time_spent": -3})
+    result, rejected = validate_session(payload)
+    assert rejected == 2
+    assert result["timestamp"] == "2023-11-14T22:13:20Z"
+    assert [r["question_text"] for r in result["responses"]] == ["Question 0", "Question 1"]
+
+    assert validate_session({"events": [{"question_text": "Q", "time_spent": 1}], "timestamp": "yesterday"}) == (None, 1)
+    assert validate_session({"events": []}) == (None, 1)
+
+
+def test_batch_is_accepted_when_it_fits():
+    analyzer, ingestor = blocked_ingestor(max_queue=4)
+    assert ingestor.submit([session("a", events=2), session("b"), {"events": "bad"}]) == (3, 1)
+    assert ingestor.get_stats()["queue_depth"] == 2
+    analyzer.release.set()
+
+
+def test_batch_that_does_not_fit_is_rejected_whole():
+    analyzer, ingestor = blocked_ingestor(max_queue=3)
+    ingestor.submit([session("a"), session("b")])
+    with pytest.raises(IngestQueueFull) as error:
+        ingestor.submit([session("c"), session("d")])
+    assert error.value.retry_after >= 1
+    stats = ingestor.get_stats()
+    assert stats["queue_depth"] == 2
+    assert stats["dropped_sessions"] == 2
+    analyzer.release.set()
+
+
+def test_concurrent_batches_never_partially_admitted():
+    analyzer, ingestor = blocked_ingestor(max_queue=10)
+    outcomes = []
+
+    def submit(name):
+        try:
+            outcomes.append(ingestor.submit([session(f"{name}-{i}") for i in range(3)])[0])
+        except IngestQueueFull:
+            outcomes.append(0)
+
+    threads = [threading.Thread(target=submit, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    # 📌 10 yerlik kuyruğa 3'lük batch'lerden en fazla 3'ü sığar; hiçbiri yarım kabul edilmez
+    assert sorted(outcomes) == [0, 0, 0, 0, 0, 3, 3, 3]
+    assert ingestor.get_stats()["queue_depth"] == 9
+    analyzer.release.set()
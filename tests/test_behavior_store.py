@@ -0,0 +1,137 @@
+"""
+📌 **Sütun deposunun JSONL ile aynı raporu verdiğini, çok worker'lı eklemeyi ve zaman damgası çözümlemeyi doğrular.**
+Oturumlar sabit tohumlu rastgele üreteçle sentetik olarak oluşturulur.
+"""
+import json
+import multiprocessing
+import random
+
+import pytest
+
+from behavior_store import ColumnarBehaviorStore, parse_timestamp
+from user_behavior import DAY, HOUR, UserBehaviorAnalyzer
+
+START = 1_700_000_000
+FORMS = {
+    "contact": ["What is your name?", "What is your email?", "Any comments?"],
+    "survey": ["How satisfied are you?", "Would you recommend us?", "What is your name?"],
+}
+
+
+def make_sessions(count, seed=0, prefix=""):
+    rng = random.Random(seed)
+    sessions = []
+    for _ in range(count):
+        form = rng.choice(list(FORMS) + [None])
+        questions = FORMS[form] if form else [prefix + "Free text?"]
+        entry = {
+            "form_completed": rng.random() < 0.6,
+            "responses": [{"question_text": prefix + q if form else q, "time_spent": rng.randint(4, 120) / 4,
+                           "skipped": rng.random() < 0.2} for q in questions],
+        }
+        if form:
+            entry["form_id"] = form
+        if rng.random() < 0.9:
+            entry["timestamp"] = START + rng.randrange(3 * DAY)
+        sessions.append(entry)
+    return sessions
+
+
+def assert_same_report(actual, expected):
+    assert actual[:2] == expected[:2] and actual[4] == expected[4]
+    assert sorted((q, s) for q, _, s in actual[2]) == sorted((q, s) for q, _, s in expected[2])
+    assert [mean for _, mean, _ in sorted(actual[2])] == pytest.approx([mean for _, mean, _ in sorted(expected[2])])
+    assert actual[3] == pytest.approx(expected[3])
+
+
+@pytest.fixture
+def analyzers(tmp_path, monkeypatch):
+    monkeypatch.delenv("SMARTFORM_BEHAVIOR_STORE", raising=False)
+    sessions = make_sessions(300)
+    log_file = tmp_path / "form_logs.jsonl"
+    log_file.write_text("".join(json.dumps(entry) + "\n" for entry in sessions))
+    store = ColumnarBehaviorStore(str(tmp_path / "store"))
+    store.append_sessions(sessions[:150])
+    store.append_sessions(sessions[150:])
+
+    jsonl = UserBehaviorAnalyzer(log_file=str(log_file), legacy_log_file=None)
+    columnar = UserBehaviorAnalyzer(log_file=str(tmp_path / "missing.jsonl"), store_dir=str(tmp_path / "store"))
+    return jsonl, columnar
+
+
+@pytest.mark.parametrize("kwargs", [
+    {},
+    {"form_id": "contact"},
+    {"form_id": "survey", "form_questions": ["What is your name?", "Would you recommend us?"]},
+    {"form_id": "unknown", "form_questions": ["What is your name?"]},
+    {"start": START + 5 * HOUR + 17, "end": START + 2 * DAY + 3 * HOUR},
+    {"form_id": "contact", "start": START, "end": START + DAY},
+    {"form_questions": ["Free text?"], "end": START + DAY + HOUR},
+    {"form_id": "survey", "start": START + DAY},
+    {"form_id": "unknown"},
+    {"start": START + DAY, "end": START},
+])
+def test_store_matches_jsonl(analyzers, kwargs):
+    jsonl, columnar = analyzers
+    assert_same_report(columnar.query(**kwargs), jsonl.query(**kwargs))
+
+
+def test_reader_sees_sessions_appended_by_another_worker(analyzers, tmp_path):
+    jsonl, columnar = analyzers
+    other = UserBehaviorAnalyzer(log_file=str(tmp_path / "missing.jsonl"), store_dir=str(tmp_path / "store"))
+    extra = make_sessions(20, seed=1, prefix="New ")
+    other.record_sessions(extra)
+    jsonl.record_sessions(extra, persist=False)
+
+    assert_same_report(columnar.query(), jsonl.query())
+    assert_same_report(columnar.query(form_id="survey"), jsonl.query(form_id="survey"))
+
+
+def _append_worker(directory, seed):
+    store = ColumnarBehaviorStore(directory)
+    for batch in range(10):
+        store.append_sessions(make_sessions(5, seed=seed * 100 + batch, prefix=f"W{seed} "))
+
+
+def test_concurrent_processes_append_without_overwriting(tmp_path):
+    directory = str(tmp_path / "store")
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_append_worker, args=(directory, seed)) for seed in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+        assert worker.exitcode == 0
+
+    store = ColumnarBehaviorStore(directory)
+    expected = [s for seed in range(3) for b in range(10) for s in make_sessions(5, seed * 100 + b, f"W{seed} ")]
+    assert store.num_sessions == len(expected)
+    assert store.num_responses == sum(len(s["responses"]) for s in expected)
+    assert len(store.questions) == len(set(store.questions))
+
+    counts = store.question_aggregates()["count"]
+    for question_text in {r["question_text"] for s in expected for r in s["responses"]}:
+        expected_count = sum(r["question_text"] == question_text for s in expected for r in s["responses"])
+        assert counts[store.questions.index(question_text)] == expected_count
+
+
+@pytest.mark.parametrize("value, expected", [
+    (1_700_000_000, 1_700_000_000),
+    (1_700_000_000.9, 1_700_000_000),
+    (1_700_000_000_123, 1_700_000_000),
+    ("1700000000", 1_700_000_000),
+    ("2023-11-14T22:13:20Z", 1_700_000_000),
+    ("2023-11-14T23:13:20+01:00", 1_700_000_000),
+    (None, 0),
+    ("", 0),
+    ("yesterday", 0),
+    (True, 0),
+    (float("nan"), 0),
+    ([1], 0),
+])
+def test_parse_timestamp(value, expected):
+    assert parse_timestamp(value) == expected
+
+
+def test_parse_timestamp_default():
+    assert parse_timestamp("not a date", default=None) is None
@@ -0,0 +1,65 @@
+"""
+📌 **Embedding deposunun worker'lar arası paylaşımını ve yarım kalmış anahtar kaydından kurtulmasını doğrular.**
+Model yerine metinden deterministik vektör üreten ve çağrıları sayan sahte bir kodlayıcı kullanılır.
+"""
+import hashlib
+
+import numpy as np
+
+from embedding_store import KEY_BYTES, EmbeddingStore
+
+
+class HashEncoder:
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts):
+        self.encoded.extend(texts)
+        seeds = [int.from_bytes(hashlib.md5(t.lower().encode()).digest()[:4], "little") for t in texts]
+        return np.stack([np.random.default_rng(seed).standard_normal(8) for seed in seeds]).astype(np.float32)
+
+
+def make_store(tmp_path, model=None):
+    return EmbeddingStore(model or HashEncoder(), "test/model", cache_dir=str(tmp_path), lru_size=100)
+
+
+def test_second_worker_reads_vectors_from_disk(tmp_path):
+    first = make_store(tmp_path)
+    vectors = first.encode(["What is your email?", "How old are you?", "what is  your EMAIL?"])
+    assert first.model.encoded == ["What is your email?", "How old are you?"]
+    assert np.array_equal(vectors[0], vectors[2])
+
+    second = make_store(tmp_path)
+    assert np.array_equal(second.encode(["How old are you?", "What is your email?"]), vectors[[1, 0]])
+    assert second.model.encoded == []
+    assert second.get_stats()["disk_hits"] == 2
+
+
+def test_running_worker_sees_rows_appended_by_another(tmp_path):
+    first, second = make_store(tmp_path), make_store(tmp_path)
+    first.encode(["Name?"])
+    second.encode(["Phone?"])
+    first.encode(["Phone?"])
+    assert first.model.encoded == ["Name?"]
+    assert first.get_stats()["disk_entries"] == 2
+
+
+def test_partial_key_record_is_ignored_and_overwritten(tmp_path):
+    writer = make_store(tmp_path)
+    expected = writer.encode(["Name?", "Email?"])
+    # 📌 Çöken bir yazıcının yarıda bıraktığı anahtar kaydı
+    with open(writer.keys_path, "ab") as file:
+        file.write(b"\xff" * (KEY_BYTES // 2))
+
+    reader = make_store(tmp_path)
+    assert reader.get_stats()["disk_entries"] == 2
+    assert np.array_equal(reader.encode(["Name?", "Email?"]), expected)
+    assert reader.model.encoded == []
+
+    extra = reader.encode(["Address?"])
+    assert reader.model.encoded == ["Address?"]
+    assert (tmp_path / "test__model.keys").stat().st_size == 3 * KEY_BYTES
+
+    restored = make_store(tmp_path)
+    assert np.array_equal(restored.encode(["Name?", "Email?", "Address?"]), np.vstack([expected, extra]))
+    assert restored.model.encoded == []
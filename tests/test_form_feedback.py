@@ -0,0 +1,45 @@
+"""
+📌 **Vektörel benzer soru tespitinin eski çift döngüyle aynı çiftleri aynı sırada bulduğunu doğrular.**
+Embedding'ler birbirine yakın kümeler halinde sentetik olarak üretilir; model yüklenmez.
+"""
+import numpy as np
+import pytest
+import torch
+import torch.nn.functional as F
+
+from form_feedback import FormFeedbackGenerator
+
+
+def clustered_embeddings(n, dim=16, clusters=6, seed=0):
+    generator = torch.Generator().manual_seed(seed)
+    centers = torch.randn(clusters, dim, generator=generator)
+    labels = torch.randint(0, clusters, (n,), generator=generator)
+    noise = torch.randn(n, dim, generator=generator) * 0.35
+    return F.normalize(centers[labels] + noise, dim=1)
+
+
+def brute_force_pairs(embeddings, threshold):
+    pairs = []
+    for i in range(len(embeddings)):
+        for j in range(i + 1, len(embeddings)):
+            if torch.dot(embeddings[i], embeddings[j]).item() > threshold:
+                pairs.append((i, j))
+    return pairs
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 512])
+def test_find_similar_pairs_matches_double_loop(chunk_size):
+    embeddings = clustered_embeddings(60)
+    expected = brute_force_pairs(embeddings, 0.85)
+    assert expected, "synthetic clusters should produce similar pairs"
+    assert FormFeedbackGenerator.find_similar_pairs(embeddings, 0.85, chunk_size=chunk_size) == expected
+
+
+def test_detect_redundant_questions_uses_given_embeddings():
+    generator = object.__new__(FormFeedbackGenerator)
+    generator.similarity_model = object()
+    questions = ["What is your email?", "Your email address?", "How old are you?"]
+    embeddings = np.array([[1.0, 0.0], [0.99, 0.1], [0.0, 1.0]], dtype=np.float32)
+    assert generator.detect_redundant_questions(questions, embeddings) == [
+        "⚠ 'What is your email?' and 'Your email address?' are too similar. Consider merging or removing one."
+    ]
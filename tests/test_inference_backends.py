@@ -0,0 +1,106 @@
+"""
+📌 **Dışa aktarılmış sınıflandırıcının ve embedder'ın her arka uçta eager PyTorch ile aynı çıktıyı verdiğini doğrular.**
+Rastgele başlatılmış küçük DistilBERT/BERT modelleri ve elle yazılmış bir sözlük kullanılır; ağ erişimi gerekmez.
+"""
+import numpy as np
+import pytest
+import torch
+from transformers import BertTokenizerFast, DistilBertConfig, DistilBertForSequenceClassification
+
+from inference_backends import ExportedClassifier, ExportedEmbedder, TorchClassifier, export_classifier, export_embedder
+
+VOCAB = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "what", "is", "your", "email", "address", "name", "phone",
+         "how", "old", "are", "you", "rate", "our", "service", "?"]
+TEXTS = ["What is your email address?", "Name", "How old are you?", "Rate our service", "phone"]
+
+
+@pytest.fixture(scope="module")
+def tiny_classifier(tmp_path_factory):
+    vocab_file = tmp_path_factory.mktemp("vocab") / "vocab.txt"
+    vocab_file.write_text("\n".join(VOCAB) + "\n", encoding="utf-8")
+    tokenizer = BertTokenizerFast(vocab_file=str(vocab_file), do_lower_case=True)
+
+    torch.manual_seed(0)
+    config = DistilBertConfig(vocab_size=len(VOCAB), dim=32, hidden_dim=64, n_layers=2, n_heads=2,
+                              max_position_embeddings=64, num_labels=3,
+                              id2label={0: "contact", 1: "profile", 2: "survey"},
+                              label2id={"contact": 0, "profile": 1, "survey": 2})
+    model = DistilBertForSequenceClassification(config).eval()
+    return model, tokenizer
+
+
+@pytest.mark.parametrize("backend", ["torchscript", "onnx"])
+def test_exported_classifier_matches_eager_logits(tiny_classifier, tmp_path, backend):
+    if backend == "onnx":
+        pytest.importorskip("onnxruntime")
+        pytest.importorskip("onnx")
+    model, tokenizer = tiny_classifier
+
+    path = export_classifier(model, tokenizer, str(tmp_path), backend, max_length=32)
+    exported = ExportedClassifier(path)
+
+    inputs = tokenizer(TEXTS, padding=True, truncation=True, max_length=32, return_tensors="np")
+    with torch.inference_mode():
+        eager_logits = model(input_ids=torch.from_numpy(inputs["input_ids"]),
+                             attention_mask=torch.from_numpy(inputs["attention_mask"])).logits.numpy()
+    exported_logits = exported.runner(inputs["input_ids"], inputs["attention_mask"])
+
+    np.testing.assert_allclose(exported_logits, eager_logits, rtol=1e-4, atol=1e-4)
+    eager_proba = TorchClassifier(model, tokenizer, max_length=32).predict_proba(TEXTS)
+    np.testing.assert_allclose(exported.predict_proba(TEXTS), eager_proba, rtol=1e-4, atol=1e-5)
+    assert exported.labels == ["contact", "profile", "survey"]
+
+
+@pytest.fixture(scope="module")
+def tiny_sentence_transformer(tmp_path_factory):
+    pytest.importorskip("sentence_transformers")
+    from sentence_transformers import SentenceTransformer, models
+    from transformers import BertConfig, BertModel
+
+    directory = tmp_path_factory.mktemp("tiny-bert")
+    (directory / "vocab.txt").write_text("\n".join(VOCAB) + "\n", encoding="utf-8")
+    BertTokenizerFast(vocab_file=str(directory / "vocab.txt"), do_lower_case=True).save_pretrained(str(directory))
+    torch.manual_seed(0)
+    config = BertConfig(vocab_size=len(VOCAB), hidden_size=32, intermediate_size=64, num_hidden_layers=2,
+                        num_attention_heads=2, max_position_embeddings=64)
+    BertModel(config).eval().save_pretrained(str(directory))
+
+    transformer = models.Transformer(str(directory), max_seq_length=32)
+    pooling = models.Pooling(transformer.get_word_embedding_dimension(), pooling_mode="mean")
+    return SentenceTransformer(modules=[transformer, pooling, models.Normalize()], device="cpu")
+
+
+@pytest.mark.parametrize("int8", [False, True], ids=["fp32", "int8"])
+@pytest.mark.parametrize("backend", ["torchscript", "onnx"])
+def test_exported_embedder_matches_sentence_transformer(tiny_sentence_transformer, tmp_path, backend, int8):
+    if backend == "onnx":
+        pytest.importorskip("onnxruntime")
+        pytest.importorskip("onnx")
+    model = tiny_sentence_transformer
+
+    path = export_embedder(model, str(tmp_path), backend, int8=int8)
+    exported = ExportedEmbedder(path)
+
+    # 📌 Farklı uzunluklar dolgu maskesinin ortalama havuzlamada doğru uygulandığını sınar
+    reference = model.encode(TEXTS, normalize_embeddings=False)
+    embeddings = exported.encode(TEXTS, batch_size=2)
+    assert embeddings.shape == reference.shape
+    np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), 1.0, atol=1e-5)
+
+    cosine = (embeddings * reference).sum(axis=1)
+    if int8:
+        assert cosine.min() > 0.98
+    else:
+        assert cosine.min() > 1 - 1e-5
+        np.testing.assert_allclose(embeddings, reference, atol=1e-4)
+    np.testing.assert_allclose(exported.encode(TEXTS[1]), embeddings[1], atol=1e-6)
+
+
+def test_export_embedder_rejects_non_mean_pooling(tiny_sentence_transformer, tmp_path):
+    from sentence_transformers import SentenceTransformer, models
+
+    transformer = tiny_sentence_transformer[0]
+    cls_model = SentenceTransformer(modules=[transformer, models.Pooling(transformer.get_word_embedding_dimension(),
+                                                                         pooling_mode="cls")], device="cpu")
+    with pytest.raises(ValueError):
+        export_embedder(cls_model, str(tmp_path), "torchscript")
@@ -0,0 +1,50 @@
+"""
+📌 **Üretilen soru önbelleğinin formun mevcut sorularından bağımsız tutulduğunu ve istenen sayıda soru döndüğünü doğrular.**
+Model yerine sabit çıktı veren sahte bir üretim motoru kullanılır.
+"""
+from question_generator import QuestionGenerator
+from response_cache import SemanticCache
+
+
+class ScriptedEngine:
+    def __init__(self, outputs):
+        self.outputs = list(outputs)
+        self.calls = 0
+
+    def generate_template(self, template, variables, stop=None, **kwargs):
+        self.calls += 1
+        return self.outputs.pop(0)
+
+
+def make_generator(*outputs):
+    generator = object.__new__(QuestionGenerator)
+    generator.model = object()
+    generator.engine = ScriptedEngine(outputs)
+    generator.question_cache = SemanticCache("test_questions")
+    generator.question_cache._embedder_failed = True
+    return generator
+
+
+def test_cached_list_is_filtered_per_form():
+    generator = make_generator("1. What is your name?\n2. What is your email?\n3. What is your phone?\n")
+    assert generator._generate_questions("Contact Form", [], 2) == ["1. What is your name?", "2. What is your email?"]
+    assert generator._generate_questions("Contact Form", ["What is your name?"], 2) == \
+        ["1. What is your email?", "2. What is your phone?"]
+    assert generator.engine.calls == 1
+
+
+def test_cached_list_too_short_for_this_form_is_regenerated():
+    generator = make_generator("1. What is your name?\n2. What is your email?\n",
+                               "1. What is your name?\n2. What is your email?\n3. What is your address?\n")
+    generator._generate_questions("Contact Form", [], 2)
+    assert generator._generate_questions("Contact Form", ["what is your NAME?"], 2) == \
+        ["1. What is your email?", "2. What is your address?"]
+    assert generator.engine.calls == 2
+
+
+def test_short_model_output_is_topped_up_with_fallbacks():
+    generator = make_generator("1. How satisfied are you overall?\n")
+    questions = generator._generate_questions("Customer Feedback Form", [], 3)
+    assert len(questions) == 3
+    assert questions[0] == "1. How satisfied are you overall?"
+    assert [q.split(". ", 1)[0] for q in questions] == ["1", "2", "3"]
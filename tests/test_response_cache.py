@@ -0,0 +1,65 @@
+"""
+📌 **Anlamsal önbelleğin eşleşme, kapsam, tahliye ve çok worker'lı disk yazımı davranışını doğrular.**
+Embedding modeli yerine kelime torbası vektörleri üreten sahte bir kodlayıcı kullanılır.
+"""
+import numpy as np
+
+from response_cache import SemanticCache
+
+WORDS = ["contact", "customer", "feedback", "job", "application", "form", "survey", "event", "registration"]
+
+
+class BagOfWords:
+    def encode(self, texts, normalize_embeddings=True):
+        vectors = np.array([[text.split().count(word) for word in WORDS] for text in texts], dtype=np.float32)
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-6)
+
+
+def make_cache(**kwargs):
+    cache = SemanticCache("test", similarity_threshold=0.9, **kwargs)
+    cache._embedder = BagOfWords()
+    return cache
+
+
+def test_exact_and_semantic_hits_respect_scope():
+    cache = make_cache()
+    cache.put("Customer Feedback Form", ["q1"], scope="n=3")
+    assert cache.get("customer   feedback form!", scope="n=3") == ["q1"]
+    assert cache.get("Feedback form customer", scope="n=3") == ["q1"]
+    assert cache.get("Feedback form customer", scope="n=5") is None
+    assert cache.get("Job Application", scope="n=3") is None
+    assert cache.stats == {"exact_hits": 1, "semantic_hits": 1, "misses": 2, "evictions": 0}
+
+
+def test_evicted_rows_are_reused_and_not_matched():
+    cache = make_cache(max_entries=2)
+    cache.put("contact form", "a")
+    cache.put("job application", "b")
+    cache.put("event registration", "c")
+    assert cache.stats["evictions"] == 1
+    assert cache.get("form contact") is None
+    assert cache.get("registration event") == "c"
+    assert cache._matrix.shape[0] == 2 and cache._slot_used.all()
+
+
+def test_expired_entries_are_not_matched():
+    cache = make_cache(ttl=60)
+    cache.put("contact form", "a")
+    cache._entries["::contact form"].created_at -= 120
+    cache._slot_created[:] -= 120
+    assert cache.get("form contact") is None
+
+
+def test_concurrent_workers_merge_on_save(tmp_path):
+    path = str(tmp_path / "cache.json")
+    first, second = make_cache(persist_path=path), make_cache(persist_path=path)
+    first.put("contact form", "a")
+    second.put("survey form", "b")
+    first.save()
+    second.save()
+
+    restored = make_cache(persist_path=path)
+    assert restored.get("contact form") == "a"
+    assert restored.get("survey form") == "b"
+    assert restored.get("form survey") == "b"
+    assert not list(tmp_path.glob("*.tmp"))
@@ -0,0 +1,43 @@
+"""
+📌 **Paylaşımlı ağırlık yüklemesinin (mmap + meta kurulum) eager yüklemeyle aynı çıktıyı verdiğini doğrular.**
+Rastgele başlatılmış küçük bir Llama float32 olarak kaydedilir; sunum dtype'ı farklıysa dönüştürülmüş dosya eşlenir.
+"""
+import pytest
+import torch
+from transformers import AutoModelForCausalLM, LlamaConfig, LlamaForCausalLM
+
+from shared_weights import load_shared, serving_checkpoint_files, share_weights
+
+
+@pytest.fixture(scope="module")
+def tiny_llama(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("tiny-llama")
+    torch.manual_seed(0)
+    config = LlamaConfig(vocab_size=64, hidden_size=32, intermediate_size=64, num_hidden_layers=2,
+                         num_attention_heads=2, num_key_value_heads=2, max_position_embeddings=64)
+    LlamaForCausalLM(config).save_pretrained(str(directory))
+    return str(directory)
+
+
+@pytest.mark.parametrize("dtype", [torch.float32, torch.bfloat16])
+def test_load_shared_maps_weights_without_copy(tiny_llama, tmp_path, monkeypatch, dtype):
+    monkeypatch.setenv("SMARTFORM_SHARED_WEIGHTS_DIR", str(tmp_path))
+    model = load_shared(AutoModelForCausalLM, tiny_llama, dtype)
+    reference = AutoModelForCausalLM.from_pretrained(tiny_llama, torch_dtype=dtype).eval()
+
+    input_ids = torch.tensor([[1, 5, 9, 20, 3]])
+    with torch.no_grad():
+        assert torch.equal(model(input_ids=input_ids).logits, reference(input_ids=input_ids).logits)
+
+    # 📌 Tüm parametreler tek bir eşlenmiş dosyanın depolamasına bakar
+    assert {p.dtype for p in model.parameters()} == {dtype}
+    assert len({p.untyped_storage().data_ptr() for p in model.parameters()}) == 1
+    converted = serving_checkpoint_files(tiny_llama, dtype)
+    assert converted[0].startswith(str(tmp_path)) == (dtype != torch.float32)
+
+
+def test_share_weights_uses_serving_dtype_copy(tiny_llama, tmp_path, monkeypatch):
+    monkeypatch.setenv("SMARTFORM_SHARED_WEIGHTS_DIR", str(tmp_path))
+    model = AutoModelForCausalLM.from_pretrained(tiny_llama, torch_dtype=torch.bfloat16).eval()
+    expected = sum(p.numel() * p.element_size() for p in model.parameters())
+    assert share_weights(model, tiny_llama) == expected
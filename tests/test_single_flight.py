@@ -0,0 +1,97 @@
+"""
+📌 **Eşzamanlı aynı anahtarlı çağrıların tek hesaplamada birleştiğini ve bekleyenlerin son tarihe uyduğunu doğrular.**
+"""
+import threading
+import time
+
+import pytest
+
+from scheduling import DeadlineExceeded, RequestContext, request_context
+from single_flight import SingleFlight, canonical_key
+
+
+def test_concurrent_calls_are_coalesced():
+    flight = SingleFlight("test_coalesce", enabled=True)
+    started, release = threading.Event(), threading.Event()
+    executions = []
+
+    def compute():
+        executions.append(1)
+        started.set()
+        release.wait(5)
+        return {"questions": ["a", "b"]}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("key", compute)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("key", compute))) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    while flight.stats["coalesced"] < 3:
+        time.sleep(0.01)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert len(executions) == 1
+    assert flight.stats == {"calls": 4, "executions": 1, "coalesced": 3, "errors": 0, "timeouts": 0}
+    assert all(result == {"questions": ["a", "b"]} for result in results)
+    # 📌 Bekleyenler kopya alır; birinin değişikliği diğerine yansımaz
+    results[1]["questions"].append("c")
+    assert results[2]["questions"] == ["a", "b"]
+
+
+def test_leader_error_reaches_followers():
+    flight = SingleFlight("test_error", enabled=True)
+    started, release = threading.Event(), threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("boom")
+
+    errors = []
+
+    def call():
+        try:
+            flight.do("key", failing)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call)]
+    threads[0].start()
+    started.wait(5)
+    threads.append(threading.Thread(target=call))
+    threads[1].start()
+    while flight.stats["coalesced"] < 1:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert errors == ["boom", "boom"]
+    assert flight.stats["errors"] == 1
+
+
+def test_follower_gives_up_at_its_deadline():
+    flight = SingleFlight("test_deadline", enabled=True)
+    started, release = threading.Event(), threading.Event()
+    leader = threading.Thread(target=lambda: flight.do("key", lambda: (started.set(), release.wait(5))))
+    leader.start()
+    started.wait(5)
+
+    begin = time.monotonic()
+    with request_context(RequestContext("interactive", deadline_ms=100)):
+        with pytest.raises(DeadlineExceeded):
+            flight.do("key", lambda: None)
+    assert time.monotonic() - begin < 1.0
+    assert flight.stats["timeouts"] == 1
+
+    release.set()
+    leader.join(5)
+
+
+def test_canonical_key_ignores_whitespace_and_set_order():
+    assert canonical_key("Contact  form", {"b", "a"}) == canonical_key("Contact form", {"a", "b"})
+    assert canonical_key("Contact form", 5) != canonical_key("Contact form", 3)
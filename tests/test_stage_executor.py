@@ -0,0 +1,78 @@
+"""
+📌 **Aşama grafiğinin bağımlılık sırasını, zaman aşımı/hata yedeklerini ve havuz sınırını doğrular.**
+"""
+import threading
+import time
+
+from scheduling import RequestContext, request_context
+from stage_executor import StageGraph, StagePoolSaturated, StageTimeoutError
+
+
+def test_dependencies_receive_results():
+    graph = StageGraph()
+    graph.add_stage("intent", lambda: "contact")
+    graph.add_stage("questions", lambda intent: [f"{intent} email?"], depends_on=["intent"])
+    assert graph.run() == {"intent": "contact", "questions": ["contact email?"]}
+
+
+def test_error_and_timeout_use_fallbacks():
+    errors = []
+    release = threading.Event()
+
+    def failing():
+        raise RuntimeError("model missing")
+
+    graph = StageGraph()
+    graph.add_stage("feedback", failing, fallback=lambda error: errors.append(error) or ["fallback"])
+    graph.add_stage("slow", lambda: release.wait(5), timeout=0.2, fallback="late")
+    begin = time.monotonic()
+    results = graph.run()
+    release.set()
+
+    assert results == {"feedback": ["fallback"], "slow": "late"}
+    assert isinstance(errors[0], RuntimeError)
+    assert time.monotonic() - begin < 2
+
+
+def test_timeout_clock_starts_when_stage_runs():
+    """ 📌 Havuzda beklemek aşamanın süresinden yemez. """
+    StageGraph._get_executor()
+    workers = StageGraph._executor._max_workers
+    release = threading.Event()
+    blockers = [StageGraph._executor.submit(release.wait, 5) for _ in range(workers)]
+
+    graph = StageGraph()
+    graph.add_stage("quick", lambda: time.sleep(0.1) or "done", timeout=0.3, fallback="timed out")
+    threading.Timer(0.5, release.set).start()
+    assert graph.run() == {"quick": "done"}
+    for blocker in blockers:
+        blocker.result(5)
+
+
+def test_request_deadline_bounds_stages_without_timeout():
+    release = threading.Event()
+    errors = []
+    graph = StageGraph()
+    graph.add_stage("slow", lambda: release.wait(5), fallback=lambda error: errors.append(error) or "late")
+    with request_context(RequestContext("interactive", deadline_ms=200)):
+        begin = time.monotonic()
+        assert graph.run() == {"slow": "late"}
+    release.set()
+    assert time.monotonic() - begin < 2
+    assert isinstance(errors[0], StageTimeoutError)
+
+
+def test_saturated_pool_rejects_instead_of_queueing():
+    StageGraph._get_executor()
+    release = threading.Event()
+    started = []
+    graph = StageGraph()
+    for i in range(StageGraph._max_in_flight + 2):
+        graph.add_stage(f"stage{i}", lambda: started.append(1) or release.wait(5), timeout=0.2,
+                        fallback=lambda error: type(error).__name__)
+    threading.Timer(0.5, release.set).start()
+    results = graph.run()
+    rejected = [name for name, value in results.items() if value == StagePoolSaturated.__name__]
+    assert len(rejected) == 2
+    while StageGraph.get_stats()["in_flight"]:
+        time.sleep(0.01)
@@ -0,0 +1,103 @@
+"""
+📌 **Akış ayrıştırıcılarının durma kararlarını ve yeniden deneme öncesi `reset` davranışını doğrular.**
+"""
+import threading
+from concurrent.futures import Future
+
+import torch
+
+from stream_parsers import (FirstQuestionParser, NumberedItemsParser, PurposeLineParser, TaskStoppingCriteria,
+                            TokenStream)
+
+
+def test_numbered_items_waits_for_count_completed_lines():
+    parser = NumberedItemsParser(2)
+    assert not parser.feed("1. What is your name?\n2. What is your ema")
+    assert parser.result is None
+    assert parser.feed("1. What is your name?\n2. What is your email?\n")
+    assert parser.result == ["1. What is your name?", "2. What is your email?"]
+
+
+def test_numbered_items_ignores_excluded_questions():
+    parser = NumberedItemsParser(2, exclude=["What is your NAME?"])
+    text = "1. What is your name?\n2. What is your email?\n"
+    assert not parser.feed(text)
+    assert parser.feed(text + "- 3. How old are you?\nThanks\n")
+    assert parser.result == ["1. What is your name?", "2. What is your email?", "3. How old are you?"]
+
+
+def test_purpose_line_stops_after_first_line():
+    parser = PurposeLineParser()
+    assert not parser.feed("Purpose: Collect customer")
+    assert parser.feed("Purpose: Collect customer feedback\nCategory")
+    assert parser.result == "Collect customer feedback"
+
+
+def test_first_question_skips_non_questions():
+    parser = FirstQuestionParser()
+    assert not parser.feed("Here is a question:\nWhat is your")
+    assert parser.feed("Here is a question:\nWhat is your favourite colour?\n")
+    assert parser.result == "What is your favourite colour?"
+
+
+def test_reset_clears_a_partial_attempt():
+    parser = NumberedItemsParser(1)
+    parser.feed("1. Stale question?\n")
+    parser.done, parser.stopped_at = True, 7
+    parser.reset()
+    assert (parser.result, parser.done, parser.stopped_at) == (None, False, None)
+    assert parser.count == 1
+
+
+def test_token_stream_reset_replays_from_scratch():
+    stream = TokenStream(FirstQuestionParser(), threading.Event())
+    stream.feed("Is it")
+    stream.feed("Is it ok?\n")
+    stream.done = True
+    stream.reset()
+    assert not stream.done and stream.parser.result is None
+    assert stream.feed("Is it ok?\n")
+
+    events = []
+    while not stream._events.empty():
+        events.append(stream._events.get())
+    assert [e["event"] for e in events] == ["token", "token", "candidate", "reset", "token", "candidate"]
+    assert events[4]["text"] == "Is it ok?\n"
+
+
+def test_token_stream_emits_tokens_candidates_and_heartbeats():
+    stream = TokenStream()
+    future = Future()
+    stream.feed("1. Your na")
+    stream.feed("1. Your name?\n2. Ag\ufffd")
+    events = stream.events(future, heartbeat=0.01)
+    assert [next(events) for _ in range(3)] == [
+        {"event": "token", "text": "1. Your na"},
+        {"event": "token", "text": "me?\n2. Ag"},
+        {"event": "candidate", "question": "Your name?"},
+    ]
+    assert next(events) == {"event": "heartbeat"}
+    future.set_result(None)
+    assert list(events) == []
+
+
+def test_cancelled_stream_stops_row_and_events():
+    stream = TokenStream(FirstQuestionParser())
+    stream.cancel()
+    assert stream.feed("Is it ok?\n")
+    assert stream.parser.result is None
+    assert list(stream.events(Future(), heartbeat=0.01)) == []
+
+
+def test_task_stopping_criteria_marks_rows():
+    class CharTokenizer:
+        def decode(self, ids, skip_special_tokens=True):
+            return "".join(chr(i) for i in ids.tolist())
+
+    prompt = [ord("P")]
+    rows = ["Purpose: x\n", "Purpose: y"]
+    input_ids = torch.tensor([prompt + [ord(c) for c in row.ljust(11)] for row in rows])
+    parsers = [PurposeLineParser(), None]
+    stop = TaskStoppingCriteria(CharTokenizer(), parsers, prompt_length=1)
+    assert stop(input_ids, None).tolist() == [True, False]
+    assert parsers[0].stopped_at == 11
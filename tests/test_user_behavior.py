@@ -0,0 +1,102 @@
+"""
+📌 **Artımlı (Welford) soru istatistiklerinin ve çalışan toplamların doğrudan hesaplamayla aynı sonucu verdiğini doğrular.**
+"""
+import json
+import random
+
+import numpy as np
+import pytest
+
+from user_behavior import DAY, HOUR, BehaviorAggregates, QuestionStats, UserBehaviorAnalyzer
+
+START = 1_700_000_000
+
+
+def make_sessions(count, seed=0):
+    rng = random.Random(seed)
+    questions = ["Name?", "Email?", "Phone?", "Comments?"]
+    return [{
+        "form_id": rng.choice(["a", "b"]),
+        "form_completed": rng.random() < 0.5,
+        "timestamp": START + rng.randrange(2 * DAY),
+        "responses": [{"question_text": q, "time_spent": rng.uniform(0, 60), "skipped": rng.random() < 0.3}
+                      for q in rng.sample(questions, 3)],
+    } for _ in range(count)]
+
+
+def stats_of(values, skipped):
+    stats = QuestionStats()
+    for value, skip in zip(values, skipped):
+        stats.update(value, skip)
+    return stats
+
+
+def test_welford_matches_direct_mean_and_variance():
+    rng = np.random.default_rng(0)
+    values = rng.gamma(2.0, 5.0, 500) + 1e6  # 📌 büyük ofset: naif sumsq yöntemi burada hassasiyet kaybeder
+    skipped = rng.random(500) < 0.2
+    stats = stats_of(values, skipped)
+    assert stats.count == 500
+    assert stats.mean == pytest.approx(values.mean(), rel=1e-12)
+    assert stats.variance == pytest.approx(values.var(), rel=1e-9)
+    assert (stats.skipped_count, stats.completed_count) == (skipped.sum(), 500 - skipped.sum())
+
+
+def test_merge_equals_sequential_updates():
+    rng = np.random.default_rng(1)
+    values, skipped = rng.uniform(0, 30, 300), rng.random(300) < 0.1
+    merged = stats_of(values[:120], skipped[:120])
+    merged.merge(stats_of(values[120:], skipped[120:]))
+    merged.merge(QuestionStats())
+    sequential = stats_of(values, skipped)
+    for name in QuestionStats.__slots__:
+        assert getattr(merged, name) == pytest.approx(getattr(sequential, name))
+
+
+def test_from_totals_matches_updates():
+    values = [3.0, 7.5, 12.0, 1.25]
+    stats = QuestionStats.from_totals(len(values), sum(values), sum(v * v for v in values), 1)
+    reference = stats_of(values, [True, False, False, False])
+    assert (stats.count, stats.skipped_count, stats.completed_count) == (4, 1, 3)
+    assert stats.mean == pytest.approx(reference.mean)
+    assert stats.variance == pytest.approx(reference.variance)
+
+
+def test_aggregates_merge_and_totals():
+    sessions = make_sessions(50)
+    whole, left, right = BehaviorAggregates(), BehaviorAggregates(), BehaviorAggregates()
+    for i, entry in enumerate(sessions):
+        whole.add_session(entry)
+        (left if i % 2 else right).add_session(entry)
+    left.merge(right)
+
+    responses = [r for entry in sessions for r in entry["responses"]]
+    expected = (len(responses), np.mean([r["time_spent"] for r in responses]), sum(r["skipped"] for r in responses))
+    assert left.totals() == pytest.approx(expected)
+    assert whole.totals() == pytest.approx(expected)
+    assert (left.total_sessions, left.completed_forms) == (50, sum(e["form_completed"] for e in sessions))
+
+    restricted = whole.restrict(["Email?", "Unknown?"])
+    assert list(restricted.question_stats) == ["Email?"]
+    assert restricted.total_sessions == 50
+
+
+def test_range_query_matches_filtered_sessions(tmp_path, monkeypatch):
+    monkeypatch.delenv("SMARTFORM_BEHAVIOR_STORE", raising=False)
+    sessions = make_sessions(200, seed=2)
+    log_file = tmp_path / "form_logs.jsonl"
+    log_file.write_text("".join(json.dumps(entry) + "\n" for entry in sessions))
+    analyzer = UserBehaviorAnalyzer(log_file=str(log_file), legacy_log_file=None)
+
+    start, end = START + 3 * HOUR + 600, START + DAY + 5 * HOUR
+    hour_start, hour_end = start - start % HOUR, -(-end // HOUR) * HOUR
+    expected = BehaviorAggregates()
+    for entry in sessions:
+        if entry["form_id"] == "a" and hour_start <= entry["timestamp"] < hour_end:
+            expected.add_session(entry)
+
+    total_sessions, completed, questions, avg_time, skipped = analyzer.query(form_id="a", start=start, end=end)
+    assert (total_sessions, completed) == (expected.total_sessions, expected.completed_forms)
+    assert (avg_time, skipped) == pytest.approx(expected.totals()[1:])
+    assert {q: (mean, s) for q, mean, s in questions} == \
+        pytest.approx({q: (s.mean, s.skipped_count) for q, s in expected.question_stats.items()})
@@ -1,9 +1,8 @@
 import os
 import logging
 import torch
-import pandas as pd
-from sklearn.model_selection import train_test_split
-from datasets import Dataset
+import pyarrow.compute as pc
+from datasets import load_dataset, concatenate_datasets
 from transformers import (
     AutoTokenizer, AutoModelForSequenceClassification, Trainer, TrainingArguments
 )
@@ -17,105 +16,160 @@ logger = logging.getLogger(__name__)
 os.environ["PYTORCH_MPS_HIGH_WATERMARK_RATIO"] = "0.0"
 
 class FormDataManager:
-    def __init__(self, final_data_path, enhanced_data_path):
+    def __init__(self, final_data_path, enhanced_data_path, cache_dir=None, num_proc=None):
         self.final_data_path = final_data_path
         self.enhanced_data_path = enhanced_data_path
+        self.cache_dir = cache_dir
+        self.num_proc = num_proc or max(1, min(8, (os.cpu_count() or 1) // 2))
+
+    def _load_source(self, builder, path, label_column):
+        """
+        🔹 Kaynağı Arrow olarak (bellek eşlemeli, disk önbellekli) okur ve sadece `question_text` + `label` bırakır.
+        """
+        dataset = load_dataset(builder, data_files=path, split="train", cache_dir=self.cache_dir)
+        if "question_text" not in dataset.column_names:
+            dataset = dataset.add_column("question_text", [None] * len(dataset))
+        dataset = dataset.select_columns(["question_text", label_column])
+
+        def to_text(batch):
+            # 🔹 pandas'taki `astype(str)` davranışı: eksik etiketler "None" olur ve sonra elenir
+            return {"label": [str(value) for value in batch[label_column]]}
+
+        return dataset.map(to_text, batched=True, remove_columns=[label_column], num_proc=self.num_proc,
+                           desc=f"Etiketler ({os.path.basename(path)})")
 
     def load_and_prepare(self):
         """
         🔹 **Veri setlerini yükler, temizler ve model için hazır hale getirir.**
+        - Veriler pandas yerine Arrow ile okunur; filtreler kopya üretmeden, disk önbelleğine yazılarak uygulanır.
+        - Etiketler `ClassLabel`'a çevrilir; etiket isimleri `train_dataset.features["label"].names` içindedir.
         """
         try:
             logger.info("📂 Veri setleri yükleniyor...")
-            final_df = pd.read_csv(self.final_data_path, low_memory=False)
-            enhanced_df = pd.read_parquet(self.enhanced_data_path)
+            final_ds = self._load_source("csv", self.final_data_path, "target")
+            enhanced_ds = self._load_source("parquet", self.enhanced_data_path, "question_type")
 
             # 🔹 **Etiketleme ve birleştirme**
-            final_df['label'] = final_df['target'].astype(str)
-            enhanced_df['label'] = enhanced_df['question_type'].astype(str)
-            combined_df = pd.concat([final_df, enhanced_df], ignore_index=True)
+            combined = concatenate_datasets([final_ds, enhanced_ds])
 
             # 🔹 **Tek örnek içeren sınıfları kaldır**
-            label_counts = combined_df['label'].value_counts()
-            if label_counts.min() < 2:
+            label_counts = {item["values"]: item["counts"]
+                            for item in pc.value_counts(combined.data.column("label")).to_pylist()}
+            if label_counts and min(label_counts.values()) < 2:
                 logger.warning("⚠️ Tek örnek içeren sınıflar kaldırılıyor...")
-                valid_labels = label_counts[label_counts > 1].index
-                combined_df = combined_df[combined_df['label'].isin(valid_labels)]
-                logger.info(f"📊 Güncellenmiş sınıf dağılımı: {combined_df['label'].value_counts()}")
+                valid_labels = {label for label, count in label_counts.items() if count > 1}
+                combined = combined.filter(lambda batch: [label in valid_labels for label in batch["label"]],
+                                           batched=True, num_proc=self.num_proc)
+                logger.info(f"📊 Güncellenmiş sınıf sayısı: {len(valid_labels)}")
+
+            # 🔹 **NaN değerleri temizle, kısa soruları ve geçersiz etiketleri kaldır**
+            invalid_labels = {"unknown", "None", "nan"}
 
-            # 🔹 **NaN değerleri temizle**
-            combined_df = combined_df.fillna("unknown")
-            logger.info(f"🛠️ NaN içeren sütunlar temizlendi.")
+            def clean(batch):
+                return {"question_text": [text if text is not None else "unknown" for text in batch["question_text"]]}
 
-            # 🔹 **Soruları analiz et ve kısa olanları temizle**
-            if "question_text" in combined_df.columns:
-                combined_df = combined_df[combined_df["question_text"].str.len() > 5]
-                logger.info(f"🛠️ 'question_text' filtresi uygulandı, yeni veri seti boyutu: {combined_df.shape}")
+            def keep(batch):
+                return [len(text) > 5 and label not in invalid_labels
+                        for text, label in zip(batch["question_text"], batch["label"])]
 
-            # 🔹 **Geçersiz label değerlerini kaldır**
-            invalid_labels = ["unknown", "None"]
-            combined_df = combined_df[~combined_df["label"].isin(invalid_labels)]
-            logger.warning("⚠️ Geçersiz label değerleri kaldırıldı.")
+            combined = combined.map(clean, batched=True, num_proc=self.num_proc, desc="Temizlik")
+            combined = combined.filter(keep, batched=True, num_proc=self.num_proc, desc="Filtre")
+            logger.info(f"🛠️ Temizlik ve filtreler uygulandı, yeni veri seti boyutu: {combined.num_rows}")
 
-            # 🔹 **Form ID ve diğer sayısal sütunları string olarak kaydet**
-            for col in ["form_id", "question_id", "created_utc", "id"]:
-                if col in combined_df.columns:
-                    combined_df[col] = combined_df[col].astype(str)
+            combined = combined.class_encode_column("label")
 
             # 📌 **Veri bölme işlemi (train/val)**
             try:
-                if len(combined_df) < 1000:
+                if combined.num_rows < 1000:
                     logger.warning("⚠️ Küçük veri seti! `stratify` kaldırılıyor.")
-                    train_df, val_df = train_test_split(combined_df, test_size=0.2, random_state=42)
+                    splits = combined.train_test_split(test_size=0.2, seed=42)
                 else:
-                    train_df, val_df = train_test_split(combined_df, test_size=0.2, stratify=combined_df["label"], random_state=42)
+                    splits = combined.train_test_split(test_size=0.2, seed=42, stratify_by_column="label")
             except ValueError as e:
                 logger.error(f"❌ Veri bölme işlemi başarısız: {e}")
                 raise
 
+            train_ds, val_ds = splits["train"], splits["test"]
+
             # 🔹 **Boş veri seti kontrolü**
-            if train_df.empty or val_df.empty:
+            if train_ds.num_rows == 0 or val_ds.num_rows == 0:
                 logger.error("❌ HATA: Eğitim veya doğrulama veri kümesi boş! Model eğitilemez.")
                 raise ValueError("Eğitim veya doğrulama veri kümesi boş!")
 
-            logger.info(f"✅ Eğitim veri kümesi boyutu: {train_df.shape}")
-            logger.info(f"✅ Doğrulama veri kümesi boyutu: {val_df.shape}")
+            logger.info(f"✅ Eğitim veri kümesi boyutu: {train_ds.num_rows}")
+            logger.info(f"✅ Doğrulama veri kümesi boyutu: {val_ds.num_rows}")
 
-            return Dataset.from_pandas(train_df), Dataset.from_pandas(val_df)
+            return train_ds, val_ds
 
         except Exception as e:
             logger.error(f"❌ Veri yüklenirken hata oluştu: {e}", exc_info=True)
             raise
 
+def tokenize_batch(batch, tokenizer, max_length):
+    # 🔹 Dolgu yok; uzunluk sütunu, benzer uzunluktaki örnekleri aynı batch'e koymak için kullanılır
+    encoded = tokenizer(batch["question_text"], truncation=True, max_length=max_length)
+    encoded["length"] = [len(ids) for ids in encoded["input_ids"]]
+    return encoded
+
+
 class FormTrainer:
-    def __init__(self, model_name="distilbert-base-uncased", num_labels=5, device=None):
+    def __init__(self, model_name="distilbert-base-uncased", num_labels=5, device=None, label_names=None, num_proc=None):
         """
         🔹 **AI Modeli Tanımlama**
         - `model_name`: Hugging Face model ismi.
-        - `num_labels`: Sınıf sayısı.
+        - `num_labels`: Sınıf sayısı (`label_names` verilirse ondan alınır).
+        - `label_names`: Sınıf isimleri; modele id2label olarak kaydedilir.
         """
         self.device = device if device else torch.device("cpu")
+        self.num_proc = num_proc or max(1, min(8, (os.cpu_count() or 1) // 2))
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+
+        label_kwargs = {}
+        if label_names:
+            num_labels = len(label_names)
+            label_kwargs = {"id2label": dict(enumerate(label_names)),
+                            "label2id": {name: i for i, name in enumerate(label_names)}}
         self.model = AutoModelForSequenceClassification.from_pretrained(
-            model_name, num_labels=num_labels
+            model_name, num_labels=num_labels, **label_kwargs
         ).to(self.device)
 
-        # **Veri Pad'leme için Collator**
+        # **Veri Pad'leme için Collator: her batch kendi en uzun örneğine göre dolgulanır**
         self.data_collator = DataCollatorWithPadding(tokenizer=self.tokenizer)
 
-    def _tokenize(self, batch):
-        return self.tokenizer(
-            batch["question_text"],
-            padding="max_length",
-            truncation=True,
-            max_length=128,
-            return_tensors="pt",
-        )
+    def tokenize(self, dataset, max_length=128):
+        """
+        🔹 **Veri setini bir kez tokenize eder.**
+        Sonuç, veri seti + tokenizer + `max_length` parmak iziyle diske önbelleklenir; sonraki çalıştırmalar tekrar tokenize etmez.
+        Fonksiyon modül düzeyindedir: bağlı metot `self`'i (rastgele başlatılan sınıflandırıcı dahil) parmak izine katardı.
+        """
+        return dataset.map(tokenize_batch, batched=True, num_proc=self.num_proc,
+                           fn_kwargs={"tokenizer": self.tokenizer, "max_length": max_length},
+                           remove_columns=["question_text"], desc="Tokenizasyon")
+
+    @staticmethod
+    def padding_report(dataset, batch_size, max_length=128):
+        """ 🔹 Sabit `max_length` dolgusuna göre uzunluk gruplamalı dinamik dolgunun token israfını karşılaştırır. """
+        lengths = sorted(dataset["length"])
+        if not lengths:
+            return {}
+        real_tokens = sum(lengths)
+        fixed = len(lengths) * max_length
+        bucketed = sum(max(lengths[i:i + batch_size]) * len(lengths[i:i + batch_size])
+                       for i in range(0, len(lengths), batch_size))
+        return {
+            "real_tokens": real_tokens,
+            "fixed_padding_efficiency": round(real_tokens / fixed, 3),
+            "bucketed_padding_efficiency": round(real_tokens / bucketed, 3),
+        }
 
     def train(self, train_dataset, val_dataset):
         """
         🔹 **Modeli eğitir ve kaydeder.**
         """
+        train_dataset = self.tokenize(train_dataset)
+        val_dataset = self.tokenize(val_dataset)
+        logger.info(f"📊 Dolgu verimliliği: {self.padding_report(train_dataset, 16)}")
+
         training_args = TrainingArguments(
             output_dir="./results",
             evaluation_strategy="epoch",
@@ -127,6 +181,10 @@ class FormTrainer:
             learning_rate=3e-5,
             load_best_model_at_end=True,
             metric_for_best_model="eval_loss",
+            # 🔹 Benzer uzunluktaki örnekler aynı batch'e düşer; dinamik dolgu israfı azalır
+            group_by_length=True,
+            length_column_name="length",
+            dataloader_num_workers=min(4, self.num_proc),
         )
 
         trainer = Trainer(
@@ -141,6 +199,7 @@ class FormTrainer:
         try:
             trainer.train()
             self.model.save_pretrained("models/form_classifier")
+            self.tokenizer.save_pretrained("models/form_classifier")
             logger.info("✅ Model eğitildi ve kaydedildi: models/form_classifier")
         except Exception as e:
             logger.error(f"❌ Model eğitimi başarısız: {e}", exc_info=True)
@@ -158,7 +217,7 @@ if __name__ == "__main__":
         train_dataset, val_dataset = data_manager.load_and_prepare()
 
         # 📌 **Model Eğitimi**
-        trainer = FormTrainer(num_labels=5)
+        trainer = FormTrainer(label_names=train_dataset.features["label"].names)
         trainer.train(train_dataset, val_dataset)
 
         logger.info("🎯 Model eğitimi tamamlandı!")
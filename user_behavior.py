@@ -1,66 +1,325 @@
 # type: ignore
-import numpy as np
 import json
 import os
+import threading
+import numpy as np
+from behavior_store import (BehaviorRollups, ColumnarBehaviorStore, MAX_BUCKET, iter_sessions, convert_json_to_jsonl,
+                            form_key_of, parse_timestamp)
+
+HOUR = 3600
+DAY = 86400
+
+
+class QuestionStats:
+    """ 📌 **Tek bir soru için artımlı (online) istatistikler.** Ortalama/varyans Welford yöntemiyle tutulur. """
+    __slots__ = ("count", "mean", "m2", "skipped_count", "completed_count")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.skipped_count = 0
+        self.completed_count = 0
+
+    def update(self, time_spent, skipped):
+        self.count += 1
+        delta = time_spent - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (time_spent - self.mean)
+        if skipped:
+            self.skipped_count += 1
+        else:
+            self.completed_count += 1
+
+    def merge(self, other):
+        """ 📌 İki istatistiği birleştirir (paralel Welford / Chan yöntemi). """
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.mean += delta * other.count / total
+        self.count = total
+        self.skipped_count += other.skipped_count
+        self.completed_count += other.completed_count
+
+    @classmethod
+    def from_totals(cls, count, total, total_sq, skipped_count):
+        """ 📌 Sütun deposundan gelen toplamlardan (count, sum, sumsq) istatistik oluşturur. """
+        stats = cls()
+        stats.count = int(count)
+        stats.mean = total / count if count else 0.0
+        stats.m2 = max(total_sq - count * stats.mean * stats.mean, 0.0)
+        stats.skipped_count = int(skipped_count)
+        stats.completed_count = stats.count - stats.skipped_count
+        return stats
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count > 1 else 0.0
+
+
+class BehaviorAggregates:
+    """ 📌 **Bir oturum kümesi (tüm veri, tek form ya da tek zaman kovası) için çalışan toplamlar.** """
+
+    def __init__(self):
+        self.question_stats = {}
+        self.total_sessions = 0
+        self.completed_forms = 0
+
+    def add_session(self, entry):
+        self.total_sessions += 1
+        if entry.get("form_completed"):
+            self.completed_forms += 1
+
+        for response in entry.get("responses", []):
+            question_text = response.get("question_text")
+            stats = self.question_stats.get(question_text)
+            if stats is None:
+                stats = self.question_stats[question_text] = QuestionStats()
+            stats.update(response.get("time_spent", 0), response.get("skipped", False))
+
+    def merge(self, other):
+        self.total_sessions += other.total_sessions
+        self.completed_forms += other.completed_forms
+        for question_text, other_stats in other.question_stats.items():
+            stats = self.question_stats.get(question_text)
+            if stats is None:
+                stats = self.question_stats[question_text] = QuestionStats()
+            stats.merge(other_stats)
+
+    def restrict(self, questions):
+        """ 📌 Sadece verilen sorulara ait istatistikleri içeren bir görünüm döndürür (O(#soru)). """
+        restricted = BehaviorAggregates()
+        restricted.total_sessions = self.total_sessions
+        restricted.completed_forms = self.completed_forms
+        for question_text in questions:
+            stats = self.question_stats.get(question_text)
+            if stats is not None:
+                restricted.question_stats[question_text] = stats
+        return restricted
+
+    def totals(self):
+        """ 📌 Yanıt sayısı, genel ortalama süre ve toplam atlanma sayısı. """
+        responses = sum(s.count for s in self.question_stats.values())
+        time_sum = sum(s.mean * s.count for s in self.question_stats.values())
+        skipped = sum(s.skipped_count for s in self.question_stats.values())
+        return responses, (time_sum / responses if responses else 0), skipped
+
 
 class UserBehaviorAnalyzer:
-    def __init__(self, log_file="form_logs.json"):
+    def __init__(self, log_file="form_logs.jsonl", legacy_log_file="form_logs.json", store_dir=None):
         self.log_file = log_file
-        self.user_data = self.load_user_logs()
+        self.legacy_log_file = legacy_log_file
+        # 📌 Sütun bazlı depo tanımlıysa JSONL yerine o kullanılır
+        store_dir = store_dir or os.getenv("SMARTFORM_BEHAVIOR_STORE")
+        self.store = ColumnarBehaviorStore(store_dir) if store_dir else None
+        self._lock = threading.Lock()
+
+        # 📌 **Çalışan toplamlar**: tüm veri, form bazında ve saatlik/günlük kovalar halinde
+        self.global_aggregates = BehaviorAggregates()
+        self.form_aggregates = {}
+        self.rollups = {HOUR: {}, DAY: {}}
+        # 📌 Sütun deposu kullanılıyorsa toplamlar dizi tablolarında tutulur; nesneler sadece sorgulanan anahtarlar için kurulur
+        self.store_rollups = BehaviorRollups((HOUR, DAY)) if self.store is not None else None
+
+        self.load_user_logs()
 
     def load_user_logs(self):
-        """ 📌 Kullanıcı verilerini JSON formatında yükler. """
-        if not os.path.exists(self.log_file):
-            print(f"🚨 Log file '{self.log_file}' not found. Using simulated data.")
-            return []
-        
+        """ 📌 Toplamları sütun deposundan ya da JSONL log dosyasını akış halinde okuyarak yeniden oluşturur. """
+        if self.store is not None and self.store.num_sessions:
+            self._refresh_from_store()
+            print(f"✅ **Davranış toplamları sütun deposundan yüklendi: {self.store.num_sessions} oturum, "
+                  f"{len(self.store.forms)} form**")
+            return
+
+        source = self.log_file
+        if not os.path.exists(source):
+            if self.legacy_log_file and os.path.exists(self.legacy_log_file):
+                source = self.legacy_log_file
+            else:
+                print(f"🚨 Log file '{self.log_file}' not found. Using simulated data.")
+                return
+
         try:
-            with open(self.log_file, "r") as file:
-                return json.load(file)
+            for entry in iter_sessions(source):
+                self._update_aggregates(entry)
+            print(f"✅ **Davranış toplamları yüklendi: {self.global_aggregates.total_sessions} oturum, "
+                  f"{len(self.form_aggregates)} form ({source})**")
         except Exception as e:
             print(f"🚨 Error loading user logs: {e}")
-            return []
 
-    def analyze_behavior(self, user_data=None, form_questions=None):
+    def _refresh_from_store(self):
+        """ 📌 Depoya (bu ya da başka bir worker tarafından) eklenen yeni satırları toplam tablolarına katar. """
+        self.store.refresh()
+        with self._lock:
+            self.store_rollups.update(self.store)
+
+    def _rollup(self, bucket_seconds, form_key, bucket):
+        return self.rollups[bucket_seconds].setdefault(form_key, {}).setdefault(bucket, BehaviorAggregates())
+
+    def _update_aggregates(self, entry):
+        form_key = form_key_of(entry)
+        timestamp = parse_timestamp(entry.get("timestamp"))
+
+        with self._lock:
+            self.global_aggregates.add_session(entry)
+            if form_key is not None:
+                self.form_aggregates.setdefault(form_key, BehaviorAggregates()).add_session(entry)
+
+            # 📌 Saatlik ve günlük kovalar: hem form bazında hem tüm veri için (form_key=None)
+            if timestamp:
+                for bucket_seconds in (HOUR, DAY):
+                    bucket = timestamp // bucket_seconds
+                    self._rollup(bucket_seconds, None, bucket).add_session(entry)
+                    if form_key is not None:
+                        self._rollup(bucket_seconds, form_key, bucket).add_session(entry)
+
+    def record_session(self, entry, persist=True):
+        """ 📌 **Yeni bir oturumu toplamlara ekler** ve JSONL log dosyasının sonuna yazar. """
+        self.record_sessions([entry], persist=persist)
+
+    def record_sessions(self, entries, persist=True):
+        """
+        📌 **Oturumları toplu olarak toplamlara ekler** ve depoya/JSONL log dosyasına tek seferde yazar.
+        Sütun deposu kullanılıyorsa tek doğruluk kaynağı depodur: oturumlar depoya yazılır, toplamlar bir sonraki
+        sorguda depodan tazelenir (diğer worker'ların yazdıkları da böylece görünür).
+        """
+        if persist and self.store is not None:
+            self.store.append_sessions(entries)
+            return
+        for entry in entries:
+            self._update_aggregates(entry)
+        if persist:
+            with self._lock:
+                # 📌 İlk yazımdan önce eski JSON kayıtlarını JSONL'e taşı, yoksa yeniden başlatmada kaybolurlar
+                if not os.path.exists(self.log_file) and self.legacy_log_file and os.path.exists(self.legacy_log_file):
+                    convert_json_to_jsonl(self.legacy_log_file, self.log_file)
+                with open(self.log_file, "a") as file:
+                    file.write("".join(json.dumps(entry) + "\n" for entry in entries))
+
+    def _range_aggregates(self, form_key, start, end):
+        """
+        📌 **[start, end) aralığı için toplamları kovalardan birleştirir.**
+        Tam kapsanan günler günlük kovalardan, kenarlardaki saatler saatlik kovalardan alınır.
+        """
+        hourly = self.rollups[HOUR].get(form_key, {})
+        daily = self.rollups[DAY].get(form_key, {})
+        result = BehaviorAggregates()
+        if not hourly:
+            return result
+
+        start = start if start is not None else min(hourly) * HOUR
+        end = end if end is not None else (max(hourly) + 1) * HOUR
+        cursor = start - start % HOUR
+        while cursor < end:
+            if cursor % DAY == 0 and cursor + DAY <= end:
+                bucket = daily.get(cursor // DAY)
+                step = DAY
+            else:
+                bucket = hourly.get(cursor // HOUR)
+                step = HOUR
+            if bucket is not None:
+                result.merge(bucket)
+            cursor += step
+        return result
+
+    @staticmethod
+    def _range_segments(start, end):
+        """
+        📌 **[start, end) aralığını kova dilimlerine böler:** tam kapsanan günler günlük, kenarlardaki saatler
+        saatlik tablodan okunur (`_range_aggregates` ile aynı kova seçimi).
+        """
+        first_hour = max(start // HOUR, 0) if start is not None else 0
+        end_hour = min(-(-end // HOUR), MAX_BUCKET) if end is not None else MAX_BUCKET
+        first_day = -(-first_hour // 24)
+        end_day = min(end // DAY, MAX_BUCKET) if end is not None else MAX_BUCKET
+        if first_day >= end_day:
+            return [(HOUR, first_hour, end_hour)] if first_hour < end_hour else []
+        return [(HOUR, first_hour, first_day * 24), (DAY, first_day, end_day), (HOUR, min(end_day * 24, MAX_BUCKET), end_hour)]
+
+    def _query_store(self, form_id, form_questions, start, end):
+        """ 📌 `query()`'nin sütun deposu karşılığı: sadece istenen form, kova ve sorular için sonuç kurulur. """
+        store = self.store
+        form_index = store.lookup_form(form_id) if form_id is not None else None
+        if form_id is not None and form_index is None:
+            if not form_questions:
+                return 0, 0, [], 0, 0
+            form_index = -1
+        form_slot = form_index + 1 if form_index is not None else 0
+        if start is not None or end is not None:
+            segments = self._range_segments(start, end)
+        else:
+            segments = [(None, 0, 1)]
+
+        with self._lock:
+            question_ids, totals = self.store_rollups.question_totals(form_slot, segments)
+            total_sessions, completed_forms = self.store_rollups.session_totals(form_slot, segments)
+
+        if form_questions:
+            # 📌 İstenen soruların satırları sıralı soru indekslerinde ikili aramayla bulunur
+            requested = [(q, store.lookup_question(q)) for q in dict.fromkeys(form_questions)]
+            requested = [(q, question_id) for q, question_id in requested if question_id is not None]
+            positions = np.searchsorted(question_ids, [question_id for _, question_id in requested]).tolist()
+            selected = [(q, row) for (q, question_id), row in zip(requested, positions)
+                        if row < len(question_ids) and question_ids[row] == question_id]
+        else:
+            selected = [(store.questions[q], i) for i, q in enumerate(question_ids)]
+
+        all_questions = [(question_text, float(totals[row, 1] / totals[row, 0]), int(totals[row, 3]))
+                         for question_text, row in selected]
+        rows = [row for _, row in selected]
+        responses = totals[rows, 0].sum()
+        avg_time_spent = float(totals[rows, 1].sum() / responses) if responses else 0
+        return total_sessions, completed_forms, all_questions, avg_time_spent, int(totals[rows, 3].sum())
+
+    def query(self, form_id=None, form_questions=None, start=None, end=None):
+        """
+        📌 **İstenen form / soru / zaman aralığına ait toplamları döndürür.**
+        - `form_id` verilirse sadece o formun oturumlarına bakılır (form bilinmiyorsa soru metinlerine göre).
+        - `form_questions` verilirse rapor sadece bu sorularla sınırlanır.
+        - `start` / `end` (ISO-8601 ya da epoch saniye) verilirse saatlik/günlük kovalar kullanılır.
+        """
+        start = parse_timestamp(start) if isinstance(start, str) else start
+        end = parse_timestamp(end) if isinstance(end, str) else end
+        if self.store is not None:
+            self._refresh_from_store()
+            return self._query_store(form_id, form_questions, start, end)
+
+        with self._lock:
+            # 📌 Henüz oturumu olmayan formlar için soru metni indeksiyle tüm veriye bakılır
+            if form_id is not None and form_id not in self.form_aggregates and form_questions:
+                form_id = None
+
+            if start is not None or end is not None:
+                aggregates = self._range_aggregates(form_id, start, end)
+            elif form_id is not None:
+                aggregates = self.form_aggregates.get(form_id, BehaviorAggregates())
+            else:
+                aggregates = self.global_aggregates
+
+            if form_questions:
+                aggregates = aggregates.restrict(form_questions)
+
+            all_questions = [(q, s.mean, s.skipped_count) for q, s in aggregates.question_stats.items()]
+            responses, avg_time_spent, total_skipped = aggregates.totals()
+            return aggregates.total_sessions, aggregates.completed_forms, all_questions, avg_time_spent, total_skipped
+
+    def analyze_behavior(self, user_data=None, form_questions=None, form_id=None, start=None, end=None):
         """
         📌 Kullanıcı davranışlarını analiz eder ve:
         🔹 En çok zaman harcanan soruları belirler
         🔹 En fazla atlanan soruları tespit eder
         🔹 En zor ve en kolay soruları belirler (Skor gösterilmez)
         🔹 Formun genel kalite skorunu hesaplar
+        Sadece istenen formun / soruların / zaman aralığının toplamlarına bakılır.
         """
-        if not self.user_data:
+        total_sessions, completed_forms, all_questions, avg_time_spent, total_skipped = self.query(form_id, form_questions, start, end)
+        if not total_sessions or not all_questions:
             return {"feedback": ["⚠️ No user behavior data available."]}
 
-        all_questions = {}
-        completion_times = []
-        skipped_questions = []
-        completed_forms = 0
-        total_forms = len(self.user_data)
+        completion_rate = completed_forms / total_sessions
 
-        for entry in self.user_data:
-            if entry.get("form_completed"):
-                completed_forms += 1
-
-            for response in entry.get("responses", []):
-                question_id = response.get("question_id")
-                question_text = response.get("question_text")
-                time_spent = response.get("time_spent", 0)
-                skipped = response.get("skipped", False)
-
-                completion_times.append(time_spent)
-                if skipped:
-                    skipped_questions.append(question_text)
-
-                if question_text not in all_questions:
-                    all_questions[question_text] = {"time_spent": [], "skipped_count": 0}
-
-                all_questions[question_text]["time_spent"].append(time_spent)
-                if skipped:
-                    all_questions[question_text]["skipped_count"] += 1
-
-        avg_time_spent = np.mean(completion_times) if completion_times else 0
-        completion_rate = completed_forms / total_forms if total_forms > 0 else 1.0
         feedback = []
 
         # 📌 **Genel Yanıt Süresi Analizi**
@@ -74,23 +333,23 @@ class UserBehaviorAnalyzer:
             feedback.append("⚠️ More than half of users do not complete the form. Consider reducing the number of questions or making them clearer.")
 
         # 📌 **En Çok Zaman Harcanan Sorular**
-        sorted_time_spent = sorted(all_questions.items(), key=lambda x: np.mean(x[1]["time_spent"]), reverse=True)
-        top_time_questions = [{"question": q[0], "time": f"{np.mean(q[1]['time_spent']):.1f} sec"} for q in sorted_time_spent[:3]]
+        sorted_time_spent = sorted(all_questions, key=lambda x: x[1], reverse=True)
+        top_time_questions = [{"question": q[0], "time": f"{q[1]:.1f} sec"} for q in sorted_time_spent[:3]]
 
         if top_time_questions:
             feedback.append("⏳ Time-Consuming Questions:\n" + "\n".join([f"- {q['question']} ({q['time']})" for q in top_time_questions]))
 
         # 📌 **En Çok Atlanan Sorular**
-        sorted_skipped = sorted(all_questions.items(), key=lambda x: x[1]["skipped_count"], reverse=True)
-        top_skipped_questions = [{"question": q[0], "skipped_count": q[1]["skipped_count"]} for q in sorted_skipped[:3] if q[1]["skipped_count"] > 0]
+        sorted_skipped = sorted(all_questions, key=lambda x: x[2], reverse=True)
+        top_skipped_questions = [{"question": q[0], "skipped_count": q[2]} for q in sorted_skipped[:3] if q[2] > 0]
 
         if top_skipped_questions:
             feedback.append("🚨 Frequently Skipped Questions:\n" + "\n".join([f"- {q['question']} (Skipped {q['skipped_count']} times)" for q in top_skipped_questions]))
 
         # 📌 **En Zor ve En Kolay Sorular**
-        difficulty_scores = {q[0]: np.mean(q[1]["time_spent"]) + (q[1]["skipped_count"] * 5) for q in all_questions.items()}
+        difficulty_scores = {q[0]: q[1] + (q[2] * 5) for q in all_questions}
         sorted_difficulty = sorted(difficulty_scores.items(), key=lambda x: x[1], reverse=True)
-        
+
         hardest_questions = [{"question": q[0]} for q in sorted_difficulty[:3]]
         easiest_questions = [{"question": q[0]} for q in sorted_difficulty[-3:]]
 
@@ -103,7 +362,7 @@ class UserBehaviorAnalyzer:
         form_quality_score = 100
         if avg_time_spent > 15:
             form_quality_score -= 10
-        if len(skipped_questions) > 2:
+        if total_skipped > 2:
             form_quality_score -= 10
         if len(hardest_questions) > 2:
             form_quality_score -= 5
@@ -124,9 +383,9 @@ class UserBehaviorAnalyzer:
 
 # ✅ **Test için**
 if __name__ == "__main__":
-    analyzer = UserBehaviorAnalyzer("form_logs.json")
+    analyzer = UserBehaviorAnalyzer()
     report = analyzer.analyze_behavior()
-    
+
     print("\n📌 **User Behavior Analysis Report:**\n")
     for item in report["feedback"]:
         print(item)